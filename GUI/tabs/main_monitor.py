@@ -7,11 +7,12 @@ from PyQt6.QtGui import QColor, QPainter, QBrush, QPen, QFont, QPolygon, QIntVal
 from PyQt6.QtWidgets import QApplication, QWidget, QLabel
 from PyQt6.QtCore import Qt, QThread, pyqtSignal, QPoint, QTimer
 
-from stw_lib.sector_manager2 import SectorName, SectorStatus, SectorManager
+from stw_lib.sector_manager2 import SectorName, SectorStatus, SectorManager, STORAGE_LANES
 
 # ComManager import (상위 경로)
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
 from communication.com_manager import ComManager
+from communication.message_protocol import MessageProtocol
 
 
 # --- UI 파일 로드 ---
@@ -31,8 +32,9 @@ class MainMonitorTab(QWidget, Ui_Tab):
         self.sensor_status.setPixmap(self.pixmap)
 
         # ComManager 초기화 및 연결
-        self.com_manager = ComManager(host='localhost', port=8100)
-        self.com_manager = ComManager(host='12', port=8100)
+        lanes = [lane['color'] for lane in STORAGE_LANES]
+        self.com_manager = ComManager(host='localhost', port=8100, lanes=lanes)
+        self.com_manager = ComManager(host='12', port=8100, lanes=lanes)
         
         # LMS 서버 연결 시도
         if self.com_manager.connect():
@@ -121,28 +123,23 @@ class MainMonitorTab(QWidget, Ui_Tab):
     def update_stock_display(self, stocks):
         """재고 정보를 UI에 업데이트합니다."""
         try:
-            if len(stocks) >= 7:  # 7개 값이 모두 필요
-                # QProgressBar 업데이트 (최대값 3으로 설정)
-                if hasattr(self, 'stock_count_r'):
-                    self.stock_count_r.setMaximum(3)
-                    self.stock_count_r.setValue(min(stocks[1], 3))
+            field_count = MessageProtocol.stock_field_count(len(STORAGE_LANES))
+            if len(stocks) >= field_count:  # 입고 + 레인 + 출고 + 누적 2개
+                # 레인별 QProgressBar 업데이트 (위젯 이름 : stock_count_<레인 코드>, 최대값 = 레인 용량)
+                for i, lane in enumerate(STORAGE_LANES):
+                    progress = getattr(self, f"stock_count_{lane['code'].lower()}", None)
+                    if progress is not None:
+                        progress.setMaximum(lane['capacity'])
+                        progress.setValue(min(stocks[1 + i], lane['capacity']))
                 
-                if hasattr(self, 'stock_count_g'):
-                    self.stock_count_g.setMaximum(3)
-                    self.stock_count_g.setValue(min(stocks[2], 3))
-                
-                if hasattr(self, 'stock_count_y'):
-                    self.stock_count_y.setMaximum(3)
-                    self.stock_count_y.setValue(min(stocks[3], 3))
-                
-                # 누적 재고 반영 (stock[5]=RECEIVING_TOTAL, stock[6]=SHIPPING_TOTAL)
+                # 누적 재고 반영 (마지막 2개 : RECEIVING_TOTAL, SHIPPING_TOTAL)
                 if hasattr(self, 'acc_receive_count'):
-                    self.acc_receive_count.setText(str(stocks[5]))
+                    self.acc_receive_count.setText(str(stocks[field_count - 2]))
                 
                 if hasattr(self, 'acc_ship_count'):
-                    self.acc_ship_count.setText(str(stocks[6]))
+                    self.acc_ship_count.setText(str(stocks[field_count - 1]))
             else:
-                print(f"재고 데이터 길이 부족: {len(stocks)} (7개 필요)")
+                print(f"재고 데이터 길이 부족: {len(stocks)} ({field_count}개 필요)")
         except Exception as e:
             print(f"재고 표시 업데이트 실패: {e}")
             import traceback
@@ -152,30 +149,18 @@ class MainMonitorTab(QWidget, Ui_Tab):
         """지역별 통계를 UI에 업데이트합니다."""
         try:
             print(f"지역별 통계 업데이트:")
-            print(f"  RED: 입고={regional_stats['RED']['received']}, 출고={regional_stats['RED']['shipped']}")
-            print(f"  GREEN: 입고={regional_stats['GREEN']['received']}, 출고={regional_stats['GREEN']['shipped']}")
-            print(f"  YELLOW: 입고={regional_stats['YELLOW']['received']}, 출고={regional_stats['YELLOW']['shipped']}")
-            
-            # main_monitor.ui에 지역별 입출고 카운트 표시할 UI 요소가 있다면 업데이트
-            # 예: 우측 상단 지역 색상별 입고/출고 현황
-            
-            # RED 지역 통계
-            if hasattr(self, 'receive_count_r'):
-                self.receive_count_r.setText(str(regional_stats['RED']['received']))
-            if hasattr(self, 'ship_count_r'):
-                self.ship_count_r.setText(str(regional_stats['RED']['shipped']))
+            for lane in STORAGE_LANES:
+                stats = regional_stats[lane['color']]
+                print(f"  {lane['color']}: 입고={stats['received']}, 출고={stats['shipped']}")
             
-            # GREEN 지역 통계
-            if hasattr(self, 'receive_count_g'):
-                self.receive_count_g.setText(str(regional_stats['GREEN']['received']))
-            if hasattr(self, 'ship_count_g'):
-                self.ship_count_g.setText(str(regional_stats['GREEN']['shipped']))
-            
-            # YELLOW 지역 통계
-            if hasattr(self, 'receive_count_y'):
-                self.receive_count_y.setText(str(regional_stats['YELLOW']['received']))
-            if hasattr(self, 'ship_count_y'):
-                self.ship_count_y.setText(str(regional_stats['YELLOW']['shipped']))
+            # 레인별 입출고 카운트 라벨 (위젯 이름 : receive_count_<레인 코드> / ship_count_<레인 코드>)
+            for lane in STORAGE_LANES:
+                stats = regional_stats[lane['color']]
+                code = lane['code'].lower()
+                if hasattr(self, f'receive_count_{code}'):
+                    getattr(self, f'receive_count_{code}').setText(str(stats['received']))
+                if hasattr(self, f'ship_count_{code}'):
+                    getattr(self, f'ship_count_{code}').setText(str(stats['shipped']))
                 
         except Exception as e:
             print(f"지역별 통계 표시 업데이트 실패: {e}")
@@ -238,7 +223,7 @@ class MainMonitorTab(QWidget, Ui_Tab):
             return
         
         # AU + RU 조합 응답인지 확인
-        if len(response_data) > 18 and response_data[:2] == b'AU' and b'RU' in response_data:
+        if len(response_data) > self.com_manager.au_frame_size and response_data[:2] == b'AU' and b'RU' in response_data:
             self.parse_combined_au_ru_response(response_data)
         else:
             # 단일 응답 처리
@@ -248,29 +233,28 @@ class MainMonitorTab(QWidget, Ui_Tab):
             if status == 0x00:  # SUCCESS
                 if command == 'AU':  # All Stock Update 응답
                     self.parse_au_response(response_data[3:-1])  # 헤더와 끝 문자 제외
+                elif command == 'RU':  # RS (색상별 통계) 응답
+                    self.parse_ru_response(response_data[3:-1])
             else:
                 print(f"명령 실패: {command}, 상태: {status:02x}")
     
     def parse_combined_au_ru_response(self, response_data):
         """AU + RU 조합 응답 파싱"""
         try:
-            # AU 응답 찾기 (18 bytes)
-            au_end = response_data.find(b'\n') + 1
-            if au_end > 0 and response_data[:2] == b'AU':
+            # AU 응답 찾기 (길이는 레인 수로 결정 : 재고 값에 0x0A 가 있을 수 있으므로 \n 으로 찾지 않음)
+            au_end = self.com_manager.au_frame_size
+            if response_data[:2] == b'AU':
                 au_data = response_data[3:au_end-1]  # AU 헤더(3) 제외, 끝(\n) 제외
-                if len(au_data) >= 14:
-                    self.parse_au_response(au_data)
+                self.parse_au_response(au_data)
             
             # RU 응답 찾기
-            ru_start = response_data.find(b'RU')
+            ru_start = response_data.find(b'RU', au_end)
             if ru_start > 0:
-                ru_end = response_data.find(b'\n', ru_start) + 1
-                if ru_end > ru_start:
-                    ru_status = response_data[ru_start + 2]
-                    if ru_status == 0x00:  # SUCCESS
-                        ru_data = response_data[ru_start + 3:ru_end-1]  # RU 헤더(3) 제외, 끝(\n) 제외
-                        if len(ru_data) >= 12:
-                            self.parse_ru_response(ru_data)
+                ru_status = response_data[ru_start + 2]
+                if ru_status == 0x00:  # SUCCESS
+                    ru_size = max(14, 4 * len(self.com_manager.lanes))  # RU 데이터 길이 (3레인 : 14바이트)
+                    ru_data = response_data[ru_start + 3:ru_start + 3 + ru_size]  # RU 헤더(3) 제외
+                    self.parse_ru_response(ru_data)
             
         except Exception as e:
             print(f"AU+RU 조합 응답 파싱 실패: {e}")
@@ -278,19 +262,13 @@ class MainMonitorTab(QWidget, Ui_Tab):
             traceback.print_exc()
     
     def parse_ru_response(self, data):
-        """RU 응답 데이터 파싱 (지역별 통계)"""
+        """RU 응답 데이터 파싱 (레인 순서의 received(2) + shipped(2))"""
         try:
-            if len(data) >= 12:
-                # RED(received:2, shipped:2) + GREEN(received:2, shipped:2) + YELLOW(received:2, shipped:2)
-                regional = struct.unpack('<HHHHHH', data[:12])
-                regional_stats = {
-                    'RED': {'received': regional[0], 'shipped': regional[1]},
-                    'GREEN': {'received': regional[2], 'shipped': regional[3]},
-                    'YELLOW': {'received': regional[4], 'shipped': regional[5]}
-                }
-                self.update_regional_display(regional_stats)
-            else:
+            regional_stats = MessageProtocol.unpack_lane_stats(data, self.com_manager.lanes)
+            if 'error' in regional_stats:
                 print(f"RU 응답 데이터 길이 부족: {len(data)} bytes")
+            else:
+                self.update_regional_display(regional_stats)
         except struct.error as e:
             print(f"RU 응답 파싱 실패: {e}")
         except Exception as e:
@@ -299,8 +277,9 @@ class MainMonitorTab(QWidget, Ui_Tab):
     def parse_au_response(self, data):
         """AU 응답 데이터 파싱"""
         try:
-            if len(data) >= 14:
-                stocks = struct.unpack('<HHHHHHH', data[:14])
+            size = self.com_manager.au_frame_size - 4
+            if len(data) >= size:
+                stocks = MessageProtocol.unpack_stock_values(data[:size])
                 self.update_stock_display(stocks)
             else:
                 print(f"AU 응답 데이터 길이 부족: {len(data)} bytes")
@@ -331,11 +310,11 @@ class MainMonitorTab(QWidget, Ui_Tab):
                     self.receive_status.setStyleSheet("color: red; font-size: 10px;")
                     return
                     
-            # RI 명령 전송
+            # RI 명령 + 전체 재고 요청 (RA) 을 함께 전송 (왕복 1회)
             print(f"RI 명령 전송 시도: 수량={quantity}")
             message = self.create_ri_command(quantity)
             print(f"생성된 메시지: {message.hex()}")
-            response = self.com_manager.send_raw_message(message)
+            response, au_response = self.com_manager.send_and_refresh(message)
             print(f"서버 응답: {response.hex() if response else 'None'}")
             
             if response and len(response) >= 4:
@@ -356,16 +335,12 @@ class MainMonitorTab(QWidget, Ui_Tab):
                 self.receive_status.setStyleSheet("color: red; font-size: 10px;")
             
             self.admin_receive.setText("0")
+            # 입고 명령후 전체 재고 반영 (함께 받은 AU)
+            if au_response:
+                self.parse_response(au_response)
             # 누적 데이터 업데이트 - QTimer를 사용하여 지연 실행
             QTimer.singleShot(500, self.update_cumulative_data)
             
-            # 입고 명령후 전체 재고 요청
-            # print(f"RA 명령 전송 시도 (물품 입고 후 업데이트)")
-            message = self.create_ra_command()
-            # print(f"생성된 메시지: {message.hex()}")
-            response = self.com_manager.send_raw_message(message)
-            # print(f"서버 응답: {response.hex() if response else 'None'}")
-            
         except ValueError as e:
             print(f"입고 요청 실패 - 입력 값 오류: {e}")
             self.receive_status.setText("실패: 입력 값 오류")
@@ -388,9 +363,9 @@ class MainMonitorTab(QWidget, Ui_Tab):
             total_quantity = r_quantity + g_quantity + y_quantity
             
             if total_quantity > 0:
-                # SI 명령 전송
+                # SI 명령 + 전체 재고 요청 (RA) 을 함께 전송 (왕복 1회)
                 message = self.create_si_command(r_quantity, g_quantity, y_quantity)
-                response = self.com_manager.send_raw_message(message)
+                response, au_response = self.com_manager.send_and_refresh(message)
                 
                 if response and len(response) >= 4:
                     command = response[:2].decode('ascii')
@@ -400,6 +375,14 @@ class MainMonitorTab(QWidget, Ui_Tab):
                         print(f"출고 요청 성공: R={r_quantity}, G={g_quantity}, Y={y_quantity}")
                         self.ship_status.setText("성공")
                         self.ship_status.setStyleSheet("color: green; font-size: 10px;")
+                    elif status == 0x04:  # BACKORDERED : 재고 입고 시 자동 출고
+                        backorders = self.com_manager.query_backorders()
+                        print(f"출고 대기 등록: R={r_quantity}, G={g_quantity}, Y={y_quantity}, 현황 {backorders}")
+                        if backorders and 'error' not in backorders:
+                            self.ship_status.setText(f"대기: {backorders['count']}건 ({backorders['oldest_age']}초)")
+                        else:
+                            self.ship_status.setText("대기: 재고 입고 시 출고")
+                        self.ship_status.setStyleSheet("color: orange; font-size: 10px;")
                     else:
                         print(f"출고 요청 실패: 상태 {status:02x}")
                         self.ship_status.setText("실패: 서버 오류")
@@ -413,15 +396,11 @@ class MainMonitorTab(QWidget, Ui_Tab):
                 self.admin_ship_r.setText("0")
                 self.admin_ship_g.setText("0")
                 self.admin_ship_y.setText("0")
+                # 출고 명령후 전체 재고 반영 (함께 받은 AU)
+                if au_response:
+                    self.parse_response(au_response)
                 # 누적 데이터 업데이트 - QTimer를 사용하여 안전하게 지연 실행
                 QTimer.singleShot(500, self.update_cumulative_data)
-                
-                # 입고 명령후 전체 재고 요청
-                # print(f"RA 명령 전송 시도 (물품 입고 후 업데이트)")
-                message = self.create_ra_command()
-                # print(f"생성된 메시지: {message.hex()}")
-                response = self.com_manager.send_raw_message(message)
-                # print(f"서버 응답: {response.hex() if response else 'None'}")
 
             else:
                 print("출고 요청 실패: 수량이 0개입니다")
@@ -8,9 +8,10 @@ from PyQt6.QtCore import Qt, QThread, pyqtSignal, QTimer
 # ComManager import (상위 경로)
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
 from communication.com_manager import ComManager
+from communication.message_protocol import MessageProtocol
 
 # Robot and RobotStatus import from stw_lib
-from stw_lib.sector_manager2 import Robot, RobotStatus, SectorName
+from stw_lib.sector_manager2 import Robot, RobotStatus, SectorName, STORAGE_LANES
 
 # 30초에 한번 시스템 모니터링
 
@@ -32,7 +33,7 @@ class SystemStatusThread(QThread):
         self._is_running = True
         
         # ComManager 인스턴스 생성
-        self.com_manager = ComManager(host='localhost', port=8100)
+        self.com_manager = ComManager(host='localhost', port=8100, lanes=[lane['color'] for lane in STORAGE_LANES])
         
         # 연결 상태 추적
         self.lms_connected = False
@@ -126,23 +127,14 @@ class SystemStatusThread(QThread):
             return None
             
         try:
-            import struct
             # RA 명령 전송
             message = b'RA' + b'\x00' * 14 + b'\n'
             response = self.com_manager.send_raw_message(message)
             
-            if response and len(response) >= 17 and response[:2] == b'AU':
-                # AU 응답 파싱 (재고 데이터)
-                stock_data = struct.unpack('<HHHHHHH', response[3:17])
-                return {
-                    'receiving': stock_data[0],
-                    'red_storage': stock_data[1],
-                    'green_storage': stock_data[2],
-                    'yellow_storage': stock_data[3],
-                    'shipping': stock_data[4],
-                    'receiving_total': stock_data[5],
-                    'shipping_total': stock_data[6]
-                }
+            au_size = self.com_manager.au_frame_size
+            if response and len(response) >= au_size and response[:2] == b'AU':
+                # AU 응답 파싱 (재고 데이터, 레인 수에 따른 가변 길이)
+                return MessageProtocol.unpack_stock_data(response[3:au_size - 1], self.com_manager.lanes)
             return None
             
         except Exception as e:
@@ -159,6 +151,9 @@ class SystemStatusThread(QThread):
             self.com_manager.disconnect()
 
 class SystemManageTab(QWidget, Ui_Tab):
+    # Robot 상태 변경 (리스너는 타이머 스레드에서도 호출되므로 시그널로 GUI 스레드에 전달)
+    robot_status_changed = pyqtSignal(object, object)
+
     def __init__(self, parent=None):
         super().__init__(parent)
         self.setupUi(self)
@@ -167,8 +162,15 @@ class SystemManageTab(QWidget, Ui_Tab):
         self.current_robot_position = 0
         self.position_names = ["입고", "R구역", "G구역", "Y구역"]
         
-        # Robot 객체 초기화
+        # Robot 객체 초기화 (상태 변경은 리스너로 받아 표시)
+        # LMS 적재 AGV 의 실제 도착은 이동 중에만 RQ 로 조회 (poll_robot)
         self.robot = Robot("AGV_Robot")
+        self.robot_arrivals = 0
+        self.robot_poll_timer = QTimer(self)
+        self.robot_poll_timer.setInterval(200)
+        self.robot_poll_timer.timeout.connect(self.poll_robot)
+        self.robot_status_changed.connect(self.on_robot_status_changed)
+        self.robot.register_listener('gui', lambda robot, old_status, new_status: self.robot_status_changed.emit(old_status, new_status))
         self.sector_mapping = {
             0: SectorName.RECEIVING,
             1: SectorName.RED_STORAGE,
@@ -177,7 +179,7 @@ class SystemManageTab(QWidget, Ui_Tab):
         }
         
         # ComManager 인스턴스 (공용)
-        self.com_manager = ComManager(host='localhost', port=8100)
+        self.com_manager = ComManager(host='localhost', port=8100, lanes=[lane['color'] for lane in STORAGE_LANES])
         
         # UI 초기화
         self.init_ui_components()
@@ -246,41 +248,85 @@ class SystemManageTab(QWidget, Ui_Tab):
         self.position_value_label.setText(display_text)
     
     def move_robot(self, target_position):
-        """로봇을 특정 위치로 이동"""
+        """
+        로봇을 특정 위치로 이동 (상태 머신 : COMMANDED -> MOVING -> ARRIVED -> IDLE)
+        LMS 응답은 명령 접수 (송신 확인) 일 뿐이므로 MOVING 까지만 진행하고,
+        도착은 LMS 적재 AGV 상태 (RQ) 의 도착 횟수가 RM 응답보다 늘었을 때 처리한다. (실제 CI 기준 구간 시간)
+        홈 복귀 (UCH) 는 AGV 가 도착 응답을 보내지 않으므로 추적하지 않음 : 송신 확인 후 위치만 갱신
+        """
         try:
-            # 슬라이더 위치 업데이트
-            self.robot_position_slider.setValue(target_position)
-            self.current_robot_position = target_position
-            self.update_position_display()
-            
-            # Robot 객체 상태 업데이트
             target_sector = self.sector_mapping[target_position]
-            self.robot.status = RobotStatus.MOVING
-            self.robot.location = target_sector
-            
-            print(f"[Robot] 상태 변경: {self.robot.status.name}, 위치: {self.robot.location.name}")
+            if target_sector == SectorName.RECEIVING:
+                self.return_home()
+                return
+            if not self.robot.command_move(target_sector):
+                return  # 이동 / 작업 중에는 새 명령을 받지 않음
+            print(f"[Robot] 상태 변경: {self.robot.status.name}, 목표: {target_sector.name}")
             
-            # LMS 서버에 로봇 이동 명령 전송
-            success = self.send_robot_move_command(target_position)
-            if success:
-                self.robot.status = RobotStatus.IDLE
-                print(f"로봇 이동 성공: {self.position_names[target_position]}")
+            # LMS 서버에 로봇 이동 명령 전송 (응답 데이터 : 송신 직전 LMS 적재 AGV 상태)
+            robot_data = self.send_robot_move_command(target_position)
+            if robot_data is not None:
+                self.robot.on_ack()
+                self.robot_arrivals = robot_data['arrivals']
+                self.robot_poll_timer.start()
             else:
-                self.robot.status = RobotStatus.IDLE
+                self.robot.fail("LMS 응답 실패")
                 print(f"로봇 이동 실패: {self.position_names[target_position]}")
                 
         except Exception as e:
-            self.robot.status = RobotStatus.IDLE
+            self.robot.fail(str(e))
             print(f"로봇 이동 오류: {e}")
+
+    def return_home(self):
+        """홈 (입고 구역) 복귀 : 명령 송신만 확인하고 도착은 추적하지 않음 (구간 기록 없음)"""
+        if self.robot.status != RobotStatus.IDLE:
+            print(f"[Robot] {self.robot.status.name} 상태에서는 이동 명령을 받을 수 없습니다.")
+            return
+        if self.send_robot_move_command(0) is None:
+            print(f"로봇 이동 실패: {self.position_names[0]}")
+            return
+        self.robot.location = SectorName.RECEIVING
+        self.robot_position_slider.setValue(0)
+        self.current_robot_position = 0
+        print("로봇 홈 복귀 명령 송신 (도착 응답 없음 : 추적하지 않음)")
+        self.update_position_display()
+
+    def poll_robot(self):
+        """이동 중 LMS 적재 AGV 상태 조회 (RQ) : 도착 횟수가 늘면 도착, LMS 쪽 이동이 실패로 끝나면 실패"""
+        if self.robot.status not in (RobotStatus.COMMANDED, RobotStatus.MOVING):
+            self.robot_poll_timer.stop()  # GUI 쪽 타임아웃 등으로 이미 종료
+            return
+        response = self.com_manager.send_raw_message(MessageProtocol.pack_command('RQ', MessageProtocol.pack_rq_data()))
+        if not response or response[:2] != b'RQ' or response[2] != 0x00:
+            return  # 일시적 응답 실패 : 다음 주기에 다시 조회 (계속 실패하면 move_timeout)
+        data = MessageProtocol.unpack_robot_data(response[3:17])
+        if data['arrivals'] != self.robot_arrivals:
+            self.robot_poll_timer.stop()
+            self.robot.target = self.sector_mapping.get(data['location'], self.robot.target)  # 실제 도착 구역
+            self.robot.on_arrived()
+        elif RobotStatus(data['status']) == RobotStatus.IDLE and data['target'] == MessageProtocol.ROBOT_NO_TARGET:
+            self.robot_poll_timer.stop()
+            self.robot.fail("LMS 적재 AGV 이동 실패 (도착 응답 없음)")
+    
+    def on_robot_status_changed(self, old_status, new_status):
+        """Robot 리스너 (GUI 스레드) : 도착하면 슬라이더를 도착 위치로 갱신 후 작업 완료, 상태 표시 갱신"""
+        if new_status == RobotStatus.ARRIVED:
+            positions = {sector: position for position, sector in self.sector_mapping.items()}
+            position = positions.get(self.robot.location, self.current_robot_position)
+            self.robot_position_slider.setValue(position)
+            self.current_robot_position = position
+            print(f"로봇 이동 성공: {self.position_names[position]}")
+            self.robot.finish()
+        self.update_position_display()
     
     def send_robot_move_command(self, position):
-        """ComManager를 통한 로봇 이동 명령 전송"""
+        """ComManager를 통한 로봇 이동 명령 전송 : 성공 시 LMS 적재 AGV 상태 (송신 직전) 반환, 실패 시 None"""
         try:
             # 연결되어 있지 않으면 연결 시도
             if not self.com_manager.is_connected:
                 if not self.com_manager.connect():
                     print("LMS 서버에 연결할 수 없습니다")
-                    return False
+                    return None
             
             # RM (Robot Move) 명령 생성 - 새로운 로봇 제어 명령
             # 메시지 형식: RM + target_position (1 byte) + padding (13 bytes) + '\n'
@@ -290,23 +336,22 @@ class SystemManageTab(QWidget, Ui_Tab):
             print(f"[Robot Move] LMS에 명령 전송: 위치 {position} ({self.position_names[position]})")
             response = self.com_manager.send_raw_message(message)
             
-            if response and len(response) >= 4:
-                command = response[:2].decode('ascii')
+            if response and len(response) >= 17:
                 status = response[2]
                 
                 if status == 0x00:  # SUCCESS
                     print(f"[Robot Move] LMS 응답: 성공")
-                    return True
+                    return MessageProtocol.unpack_robot_data(response[3:17])
                 else:
                     print(f"[Robot Move] LMS 응답: 실패 (상태 코드 {status:02x})")
-                    return False
+                    return None
             else:
                 print("[Robot Move] LMS 응답 없음 또는 잘못된 응답")
-                return False
+                return None
                     
         except Exception as e:
             print(f"[Robot Move] 명령 전송 실패: {e}")
-            return False
+            return None
     
     def test_conveyor_motor(self):
         """컨베이어 벨트 모터 테스트"""
@@ -0,0 +1,200 @@
+import time
+import threading
+from collections import deque
+from typing import Callable, Optional
+from config import ACTUATOR_SCHEDULER_CONFIG, STORAGE_BOX_PROTOCOL_CONFIG
+
+"""
+Storage Box 액추에이터 스케줄러
+
+IM.ino 의 YM/GM/RM 은 플래그만 세우고, 플래그는 STEP_MOTOR_PERIOD(500ms) 마다 한 번 소비되며
+Stepper.step() 이 끝날 때까지 loop 전체(시리얼 포함)가 멈춘다. 또한 마지막 명령이 전역 변수로 남아
+매 loop 마다 다시 처리되므로, 모터 명령 뒤에 다른 명령을 보내지 않으면 모터가 계속 반복 구동된다.
+
+따라서 스케줄러는
+  1. 모터 명령을 구역별 큐에 넣고 라운드 로빈으로 한 번에 하나씩 송신
+  2. 응답 직후 카운트 조회를 송신하여 명령 래치를 해제
+  3. 구동 창 (step_period + step_duration) 이 끝날 때까지 다음 모터 명령과 카운트 조회를 보류
+  4. 유휴 구간에는 카운트 조회(YC/GC/RC/OC)를 순환 송신
+하여 명령 병합과 카운트 조회 지연을 막고, 큐 길이와 구동 지연을 보고한다.
+"""
+
+# 모터 명령 레인 코드 (STORAGE_LANES 순서, 라운드 로빈 순서)
+LANES = tuple(command[0] for command in STORAGE_BOX_PROTOCOL_CONFIG['motor_commands'])
+POLL_COMMANDS = STORAGE_BOX_PROTOCOL_CONFIG['count_commands']
+
+
+class MotorTicket:
+  """모터 명령 1건의 진행 상태"""
+  __slots__ = ('lane', 'enqueued_at', 'acked_at', 'done_at', 'success', 'event')
+
+  def __init__(self, lane: str):
+    self.lane = lane
+    self.enqueued_at = time.monotonic()
+    self.acked_at = None
+    self.done_at = None      # 구동 창 종료 예상 시각
+    self.success = None
+    self.event = threading.Event()
+
+  def wait(self, timeout: Optional[float] = None) -> bool:
+    self.event.wait(timeout)
+    return bool(self.success)
+
+
+class ActuatorScheduler(threading.Thread):
+  def __init__(self, serial_handler, on_count: Callable = None):
+    # daemon = True 옵션으로 메인 스레드 (lms_main.py)가 종료되면 즉시 종료되도록 설정
+    super().__init__(daemon=True)
+    self.serial_handler = serial_handler
+    self.on_count = on_count  # on_count(command, count) : 카운트 조회 결과 콜백
+
+    steps = STORAGE_BOX_PROTOCOL_CONFIG['steps_per_revolution']
+    step_duration = steps * (60.0 / steps / STORAGE_BOX_PROTOCOL_CONFIG['stepper_rpm'])
+    # 응답 후 최대 step_period 안에 플래그가 소비되고, 이후 step_duration 동안 보드가 멈춤
+    self.actuation_window = (STORAGE_BOX_PROTOCOL_CONFIG['step_motor_period'] + step_duration
+                             + ACTUATOR_SCHEDULER_CONFIG['window_margin'])
+    self.request_timeout = ACTUATOR_SCHEDULER_CONFIG['request_timeout']
+    self.poll_interval = ACTUATOR_SCHEDULER_CONFIG['poll_interval']
+
+    self.queues = {lane: deque() for lane in LANES}
+    self.condition = threading.Condition()
+    self.busy_until = 0.0
+    self.next_lane = 0
+    self.next_poll = 0
+    self.last_poll_at = 0.0
+
+    samples = ACTUATOR_SCHEDULER_CONFIG['max_latency_samples']
+    self.ack_latencies = deque(maxlen=samples)      # 큐 진입 -> 보드 응답
+    self.actuation_latencies = deque(maxlen=samples)  # 큐 진입 -> 구동 완료 (예상)
+    self.counters = {'actuated': 0, 'failed': 0, 'polls': 0, 'poll_failures': 0}
+    self.is_running = False
+
+  def submit(self, lane: str) -> MotorTicket:
+    """구역(Y/G/R) 스테퍼 모터 1회 구동 요청"""
+    if lane not in self.queues:
+      raise ValueError(f"알 수 없는 구역: {lane}")
+    ticket = MotorTicket(lane)
+    with self.condition:
+      self.queues[lane].append(ticket)
+      self.condition.notify()
+    return ticket
+
+  def queue_depth(self) -> dict:
+    with self.condition:
+      return {lane: len(queue) for lane, queue in self.queues.items()}
+
+  def stats(self) -> dict:
+    """큐 길이 및 지연 통계 (ms)"""
+    def summary(samples):
+      ordered = sorted(samples)
+      if not ordered:
+        return {'count': 0, 'mean': 0.0, 'p95': 0.0, 'max': 0.0}
+      return {
+        'count': len(ordered),
+        'mean': sum(ordered) / len(ordered) * 1000,
+        'p95': ordered[max(0, int(len(ordered) * 0.95) - 1)] * 1000,
+        'max': ordered[-1] * 1000,
+      }
+    return {
+      'queue_depth': self.queue_depth(),
+      'ack_latency': summary(self.ack_latencies),
+      'actuation_latency': summary(self.actuation_latencies),
+      **self.counters,
+    }
+
+  def _next_ticket(self) -> Optional[MotorTicket]:
+    """라운드 로빈으로 다음 구역의 명령 선택 (condition 잠금 상태에서 호출)"""
+    for offset in range(len(LANES)):
+      lane = LANES[(self.next_lane + offset) % len(LANES)]
+      if self.queues[lane]:
+        self.next_lane = (LANES.index(lane) + 1) % len(LANES)
+        return self.queues[lane].popleft()
+    return None
+
+  def run(self):
+    self.is_running = True
+    while self.is_running:
+      with self.condition:
+        now = time.monotonic()
+        ticket = self._next_ticket() if now >= self.busy_until else None
+        if ticket is None:
+          # 보드가 구동 중이면 창이 끝날 때까지, 아니면 다음 카운트 조회 시각까지 대기
+          wake_at = max(self.busy_until, self.last_poll_at + self.poll_interval)
+          if wake_at > now:
+            self.condition.wait(wake_at - now)
+            continue
+      if ticket:
+        self._actuate(ticket)
+      else:
+        self._poll()
+
+  def _actuate(self, ticket: MotorTicket):
+    frame = self.serial_handler.request(f"{ticket.lane}M", self.request_timeout)
+    now = time.monotonic()
+    if frame is None or frame['flag'] != 0x01:
+      self.counters['failed'] += 1
+      ticket.success = False
+      ticket.event.set()
+      return
+
+    # 래치 해제 : 구동이 시작되기 전에 다른 명령을 보내 반복 구동을 막음
+    self.serial_handler.send(f"{ticket.lane}C")
+    ticket.acked_at = now
+    ticket.done_at = now + self.actuation_window
+    ticket.success = True
+    with self.condition:
+      self.busy_until = ticket.done_at
+    self.counters['actuated'] += 1
+    self.ack_latencies.append(ticket.acked_at - ticket.enqueued_at)
+    self.actuation_latencies.append(ticket.done_at - ticket.enqueued_at)
+    ticket.event.set()
+
+  def _poll(self):
+    command = POLL_COMMANDS[self.next_poll]
+    self.next_poll = (self.next_poll + 1) % len(POLL_COMMANDS)
+    self.last_poll_at = time.monotonic()
+    frame = self.serial_handler.request(command, self.request_timeout)
+    self.counters['polls'] += 1
+    if frame is None:
+      self.counters['poll_failures'] += 1
+      return
+    if self.on_count:
+      try:
+        self.on_count(command, frame['count'])
+      except Exception as e:
+        print(f"[스케줄러] 카운트 콜백 오류: {e}")
+
+  def stop(self):
+    """스케줄러 중지 (대기 중인 명령은 실패 처리)"""
+    self.is_running = False
+    with self.condition:
+      for queue in self.queues.values():
+        while queue:
+          ticket = queue.popleft()
+          ticket.success = False
+          ticket.event.set()
+      self.condition.notify_all()
+
+
+if __name__ == '__main__':
+  from serial_handler import SerialHandler
+  from storage_box_emulator import StorageBoxEmulator
+  # 에뮬레이터로 모터 명령 연속 송신 시 병합 여부 / 지연 측정
+  emulator = StorageBoxEmulator()
+  emulator.open()
+  emulator.start()
+  handler = SerialHandler(emulator.link_path)
+  handler.open()
+  handler.start()
+  scheduler = ActuatorScheduler(handler)
+  scheduler.start()
+
+  tickets = [scheduler.submit(lane) for lane in 'RRGYY']
+  for ticket in tickets:
+    ticket.wait(30)
+  time.sleep(scheduler.actuation_window)
+  print(f"요청 {len(tickets)}건 / 실제 구동 {emulator.stats['motor_runs']}회")
+  print(scheduler.stats())
+  scheduler.stop()
+  handler.stop()
+  emulator.stop()
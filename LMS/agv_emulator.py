@@ -0,0 +1,115 @@
+import time
+import random
+import socket
+import threading
+from config import AGV_GATEWAY_CONFIG, AGV_EMULATOR_CONFIG
+from agv_gateway import pack_packet, unpack_packet, PACKET_SIZE
+
+"""
+AGV 에뮬레이터 (UDP)
+
+- 적재 AGV (AGV_1_Jeao.ino) 의 ESP-NOW 수신 동작을 재현한다.
+  - UCR / UCG / UCY : 이동 중이 아니면 해당 구역으로 이동, 도착 시 CI 송신 (이동 중 수신한 색상 명령은 무시)
+  - UCH             : 홈 복귀 (도착 응답 없음)
+  - RM              : 수동 모드 (로그만 출력)
+- color_rate 를 설정하면 하역 AGV (AGV_2_unloading.ino) 의 색상 판별 결과(UCx)를 자동으로 발생시킨다.
+  - ESP-NOW 방송이므로 게이트웨이와 적재 AGV 가 함께 수신 : 적재 AGV 도 이동 후 CI 송신 (분류 사이클 지연 측정 가능)
+"""
+
+
+class AgvEmulator(threading.Thread):
+  def __init__(self, local=None, remote=None, seed=None):
+    super().__init__(daemon=True)
+    # 게이트웨이 설정과 반대 방향으로 바인딩
+    self.local = local or AGV_GATEWAY_CONFIG['udp_remote']
+    self.remote = remote or AGV_GATEWAY_CONFIG['udp_local']
+    self.positions = AGV_EMULATOR_CONFIG['travel_time']
+    self.jitter = AGV_EMULATOR_CONFIG['travel_jitter']
+    self.color_rate = AGV_EMULATOR_CONFIG['color_rate']
+    self.random = random.Random(seed)
+
+    self.location = 'H'
+    self.move_status = False
+    self.move_timer = None
+    self.stats = {'received': 0, 'ignored': 0, 'arrived': 0, 'colors_sent': 0}
+
+    self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    self.socket.bind(self.local)
+    self.socket.settimeout(0.1)
+    self.lock = threading.Lock()
+    self.is_running = False
+
+  def send(self, message: str):
+    self.socket.sendto(pack_packet(message), self.remote)
+
+  def travel_time(self, target: str) -> float:
+    distance = abs(self.positions[target] - self.positions[self.location])
+    return distance * (1 + self.random.uniform(-self.jitter, self.jitter))
+
+  def _on_message(self, message: str):
+    self.stats['received'] += 1
+    with self.lock:
+      if message == 'UCH':
+        self._start_move('H')
+      elif message in ('UCR', 'UCG', 'UCY') and not self.move_status:
+        self._start_move(message[2])
+      elif message.startswith('RM'):
+        print("[AGV 에뮬레이터] Robot Manual Mode")
+      else:
+        self.stats['ignored'] += 1
+
+  def _start_move(self, target: str):
+    if self.move_timer:
+      self.move_timer.cancel()
+    self.move_status = True
+    self.move_timer = threading.Timer(self.travel_time(target), self._arrive, args=(target,))
+    self.move_timer.start()
+
+  def _arrive(self, target: str):
+    with self.lock:
+      self.location = target
+      self.move_status = False
+      self.stats['arrived'] += 1
+    if target != 'H':
+      self.send('CI')
+
+  def run(self):
+    self.is_running = True
+    next_color = time.monotonic() + self._next_color_interval()
+    while self.is_running:
+      try:
+        packet, _ = self.socket.recvfrom(PACKET_SIZE * 4)
+        self._on_message(unpack_packet(packet))
+      except socket.timeout:
+        pass
+      except OSError:
+        break
+      if self.color_rate > 0 and time.monotonic() >= next_color:
+        message = 'UC' + self.random.choice('RGY')
+        self.send(message)
+        self.stats['colors_sent'] += 1
+        self._on_message(message)  # 적재 AGV 도 같은 방송을 수신 -> 이동 후 CI
+        next_color = time.monotonic() + self._next_color_interval()
+
+  def _next_color_interval(self):
+    return self.random.expovariate(self.color_rate / 60.0) if self.color_rate > 0 else 0.0
+
+  def stop(self):
+    """에뮬레이터 중지"""
+    self.is_running = False
+    if self.move_timer:
+      self.move_timer.cancel()
+    self.socket.close()
+
+
+if __name__ == '__main__':
+  emulator = AgvEmulator()
+  emulator.start()
+  print(f"AGV 에뮬레이터 실행: udp://{emulator.local[0]}:{emulator.local[1]}")
+  try:
+    while True:
+      time.sleep(5)
+      print(f"위치: {emulator.location} / 통계: {emulator.stats}")
+  except KeyboardInterrupt:
+    emulator.stop()
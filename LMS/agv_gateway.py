@@ -0,0 +1,299 @@
+import os
+import sys
+import time
+import socket
+import threading
+from typing import Callable, Dict, Optional
+from config import AGV_GATEWAY_CONFIG
+
+# stw_lib import (상위 경로)
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from stw_lib.sector_manager2 import RobotStatus, SectorName, COLOR_TO_SECTOR, CODE_TO_COLOR, STORAGE_LANES, LANE_SECTORS
+from communication.message_protocol import MessageProtocol
+
+"""
+AGV 게이트웨이
+
+- AGV 펌웨어(AGV_1_Jeao / AGV_2_unloading)가 ESP-NOW 로 주고받는 문자열 메시지를 LMS 에 연결한다.
+  - UCR / UCG / UCY : 하역 AGV 색상 판별 결과 (적재 AGV 는 해당 색상 구역으로 이동)
+  - UCH             : 홈 복귀
+  - CI              : 적재 AGV 구역 도착 (하역 AGV 서보 동작)
+  - RM              : 수동 모드
+- 전송 계층은 교체 가능 : 운영 = 시리얼 브리지 ESP32 / 테스트 = UDP 루프백 + agv_emulator.py
+- 수신 메시지는 구독자 콜백으로 비동기 전달되며, UCx -> CI 왕복으로 분류 사이클 지연을 측정한다.
+  - 사이클 시작 : LMS 가 보낸 UCx 또는 하역 AGV 가 보낸 UCx 수신 (적재 AGV 가 이동 중일 때 온 UCx 는 무시되므로 사이클로 세지 않음)
+- track_robot() : 송신 (UCx / UCH) / 도착 (CI) 이벤트로 Robot 상태 머신을 진행 (명령 -> 이동 -> 도착)
+- RobotService : TCP 명령 RM (이동) / RQ (상태 조회) 을 적재 AGV 에 연결, GUI 는 RQ 도착 횟수로 실제 도착을 확인
+"""
+
+STATUS_SUCCESS = 0x00
+STATUS_FAILURE = 0x01
+STATUS_INVALID_DATA = 0x03
+
+PACKET_SIZE = AGV_GATEWAY_CONFIG['packet_size']
+COLOR_COMMANDS = ('UCR', 'UCG', 'UCY')
+
+
+def pack_packet(message: str) -> bytes:
+  """ESP-NOW DataPacket 형식 (char value[10], NULL 종료)"""
+  return message.encode('ascii')[:PACKET_SIZE - 1].ljust(PACKET_SIZE, b'\x00')
+
+
+def unpack_packet(packet: bytes) -> str:
+  return packet.split(b'\x00', 1)[0].decode('ascii', 'replace').strip()
+
+
+class SerialBridgeTransport:
+  """브리지 ESP32 : ESP-NOW 수신 패킷을 한 줄씩 시리얼로 전달하고, 시리얼 한 줄을 ESP-NOW 로 송신"""
+  def __init__(self, device=None, baud_rate=None):
+    import serial
+    self.serial_port = serial.Serial(device or AGV_GATEWAY_CONFIG['bridge_device'],
+                                     baud_rate or AGV_GATEWAY_CONFIG['bridge_baud_rate'], timeout=0.1)
+
+  def send(self, message: str):
+    self.serial_port.write(message.encode('ascii') + b'\n')
+
+  def receive(self) -> Optional[str]:
+    line = self.serial_port.readline()
+    return line.decode('ascii', 'replace').strip() or None
+
+  def close(self):
+    self.serial_port.close()
+
+
+class UdpTransport:
+  """UDP 루프백 : 에뮬레이터와 DataPacket(10바이트)을 그대로 주고받음"""
+  def __init__(self, local=None, remote=None):
+    self.remote = remote or AGV_GATEWAY_CONFIG['udp_remote']
+    self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    self.socket.bind(local or AGV_GATEWAY_CONFIG['udp_local'])
+    self.socket.settimeout(0.1)
+
+  def send(self, message: str):
+    self.socket.sendto(pack_packet(message), self.remote)
+
+  def receive(self) -> Optional[str]:
+    try:
+      packet, _ = self.socket.recvfrom(PACKET_SIZE * 4)
+    except socket.timeout:
+      return None
+    return unpack_packet(packet) or None
+
+  def close(self):
+    self.socket.close()
+
+
+def create_transport(kind: str = None):
+  kind = kind or AGV_GATEWAY_CONFIG['transport']
+  if kind == 'serial':
+    return SerialBridgeTransport()
+  if kind == 'udp':
+    return UdpTransport()
+  raise ValueError(f"지원하지 않는 AGV 전송 방식: {kind}")
+
+
+class AgvGateway(threading.Thread):
+  def __init__(self, transport=None):
+    # daemon = True 옵션으로 메인 스레드 (lms_main.py)가 종료되면 즉시 종료되도록 설정
+    super().__init__(daemon=True)
+    self.transport = transport or create_transport()
+    self.subscribers: Dict[str, Callable] = {}
+
+    # 분류 사이클 측정 : 송신한 UCx 시각 (CI 수신 시 가장 오래된 것과 매칭)
+    self.pending_cycles = []
+    self.cycle_latencies = []
+    self.condition = threading.Condition()
+    self.last_message = None  # (수신 시각, 메시지)
+    self.is_running = False
+
+  def register_subscriber(self, name: str, callback: Callable):
+    """AGV 이벤트 콜백 등록"""
+    self.subscribers[name] = callback
+
+  def send_command(self, message: str):
+    """AGV 로 메시지 송신 (UCR / UCG / UCY / UCH / RM)"""
+    sent_at = time.monotonic()
+    if message in COLOR_COMMANDS:
+      with self.condition:
+        self.pending_cycles.append(sent_at)
+    self.transport.send(message)
+    self._notify_subscribers({'command': message, 'direction': 'tx', 'timestamp': sent_at})
+    return sent_at
+
+  def wait_for(self, message: str, after: float, timeout: float = 10.0) -> Optional[float]:
+    """after 시각 이후 message 수신까지 대기 (수신 시각 반환, 타임아웃 시 None)"""
+    deadline = time.monotonic() + timeout
+    with self.condition:
+      while True:
+        if self.last_message and self.last_message[1] == message and self.last_message[0] >= after:
+          return self.last_message[0]
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+          return None
+        self.condition.wait(remaining)
+
+  def sort_cycle(self, color: str, timeout: float = 10.0) -> Optional[float]:
+    """UC{color} 송신 후 CI 수신까지 걸린 시간 (초)"""
+    sent_at = self.send_command(f"UC{color}")
+    arrived_at = self.wait_for('CI', sent_at, timeout)
+    if arrived_at is None:
+      with self.condition:
+        if sent_at in self.pending_cycles:
+          self.pending_cycles.remove(sent_at)  # 무시된 명령 : 이후 CI 와 잘못 매칭되지 않도록 제거
+    return None if arrived_at is None else arrived_at - sent_at
+
+  def run(self):
+    self.is_running = True
+    try:
+      while self.is_running:
+        message = self.transport.receive()
+        if message:
+          self._on_message(message)
+    except Exception as e:
+      if self.is_running:
+        print(f"AGV 게이트웨이 처리 오류: {e}")
+    finally:
+      self.stop()
+
+  def _on_message(self, message: str):
+    now = time.monotonic()
+    event = {'command': message, 'direction': 'rx', 'timestamp': now}
+    with self.condition:
+      self.last_message = (now, message)
+      while self.pending_cycles and now - self.pending_cycles[0] > AGV_GATEWAY_CONFIG['cycle_timeout']:
+        self.pending_cycles.pop(0)  # CI 없이 끝난 사이클 (무시된 명령) : 이후 CI 와 잘못 매칭되지 않도록 제거
+      if message in COLOR_COMMANDS and not self.pending_cycles:
+        self.pending_cycles.append(now)  # 하역 AGV 색상 판별 결과 : 적재 AGV 가 바로 이동 (도착 시 CI)
+      elif message == 'CI' and self.pending_cycles:
+        latency = now - self.pending_cycles.pop(0)
+        self.cycle_latencies.append(latency)
+        event['cycle_latency'] = latency
+      self.condition.notify_all()
+    self._notify_subscribers(event)
+
+  def _notify_subscribers(self, event):
+    for name, callback in list(self.subscribers.items()):
+      try:
+        callback(event)
+      except Exception as e:
+        print(f"[AGV] {name} 콜백 오류: {e}")
+
+  def stop(self):
+    """게이트웨이 중지"""
+    if not self.is_running:
+      return
+    self.is_running = False
+    try:
+      self.transport.close()
+    except Exception:
+      pass
+    print("AGV 게이트웨이 종료")
+
+
+def track_robot(gateway: AgvGateway, robot):
+  """
+  AGV 게이트웨이 이벤트를 Robot 상태 머신에 연결
+
+  - UCx / UCH 송신 : command_move(목표 구역) -> on_ack() (게이트웨이 송신 완료가 송신 확인)
+  - UCx 수신       : 하역 AGV 가 적재 AGV 에 보낸 색상 명령, 송신과 같이 처리 (이동 중이면 AGV 도 무시하므로 command_move 가 거부)
+  - CI 수신        : on_arrived() (구간 이동 시간 기록)
+  - UCH 는 도착 응답이 없으므로 다음 이동 명령 송신 시점에 홈 도착으로 처리
+  """
+  targets = {f'UC{code}': COLOR_TO_SECTOR[color] for code, color in CODE_TO_COLOR.items()}
+  targets['UCH'] = SectorName.RECEIVING
+
+  def on_event(event):
+    command = event['command']
+    if command in targets and (event['direction'] == 'tx' or command in COLOR_COMMANDS):
+      if robot.status == RobotStatus.MOVING and robot.target == SectorName.RECEIVING:
+        robot.on_arrived()
+      if robot.command_move(targets[command]):
+        robot.on_ack()
+    elif event['direction'] == 'rx' and command == 'CI':
+      robot.on_arrived()
+
+  gateway.register_subscriber(f'robot:{robot.name}', on_event)
+
+
+class RobotService:
+  """
+  GUI 로봇 이동 명령 (RM) / 상태 조회 (RQ) 처리 (InventoryManager.handlers 에 등록)
+
+  - 위치 번호 : 0 입고 (홈) / 1.. 레인 순서 / 레인 수 + 1 출고 (적재 AGV 는 출고 구역으로 이동하지 않음 -> INVALID_DATA)
+  - RM : 이동 가능 상태면 UCx / UCH 송신 (track_robot 이 Robot 상태 머신 진행), 응답 데이터는 송신 직전 로봇 상태 (RQ 형식)
+  - RQ : 상태 / 위치 / 목표 / 도착 횟수 / 마지막 구간 이동 시간, GUI 는 RM 응답보다 도착 횟수가 늘면 도착으로 처리
+  - UCH 는 AGV 가 도착 응답을 보내지 않으므로 홈 복귀는 도착 횟수에 포함되지 않음 (GUI 는 송신 확인까지만 표시)
+  """
+  def __init__(self, gateway: AgvGateway, robot):
+    self.gateway = gateway
+    self.robot = robot
+    self.positions = (SectorName.RECEIVING,) + LANE_SECTORS + (SectorName.SHIPPING,)
+    self.messages = {0: 'UCH'}
+    self.messages.update({i + 1: f"UC{lane['code']}" for i, lane in enumerate(STORAGE_LANES)})
+    self.arrivals = 0
+    robot.register_listener('service', self._on_status)
+
+  def _on_status(self, robot, old_status, new_status):
+    if new_status == RobotStatus.ARRIVED:
+      self.arrivals = (self.arrivals + 1) & 0xFFFF
+
+  def handlers(self) -> Dict[str, Callable]:
+    return {'RM': self.handle_rm, 'RQ': self.handle_rq}
+
+  def robot_data(self) -> bytes:
+    robot = self.robot
+    target = self.positions.index(robot.target) if robot.status in (RobotStatus.COMMANDED, RobotStatus.MOVING) else MessageProtocol.ROBOT_NO_TARGET
+    leg = robot.history[-1] if robot.history else None
+    leg_ms = leg.duration * 1000 if leg is not None and leg.duration is not None else 0
+    return MessageProtocol.pack_robot_data(robot.status.value, self.positions.index(robot.location), target, self.arrivals, leg_ms)
+
+  def handle_rm(self, data: bytes) -> bytes:
+    """RM : Data[0] = 위치 번호 -> 적재 AGV 이동 명령 송신 (이동 중이면 실패, 홈 복귀 중에는 새 명령 허용)"""
+    message = self.messages.get(data[0])
+    if message is None:
+      return MessageProtocol.pack_response('RM', STATUS_INVALID_DATA)
+    robot = self.robot
+    returning = robot.status == RobotStatus.MOVING and robot.target == SectorName.RECEIVING
+    if robot.status not in (RobotStatus.IDLE, RobotStatus.ARRIVED) and not returning:
+      return MessageProtocol.pack_response('RM', STATUS_FAILURE)
+    before = self.robot_data()
+    try:
+      self.gateway.send_command(message)
+    except Exception as e:
+      print(f"[AGV] RM 송신 실패: {e}")
+      return MessageProtocol.pack_response('RM', STATUS_FAILURE)
+    return MessageProtocol.pack_response('RM', STATUS_SUCCESS, before)
+
+  def handle_rq(self, data: bytes) -> bytes:
+    """RQ : 적재 AGV 상태 조회"""
+    return MessageProtocol.pack_response('RQ', STATUS_SUCCESS, self.robot_data())
+
+
+if __name__ == '__main__':
+  from agv_emulator import AgvEmulator
+  from stw_lib.sector_manager2 import Robot
+  # 사용법 : python agv_gateway.py [사이클 수] : UDP 에뮬레이터로 분류 사이클 지연 측정
+  emulator = AgvEmulator()
+  emulator.start()
+  gateway = AgvGateway()
+  gateway.start()
+  robot = Robot("AGV_1")
+  robot.register_listener('log', lambda robot, old, new: print(f"  [{robot.name}] {old.name} -> {new.name} ({robot.location.name})"))
+  track_robot(gateway, robot)
+
+  rounds = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+  started = time.monotonic()
+  for i in range(rounds):
+    latency = gateway.sort_cycle('RGY'[i % 3])
+    print(f"사이클 {i + 1}: {'타임아웃' if latency is None else f'{latency:.3f}s'}")
+  elapsed = time.monotonic() - started
+  latencies = sorted(gateway.cycle_latencies)
+  if latencies:
+    print(f"평균 {sum(latencies) / len(latencies):.3f}s, 최대 {latencies[-1]:.3f}s, "
+          f"처리량 {len(latencies) / elapsed * 3600:.0f}개/시간")
+  for (source, target), durations in robot.leg_durations().items():
+    print(f"구간 {source.name} -> {target.name}: {len(durations)}회, 평균 {sum(durations) / len(durations):.3f}s")
+  gateway.send_command('UCH')
+  gateway.stop()
+  emulator.stop()
@@ -0,0 +1,366 @@
+import os
+import sys
+import time
+import zlib
+import struct
+import threading
+from collections import deque, OrderedDict
+from typing import Callable, Optional
+
+# stw_lib / communication import (상위 경로)
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from stw_lib.sector_manager2 import STORAGE_LANES, LANE_COLORS
+from communication.message_protocol import MessageProtocol
+from config import BACKORDER_CONFIG
+
+"""
+출고 대기 주문 큐 (backorder)
+
+- 재고 부족으로 실패한 SI 주문 (레인 용량 안의 수량) 은 실패 응답 대신 대기 주문으로 보관하고 BACKORDERED 로 응답한다.
+- 대기 주문은 부족한 색상 1개 (blocking color) 의 대기열에만 등록된다. (색상별 FIFO)
+- 재고 이벤트에서 레인 재고가 늘어난 색상의 대기열만 앞에서부터 확인한다. (전체 재검사 / 주기 조회 없음)
+  - 그 색상 수량이 채워진 주문은 다른 색상을 확인해 부족하면 그 색상 대기열로 옮기고, 모두 채워지면 출고 대상으로 꺼낸다.
+  - 앞 주문이 채워지지 않으면 뒤 주문은 확인하지 않는다. (먼저 들어온 주문 우선)
+  - 꺼낸 주문의 수량은 출고 전까지 예약으로 잡아 같은 재고로 다른 주문을 깨우지 않는다.
+- 꺼낸 주문은 스레드에서 dispatcher(orders) (InventoryManager.ship_batch) 로 한 번에 출고, 그사이 재고가 빠져 실패하면 다시 대기
+  - 실패한 주문은 부족한 색상 대기열 앞으로 되돌리고 (FIFO 순서 유지), 예약이 풀린 색상의 대기열을 다시 확인한다.
+- 대기 주문은 파일 (path) 에 보관 : 등록 시 기록 (fsync) 후 BACKORDERED 응답, 재시작 시 다시 대기열에 등록
+  - 출고 대상으로 꺼낸 주문은 출고 전에 파일에서 지운다. (출고 중 종료되면 그 주문은 재시작 후 다시 출고되지 않음, 중복 출고 없음)
+  - 파일 : MAGIC(4) + 주문 수(4) + 레인 수(2) + 주문 (번호(8) + 등록 시각(8, unix 초) + 레인별 수량(2 x 레인 수)) + CRC32(4)
+- query_frame() : BQ 응답 (BU) = 대기 주문 수(2) + 가장 오래된 주문 대기 시간(2, 초) + 색상별 대기 주문 수(2 x 레인 수)
+"""
+
+STATUS_SUCCESS = 0x00
+
+FILE_MAGIC = b'LMSB'
+FILE_HEADER = struct.Struct('<4sIH')
+
+CAPACITIES = [lane['capacity'] for lane in STORAGE_LANES]
+
+
+class Backorder:
+  """대기 주문 1건"""
+  __slots__ = ('order_id', 'quantities', 'created_at')
+
+  def __init__(self, order_id: int, quantities: list):
+    self.order_id = order_id
+    self.quantities = quantities   # 레인 순서의 수량
+    self.created_at = time.monotonic()
+
+  @property
+  def order(self) -> dict:
+    return {color: quantity for color, quantity in zip(LANE_COLORS, self.quantities) if quantity}
+
+
+class BackorderQueue(threading.Thread):
+  def __init__(self, dispatcher: Callable = None, path: str = None):
+    """
+    Args:
+        dispatcher: dispatcher(orders) -> [성공 여부, ...] : 주문 목록을 한 번에 출고 (InventoryManager.ship_batch)
+        path: 대기 주문 파일 (None 이면 BACKORDER_CONFIG['path'], 상대 경로는 LMS 폴더 기준, '' 이면 메모리에만 유지)
+    """
+    # daemon = True 옵션으로 메인 스레드 (lms_main.py)가 종료되면 즉시 종료되도록 설정
+    super().__init__(daemon=True)
+    self.dispatcher = dispatcher
+    self.preempt = None  # 선점 지점 콜백 (CommandScheduler.yield_point) : 출고 배치 사이에서 control 명령에 양보
+    self.max_backorders = BACKORDER_CONFIG['max_backorders']
+
+    self.waiting = [deque() for _ in STORAGE_LANES]   # 색상별 대기열 (주문은 부족한 색상 1곳에만 등록)
+    self.orders = OrderedDict()                       # 주문 번호 -> 대기 주문 (등록 순서 = 오래된 순서)
+    self.ready = deque()                              # 재고가 채워져 출고를 기다리는 주문
+    self.reserved = [0] * len(STORAGE_LANES)          # ready 주문의 색상별 수량
+    self.lane_stock = [0] * len(STORAGE_LANES)
+    self.next_id = 0
+
+    self.condition = threading.Condition()
+    self.wait_times = deque(maxlen=BACKORDER_CONFIG['max_wait_samples'])  # 등록 -> 출고 (초)
+    self.counters = {'held': 0, 'rejected': 0, 'woken': 0, 'shipped': 0, 'requeued': 0}
+    self.is_running = False
+
+    path = BACKORDER_CONFIG['path'] if path is None else path
+    if path and not os.path.isabs(path):
+      path = os.path.join(os.path.dirname(os.path.abspath(__file__)), path)
+    self.path = path
+    self.io_lock = threading.Lock()
+    self.version = 0          # 파일에 쓸 대기 주문 목록 버전 (condition 잠금 상태에서 증가)
+    self.saved_version = 0    # 파일에 기록한 버전 (io_lock) : 늦게 도착한 이전 버전은 쓰지 않음
+    self.restored = self._load()  # 이전 실행의 대기 주문 (run 시작 시 현재 재고 기준으로 대기열에 등록)
+
+  # --- 등록 ---
+  def hold(self, order: dict) -> bool:
+    """
+    재고 부족으로 실패한 주문 보관 ({색상: 수량})
+
+    Returns:
+        False : 빈 주문 / 레인 용량을 넘는 수량 (재고가 들어와도 채울 수 없음) / 대기 주문이 가득 참 / 파일 기록 실패
+    """
+    quantities = [order.get(color, 0) for color in LANE_COLORS]
+    with self.condition:
+      if not any(quantities) or any(q > capacity for q, capacity in zip(quantities, CAPACITIES)) \
+          or len(self.orders) >= self.max_backorders:
+        self.counters['rejected'] += 1
+        return False
+      self.next_id += 1
+      backorder = Backorder(self.next_id, quantities)
+      self.orders[backorder.order_id] = backorder
+      pending = self._pending_snapshot()
+    saved = self._save(*pending)  # 파일에 남긴 뒤에 출고 대상으로 (기록 실패 시 출고되지 않은 상태로 제거)
+    with self.condition:
+      if not saved:
+        del self.orders[backorder.order_id]
+        self.counters['rejected'] += 1
+        return False  # 재시작 시 사라질 주문은 BACKORDERED 로 응답하지 않음
+      self.counters['held'] += 1
+      self._place(backorder)  # 실패 이후 이미 재고가 들어왔으면 바로 출고 대상
+    return True
+
+  def _shortage(self, backorder: Backorder) -> Optional[int]:
+    """재고 (예약 제외) 가 부족한 첫 색상 인덱스, 모두 채워지면 None (condition 잠금 상태에서 호출)"""
+    for lane, quantity in enumerate(backorder.quantities):
+      if quantity and quantity + self.reserved[lane] > self.lane_stock[lane]:
+        return lane
+    return None
+
+  def _place(self, backorder: Backorder):
+    """부족한 색상 대기열에 등록하거나, 모두 채워졌으면 예약 후 출고 대상으로 (condition 잠금 상태에서 호출)"""
+    lane = self._shortage(backorder)
+    if lane is not None:
+      self.waiting[lane].append(backorder)
+      return
+    for i, quantity in enumerate(backorder.quantities):
+      self.reserved[i] += quantity
+    self.ready.append(backorder)
+    self.counters['woken'] += 1
+    self.condition.notify()
+
+  # --- 재고 이벤트 ---
+  def on_inventory_event(self, event: dict):
+    """InventoryManager 재고 이벤트 구독 : 재고가 늘어난 색상의 대기열만 확인"""
+    with self.condition:
+      self.lane_stock = list(event['lane_stock'])
+      for lane, received in enumerate(event['lane_received']):
+        if received:
+          self._wake(lane)
+
+  def _wake(self, lane: int):
+    queue = self.waiting[lane]
+    while queue:
+      backorder = queue[0]
+      if backorder.quantities[lane] + self.reserved[lane] > self.lane_stock[lane]:
+        return  # 먼저 들어온 주문이 채워질 때까지 뒤 주문은 대기
+      queue.popleft()
+      self._place(backorder)
+
+  # --- 출고 ---
+  def run(self):
+    self.is_running = True
+    with self.condition:
+      for backorder in self.restored:
+        self._place(backorder)
+    if self.restored:
+      print(f"[대기 주문] 이전 실행의 대기 주문 {len(self.restored)}건 복구")
+      self.restored = []
+    while self.is_running:
+      with self.condition:
+        while self.is_running and not self.ready:
+          self.condition.wait()
+        batch = list(self.ready)
+        self.ready.clear()
+        for backorder in batch:
+          del self.orders[backorder.order_id]  # 출고 전에 파일에서 제거 (출고 중 종료되어도 중복 출고 없음)
+        pending = self._pending_snapshot()
+      if batch:
+        self._save(*pending)
+        self._dispatch(batch)
+        if self.preempt is not None:
+          self.preempt()
+
+  def _dispatch(self, batch):
+    try:
+      results = self.dispatcher([backorder.order for backorder in batch])
+    except Exception as e:
+      print(f"[대기 주문] 출고 처리 오류: {e}")
+      results = [False] * len(batch)
+    now = time.monotonic()
+    failed = []
+    with self.condition:
+      released = set()
+      for backorder, success in zip(batch, results):
+        for i, quantity in enumerate(backorder.quantities):
+          self.reserved[i] -= quantity
+        if success:
+          self.counters['shipped'] += 1
+          self.wait_times.append(now - backorder.created_at)
+        else:
+          failed.append(backorder)
+          released.update(i for i, quantity in enumerate(backorder.quantities) if quantity)
+      if not failed:
+        return
+      # 출고 전에 재고가 빠짐 : 부족한 색상 대기열 앞으로 되돌림 (먼저 들어온 순서 유지, 앞 주문이 맨 앞에 오도록 역순으로)
+      for backorder in failed:
+        self.orders[backorder.order_id] = backorder
+      self.orders = OrderedDict(sorted(self.orders.items()))  # 등록 순서 (가장 오래된 주문 = 첫 항목) 유지
+      stalled = set()
+      for backorder in reversed(failed):
+        self.counters['requeued'] += 1
+        lane = self._shortage(backorder)
+        if lane is None:  # 재고 이벤트가 아직 반영되지 않음 : 첫 색상 대기열에서 다음 입고까지 대기 (즉시 재출고 반복 방지)
+          lane = next(i for i, quantity in enumerate(backorder.quantities) if quantity)
+          stalled.add(lane)
+        self.waiting[lane].appendleft(backorder)
+      for lane in released - stalled:
+        self._wake(lane)  # 예약이 풀린 재고로 채워지는 다른 대기 주문
+      pending = self._pending_snapshot()
+    self._save(*pending)
+
+  # --- 대기 주문 파일 ---
+  def _pending_snapshot(self):
+    """파일에 쓸 (버전, 대기 주문 목록) (condition 잠금 상태에서 호출)"""
+    self.version += 1
+    return self.version, [(backorder.order_id, backorder.created_at, backorder.quantities) for backorder in self.orders.values()]
+
+  def _save(self, version: int, orders) -> bool:
+    """대기 주문 목록 기록 (임시 파일 -> fsync -> rename, 잠금 밖에서 호출), 실패 시 False"""
+    if not self.path:
+      return True
+    lanes = len(STORAGE_LANES)
+    offset = time.time() - time.monotonic()
+    body = FILE_HEADER.pack(FILE_MAGIC, len(orders), lanes) + b''.join(
+      struct.pack(f'<Qd{lanes}H', order_id, created_at + offset, *quantities) for order_id, created_at, quantities in orders)
+    with self.io_lock:
+      if version <= self.saved_version:
+        return True  # 더 최신 목록이 이미 기록됨
+      temp = self.path + '.tmp'
+      try:
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with open(temp, 'wb') as f:
+          f.write(body + struct.pack('<I', zlib.crc32(body)))
+          f.flush()
+          os.fsync(f.fileno())
+        os.replace(temp, self.path)
+      except OSError as e:
+        print(f"[대기 주문] 파일 기록 실패: {e}")
+        return False
+      self.saved_version = version
+    return True
+
+  def _load(self) -> list:
+    """이전 실행의 대기 주문 로드 (orders 에 등록), 로드한 주문 목록 반환"""
+    if not self.path or not os.path.exists(self.path):
+      return []
+    with open(self.path, 'rb') as f:
+      data = f.read()
+    try:
+      if len(data) < FILE_HEADER.size + 4 or zlib.crc32(data[:-4]) != struct.unpack('<I', data[-4:])[0]:
+        raise ValueError("CRC 불일치")
+      magic, count, lanes = FILE_HEADER.unpack_from(data)
+      if magic != FILE_MAGIC:
+        raise ValueError("형식 불일치")
+      record = struct.Struct(f'<Qd{lanes}H')
+      records = [record.unpack_from(data, FILE_HEADER.size + i * record.size) for i in range(count)]
+    except (ValueError, struct.error) as e:
+      print(f"[대기 주문] 파일 로드 실패: {e}")
+      return []
+    offset = time.time() - time.monotonic()
+    for order_id, created, *quantities in records:
+      # 레인 구성이 바뀌었으면 레인 순서대로 맞추고 남는 레인은 버림
+      quantities = (quantities + [0] * len(STORAGE_LANES))[:len(STORAGE_LANES)]
+      backorder = Backorder(order_id, quantities)
+      backorder.created_at = created - offset
+      self.orders[order_id] = backorder
+      self.next_id = max(self.next_id, order_id)
+    return list(self.orders.values())
+
+  # --- 조회 ---
+  def depth(self) -> list:
+    """색상별 대기 주문 수 (출고 대기 중인 주문은 제외)"""
+    with self.condition:
+      return [len(queue) for queue in self.waiting]
+
+  def oldest_age(self) -> float:
+    with self.condition:
+      if not self.orders:
+        return 0.0
+      return time.monotonic() - next(iter(self.orders.values())).created_at
+
+  def query_frame(self) -> bytes:
+    """BQ 응답 프레임 (BU)"""
+    with self.condition:
+      count = len(self.orders)
+    data = MessageProtocol.pack_backorder_data(count, self.oldest_age(), self.depth())
+    return MessageProtocol.pack_variable_response('BU', STATUS_SUCCESS, data)
+
+  def stats(self) -> dict:
+    """대기 주문 수, 색상별 대기열 길이, 대기 시간 (초) 통계"""
+    ordered = sorted(self.wait_times)
+    wait_time = {'count': 0, 'mean': 0.0, 'p95': 0.0, 'max': 0.0}
+    if ordered:
+      wait_time = {
+        'count': len(ordered),
+        'mean': sum(ordered) / len(ordered),
+        'p95': ordered[max(0, int(len(ordered) * 0.95) - 1)],
+        'max': ordered[-1],
+      }
+    with self.condition:
+      pending = len(self.orders)
+    return {
+      'pending': pending,
+      'depth': dict(zip((color.name for color in LANE_COLORS), self.depth())),
+      'oldest_age': self.oldest_age(),
+      'wait_time': wait_time,
+      **self.counters,
+    }
+
+  def stop(self):
+    self.is_running = False
+    with self.condition:
+      self.condition.notify_all()
+
+
+if __name__ == '__main__':
+  import random
+  # 빈 레인에 대기 주문을 쌓은 뒤 1개씩 입고 : 주문이 재고 도착 시 깨어나 출고되는지 / 대기 시간 확인
+  stock = [0] * len(STORAGE_LANES)
+  queue = BackorderQueue(path='')  # 데모 : 파일 기록 없음
+
+  def publish(received):
+    queue.on_inventory_event({'lane_stock': list(stock), 'lane_received': received})
+
+  def dispatcher(orders):
+    results = []
+    for order in orders:
+      quantities = [order.get(color, 0) for color in LANE_COLORS]
+      success = all(q <= s for q, s in zip(quantities, stock))
+      if success:
+        for i, quantity in enumerate(quantities):
+          stock[i] -= quantity
+      results.append(success)
+    publish([0] * len(STORAGE_LANES))
+    return results
+
+  queue.dispatcher = dispatcher
+  queue.start()
+  rng = random.Random(0)
+  orders = 300
+  for _ in range(orders):
+    order = {color: rng.randrange(2) for color in LANE_COLORS}
+    order[rng.choice(LANE_COLORS)] = 1
+    queue.hold(order)
+  started = time.perf_counter()
+  arrivals = 0
+  deadline = time.monotonic() + 10
+  while queue.counters['shipped'] < queue.counters['held'] and time.monotonic() < deadline:
+    lane = rng.randrange(len(STORAGE_LANES))
+    if stock[lane] < CAPACITIES[lane]:
+      stock[lane] += 1
+      arrivals += 1
+      received = [0] * len(STORAGE_LANES)
+      received[lane] = 1
+      publish(received)
+    time.sleep(0.0005)
+  elapsed = time.perf_counter() - started
+  print(f"대기 주문 {queue.counters['held']}건 / 입고 {arrivals}개 -> 출고 {queue.counters['shipped']}건 "
+        f"(재대기 {queue.counters['requeued']}건), {elapsed:.2f}초")
+  print(MessageProtocol.unpack_backorder_data(queue.query_frame()[3:-1], [color.name for color in LANE_COLORS]))
+  print(queue.stats())
+  queue.stop()
@@ -0,0 +1,304 @@
+import os
+import sys
+import bisect
+import time
+import threading
+from collections import deque
+from typing import Callable, Optional
+
+# communication import (상위 경로)
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from communication.message_protocol import MessageProtocol
+from config import COMMAND_SCHEDULER_CONFIG
+
+"""
+LMS 명령 우선순위 스케줄러
+
+- TCP 명령을 우선순위별 큐에 넣고 워커 스레드가 처리한다. (클라이언트 스레드는 자기 명령의 응답을 기다림 -> 연결별 순서 유지)
+  - 0 control   : RH / IR / IS / IH / IA (복귀 / 초기화)
+  - 1 operator  : RI / SI / RS / BQ 등 작업자 명령 (기본값)
+  - 2 telemetry : RA 주기 조회, KS 구독
+- 워커는 큐 앞 명령 중 (우선순위 - 대기 시간 / aging_interval) 이 가장 작은 것을 꺼낸다.
+  (낮은 우선순위 명령도 aging_interval 마다 한 단계씩 올라가므로 굶지 않음)
+- control 전용 워커 1개 : 일반 워커가 모두 RI / SI 를 처리 중이어도 control 명령은 바로 시작,
+  control 명령이 대기 / 처리 중인 동안 일반 워커는 새 명령을 꺼내지 않음
+- 선점 지점 (yield_point) : 여러 단계로 나뉜 작업 (RI 대량 투입 등) 이 단계 사이 (트랜잭션 락을 놓은 상태) 에서 호출하면
+  대기 / 처리 중인 control 명령이 끝날 때까지 (최대 preempt_timeout) 기다린 뒤 이어서 진행
+- 대기 명령이 max_queue 개 이상이면 새 명령은 큐에 넣지 않고 BUSY 응답 (control 명령은 항상 접수)
+  (과부하에서도 대기 시간 상한 = max_queue x 처리 시간 / 워커 수, 메모리도 고정)
+- stats() : 우선순위별 대기 시간 / 처리 시간 (큐 진입 -> 응답) 히스토그램 (ms 구간)
+"""
+
+PRIORITY_CONTROL = 0
+PRIORITY_OPERATOR = 1
+PRIORITY_TELEMETRY = 2
+PRIORITY_NAMES = ('control', 'operator', 'telemetry')
+
+
+class CommandTicket:
+  """명령 1건의 진행 상태"""
+  __slots__ = ('client_address', 'message', 'command', 'priority', 'enqueued_at', 'started_at', 'done_at',
+               'response', 'event')
+
+  def __init__(self, client_address, message: bytes, command: str, priority: int):
+    self.client_address = client_address
+    self.message = message
+    self.command = command
+    self.priority = priority
+    self.enqueued_at = time.monotonic()
+    self.started_at = None
+    self.done_at = None
+    self.response = None
+    self.event = threading.Event()
+
+
+class LatencyHistogram:
+  """고정 구간 (ms) 누적 히스토그램 : 기록 O(log 구간 수), 백분위수는 구간 상한으로 근사"""
+  __slots__ = ('bounds', 'counts', 'total', 'maximum')
+
+  def __init__(self, bounds):
+    self.bounds = list(bounds)
+    self.counts = [0] * (len(self.bounds) + 1)   # 마지막 칸 : 최대 구간 초과
+    self.total = 0.0
+    self.maximum = 0.0
+
+  def add(self, milliseconds: float):
+    self.counts[bisect.bisect_left(self.bounds, milliseconds)] += 1
+    self.total += milliseconds
+    self.maximum = max(self.maximum, milliseconds)
+
+  def percentile(self, q: float) -> float:
+    count = sum(self.counts)
+    if not count:
+      return 0.0
+    rank, seen = q * count, 0
+    for i, bucket in enumerate(self.counts):
+      seen += bucket
+      if seen >= rank:
+        return self.bounds[i] if i < len(self.bounds) else self.maximum
+    return self.maximum
+
+  def summary(self) -> dict:
+    count = sum(self.counts)
+    return {
+      'count': count,
+      'mean': self.total / count if count else 0.0,
+      'p50': self.percentile(0.5),
+      'p95': self.percentile(0.95),
+      'max': self.maximum,
+      'histogram': {f"<={bound}" if i < len(self.bounds) else f">{self.bounds[-1]}": bucket
+                    for i, (bound, bucket) in enumerate(zip(self.bounds + [self.bounds[-1]], self.counts))},
+    }
+
+
+class CommandScheduler(threading.Thread):
+  def __init__(self, command_handler: Callable = None):
+    """
+    Args:
+        command_handler: command_handler(client_address, message) -> bytes (InventoryManager.handle_command)
+    """
+    # daemon = True 옵션으로 메인 스레드 (lms_main.py)가 종료되면 즉시 종료되도록 설정
+    super().__init__(daemon=True)
+    self.command_handler = command_handler
+    self.config = COMMAND_SCHEDULER_CONFIG
+    self.priorities = self.config['priorities']
+    self.aging_interval = self.config['aging_interval']
+    self.max_queue = self.config['max_queue']
+
+    self.queues = [deque() for _ in PRIORITY_NAMES]
+    self.condition = threading.Condition()
+    self.control_active = 0   # 처리 중인 control 명령 수
+    self.workers = []
+
+    bounds = self.config['histogram_bounds']
+    self.wait_histograms = [LatencyHistogram(bounds) for _ in PRIORITY_NAMES]     # 큐 진입 -> 처리 시작
+    self.latency_histograms = [LatencyHistogram(bounds) for _ in PRIORITY_NAMES]  # 큐 진입 -> 응답
+    self.counters = {'executed': 0, 'aged': 0, 'preempted': 0, 'rejected': 0}
+    self.is_running = False
+
+  def priority_of(self, command: str) -> int:
+    return self.priorities.get(command, PRIORITY_OPERATOR)
+
+  # --- 명령 등록 ---
+  def submit(self, client_address, message: bytes) -> Optional[CommandTicket]:
+    """명령을 우선순위 큐에 추가, 대기 명령이 max_queue 개 이상이면 None (control 명령 제외)"""
+    command = message[:2].decode('ascii', errors='replace')
+    ticket = CommandTicket(client_address, message, command, self.priority_of(command))
+    with self.condition:
+      if ticket.priority != PRIORITY_CONTROL and sum(len(queue) for queue in self.queues) >= self.max_queue:
+        self.counters['rejected'] += 1
+        return None
+      self.queues[ticket.priority].append(ticket)
+      self.condition.notify_all()
+    return ticket
+
+  def execute(self, client_address, message: bytes) -> Optional[bytes]:
+    """TCPHandler 콜백 : 명령을 큐에 넣고 처리 결과 (응답 바이트) 를 기다림"""
+    ticket = self.submit(client_address, message)
+    if ticket is None:
+      return MessageProtocol.pack_response(message[:2].decode('ascii', errors='replace'), MessageProtocol.STATUS_BUSY)
+    ticket.event.wait()
+    return ticket.response
+
+  # --- 명령 선택 ---
+  def _next_ticket(self, control_only: bool) -> Optional[CommandTicket]:
+    """(우선순위 - 대기 시간 / aging_interval) 가 가장 작은 큐 앞 명령 (condition 잠금 상태에서 호출)"""
+    control = self.queues[PRIORITY_CONTROL]
+    if control_only:
+      return control.popleft() if control else None
+    if control or self.control_active:
+      return None  # control 명령이 끝날 때까지 새 명령을 시작하지 않음 (트랜잭션 락 경쟁 방지)
+    now = time.monotonic()
+    best, best_score = None, None
+    for priority, queue in enumerate(self.queues):
+      if queue:
+        score = priority - (now - queue[0].enqueued_at) / self.aging_interval
+        if best_score is None or score < best_score:
+          best, best_score = priority, score
+    if best is None:
+      return None
+    if any(self.queues[priority] for priority in range(best)):
+      self.counters['aged'] += 1  # 오래 기다린 낮은 우선순위 명령이 앞섬
+    return self.queues[best].popleft()
+
+  def _worker(self, control_only: bool):
+    while self.is_running:
+      with self.condition:
+        ticket = self._next_ticket(control_only)
+        while ticket is None and self.is_running:
+          self.condition.wait()
+          ticket = self._next_ticket(control_only)
+        if ticket is None:
+          return
+        if ticket.priority == PRIORITY_CONTROL:
+          self.control_active += 1
+      self._execute(ticket)
+
+  def _execute(self, ticket: CommandTicket):
+    ticket.started_at = time.monotonic()
+    try:
+      ticket.response = self.command_handler(ticket.client_address, ticket.message) if self.command_handler else None
+    except Exception as e:
+      print(f"[스케줄러] {ticket.command} 처리 오류: {e}")
+      ticket.response = None
+    ticket.done_at = time.monotonic()
+    with self.condition:
+      if ticket.priority == PRIORITY_CONTROL:
+        self.control_active -= 1
+      self.counters['executed'] += 1
+      self.wait_histograms[ticket.priority].add((ticket.started_at - ticket.enqueued_at) * 1000)
+      self.latency_histograms[ticket.priority].add((ticket.done_at - ticket.enqueued_at) * 1000)
+      self.condition.notify_all()
+    ticket.event.set()
+
+  # --- 선점 지점 ---
+  def yield_point(self):
+    """
+    여러 단계 작업의 단계 사이 (트랜잭션 락을 놓은 상태) 에서 호출 : control 명령이 대기 / 처리 중이면 끝날 때까지 양보
+    control 워커 스레드에서 호출되면 (control 명령 자신) 기다리지 않음
+    """
+    if threading.current_thread() is self or not self.is_running:
+      return
+    with self.condition:
+      if not (self.queues[PRIORITY_CONTROL] or self.control_active):
+        return
+      self.counters['preempted'] += 1
+      deadline = time.monotonic() + self.config['preempt_timeout']
+      while self.queues[PRIORITY_CONTROL] or self.control_active:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+          return
+        self.condition.wait(remaining)
+
+  # --- 실행 / 통계 ---
+  def run(self):
+    """이 스레드는 control 전용 워커, 일반 워커는 workers 개를 따로 시작"""
+    self.is_running = True
+    for i in range(self.config['workers']):
+      worker = threading.Thread(target=self._worker, args=(False,), name=f"CommandWorker-{i}", daemon=True)
+      worker.start()
+      self.workers.append(worker)
+    self._worker(True)
+
+  def queue_depth(self) -> dict:
+    with self.condition:
+      return {name: len(queue) for name, queue in zip(PRIORITY_NAMES, self.queues)}
+
+  def stats(self) -> dict:
+    """우선순위별 큐 길이, 대기 / 처리 시간 (ms) 히스토그램"""
+    with self.condition:
+      return {
+        'queue_depth': {name: len(queue) for name, queue in zip(PRIORITY_NAMES, self.queues)},
+        'wait_time': {name: histogram.summary() for name, histogram in zip(PRIORITY_NAMES, self.wait_histograms)},
+        'latency': {name: histogram.summary() for name, histogram in zip(PRIORITY_NAMES, self.latency_histograms)},
+        **self.counters,
+      }
+
+  def stop(self):
+    """스케줄러 중지 (대기 중인 명령은 응답 없이 종료)"""
+    self.is_running = False
+    with self.condition:
+      for queue in self.queues:
+        while queue:
+          queue.popleft().event.set()
+      self.condition.notify_all()
+
+
+if __name__ == '__main__':
+  import sys
+  import random
+  # 사용법 : python command_scheduler.py [시간(초)]
+  # RI / SI 부하 (트랜잭션 락 점유) + RA 주기 조회 중 RH / IA 응답 시간 비교 : FIFO (기존 클라이언트 스레드 직접 처리) / 우선순위 스케줄러
+  duration = float(sys.argv[1]) if len(sys.argv) > 1 else 5.0
+  work_time = {'RI': 0.02, 'SI': 0.01, 'RA': 0.0005, 'RH': 0.001, 'IA': 0.002}
+  chunks = 4  # RI 는 선점 지점으로 나뉜 4 단계
+
+  def measure(use_scheduler: bool):
+    lock = threading.Lock()   # SectorManager 트랜잭션 락
+    scheduler = CommandScheduler()
+
+    def handler(client_address, message):
+      command = message[:2].decode()
+      steps = chunks if command == 'RI' else 1
+      for step in range(steps):
+        if step and use_scheduler:
+          scheduler.yield_point()
+        with lock:
+          time.sleep(work_time[command] / steps)
+      return message
+
+    scheduler.command_handler = handler
+    if use_scheduler:
+      scheduler.start()
+    execute = scheduler.execute if use_scheduler else handler
+    latencies = {'RH': [], 'IA': [], 'RA': [], 'RI': []}
+    stop_at = time.monotonic() + duration
+
+    def client(commands, interval, seed):
+      rng = random.Random(seed)
+      while time.monotonic() < stop_at:
+        command = rng.choice(commands)
+        started = time.monotonic()
+        execute(('127.0.0.1', seed), command.encode() + b'\x00' * 14 + b'\n')
+        if command in latencies:
+          latencies[command].append((time.monotonic() - started) * 1000)
+        time.sleep(interval)
+
+    threads = [threading.Thread(target=client, args=(['RI', 'SI'], 0.005, i)) for i in range(6)]
+    threads += [threading.Thread(target=client, args=(['RA'], 0.05, 100 + i)) for i in range(3)]
+    threads += [threading.Thread(target=client, args=(['RH', 'IA'], 0.2, 200))]
+    for thread in threads:
+      thread.start()
+    for thread in threads:
+      thread.join()
+    scheduler.stop()
+    return latencies
+
+  for label, use_scheduler in (('FIFO', False), ('우선순위', True)):
+    latencies = measure(use_scheduler)
+    line = []
+    for command in ('RH', 'IA', 'RA', 'RI'):
+      samples = sorted(latencies[command])
+      if samples:
+        line.append(f"{command} p50 {samples[len(samples) // 2]:.1f}ms / p95 {samples[int(len(samples) * 0.95) - 1]:.1f}ms")
+    print(f"[{label:<4}] " + ", ".join(line))
@@ -1,4 +1,18 @@
 # config.py : 파라미터 관련 파일 / 하드코딩 방지
+import os
+import importlib.util
+
+
+def _load_storage_lanes():
+  """저장소 루트 config.py 의 STORAGE_LANES (이 파일이 config 이름을 쓰므로 import 대신 경로로 로드)"""
+  path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'config.py')
+  spec = importlib.util.spec_from_file_location('system_config', path)
+  module = importlib.util.module_from_spec(spec)
+  spec.loader.exec_module(module)
+  return module.STORAGE_LANES
+
+# 저장 구역 (색상 레인) 구성 : 레인별 구역 이름 / Storage Box 명령은 여기서 만들어짐 (레인을 추가해도 이 파일은 수정하지 않음)
+STORAGE_LANES = _load_storage_lanes()
 
 # TCP/IP 소켓통신 설정 (네트워크 3계층)
 TCP_PROTOCOL_CONFIG = {
@@ -14,6 +28,8 @@ TCP_PROTOCOL_CONFIG = {
 
   # 3. 통신 관련 설정
   'max_message' : 10, # TCP 핸들러는 최대 10개의 값을 읽어올 수 있음
+  'response_size' : 18,       # 응답 : Command(2) + Status(1) + Data(14) + End(1)
+  'max_connection_queue' : 10, # 연결별 처리 대기 명령 수 (초과 시 BUSY 응답)
 
 }
 
@@ -21,4 +37,188 @@ TCP_PROTOCOL_CONFIG = {
 SERIAL_PROTOCOL_CONFIG = {
   'device' : '/dev/ttyACM0',
   'baud_rate' : 9600,
+  'sectors' : [f"{lane['color']}_STORAGE" for lane in STORAGE_LANES], # 장치 이상 시 UNAVAILABLE 로 표시할 구역
+}
+
+# 시리얼 워치독 설정
+SERIAL_WATCHDOG_CONFIG = {
+  'request_timeout' : 1.5,          # 요청별 기본 마감 시간 (초)
+  'max_consecutive_failures' : 3,   # 연속 실패 허용 횟수
+  'stall_timeout' : 3.0,            # 수신 정지 판단 시간 (초) : 스테퍼 구동 중 정지 시간(약 2.1초)보다 길게
+  'check_interval' : 0.2,           # 워치독 점검 주기 (초)
+  'backoff_initial' : 0.2,          # 재연결 대기 시간 (초, 실패 시 2배씩 증가)
+  'backoff_max' : 5.0,
+}
+
+# Storage Box (IM.ino) 시리얼 프로토콜 설정
+STORAGE_BOX_PROTOCOL_CONFIG = {
+  # 1. 요청 / 응답 형식 : 요청 = Command(2) + '\n' / 응답 = Command(2) + Flag(1) + Value(4) + "\r\n"
+  'reply_size' : 7,
+  'count_commands' : [f"{lane['code']}C" for lane in STORAGE_LANES] + ['OC'], # 레인별 입고 카운트 (레인 코드 + C) / 출고 누적 카운트 조회
+  'motor_commands' : [f"{lane['code']}M" for lane in STORAGE_LANES],          # 레인별 스테퍼 모터 1회 구동 (레인 코드 + M)
+
+  # 2. 펌웨어 타이밍 (IM.ino 상수와 동일하게 유지)
+  'ir_sensor_period' : 0.1,    # IR_SENSOR_PERIOD (100ms)
+  'step_motor_period' : 0.5,   # STEP_MOTOR_PERIOD (500ms)
+  'steps_per_revolution' : 1024,
+  'stepper_rpm' : 28,
+  'read_timeout' : 1.0,        # Serial.readBytesUntil 기본 타임아웃 (1000ms)
+  'tx_buffer_size' : 64,       # AVR HardwareSerial 송신 버퍼
+}
+
+# Storage Box 에뮬레이터 설정 (하드웨어 없이 시리얼 경로 성능 테스트)
+STORAGE_BOX_EMULATOR_CONFIG = {
+  'link_path' : '/tmp/storage_box',  # PTY 경로를 가리키는 고정 심볼릭 링크 (재연결 시에도 유지)
+  'arrival_rates' : {'Y' : 0.0, 'G' : 0.0, 'R' : 0.0, 'O' : 0.0}, # 구역별 물품 도착률 (개/분, 포아송)
+  'item_dwell' : 0.3,          # 물품이 IR 센서를 가리는 시간 (초)
+
+  # 장애 주입 (확률은 응답 1회 기준)
+  'drop_reply_rate' : 0.0,     # 응답 누락
+  'corrupt_rate' : 0.0,        # 응답 바이트 1개 변조
+  'noise_rate' : 0.0,          # 임의 바이트 삽입
+  'stall_rate' : 0.0,          # 루프 정지 (초당 확률)
+  'stall_duration' : 2.0,      # 루프 정지 시간 (초)
+}
+
+# AGV 게이트웨이 설정 (ESP-NOW 메시지 : UCR / UCG / UCY / UCH / CI / RM)
+AGV_GATEWAY_CONFIG = {
+  'transport' : 'udp',         # 'serial' : 브리지 ESP32 (운영) / 'udp' : AGV 에뮬레이터 (테스트)
+  'packet_size' : 10,          # ESP-NOW DataPacket (char value[10])
+
+  # 1. 시리얼 브리지 (ESP-NOW 패킷을 한 줄씩 전달)
+  'bridge_device' : '/dev/ttyUSB0',
+  'bridge_baud_rate' : 115200,
+
+  # 2. UDP 루프백
+  'udp_local' : ('127.0.0.1', 8200),   # LMS 게이트웨이
+  'udp_remote' : ('127.0.0.1', 8201),  # AGV 에뮬레이터
+
+  'cycle_timeout' : 30.0,      # UCx 후 이 시간 (초) 안에 CI 가 없으면 분류 사이클에서 제외
+}
+
+# AGV 에뮬레이터 설정
+AGV_EMULATOR_CONFIG = {
+  'travel_time' : {'H' : 0.0, 'R' : 1.5, 'G' : 2.5, 'Y' : 3.5},  # 홈 기준 구역 위치 (이동 시간, 초)
+  'travel_jitter' : 0.1,       # 이동 시간 편차 비율
+  'color_rate' : 0.0,          # 하역 AGV 색상 판별 결과 (UCx) 자동 발생률 (개/분)
+}
+
+# Storage Box 액추에이터 스케줄러 설정
+ACTUATOR_SCHEDULER_CONFIG = {
+  'request_timeout' : 1.5,     # 명령 1회 응답 대기 시간 (초)
+  'poll_interval' : 0.2,       # 유휴 구간 카운트 조회 간격 (초)
+  'window_margin' : 0.05,      # 구동 창 계산 여유 시간 (초)
+  'max_latency_samples' : 1000, # 지연 통계 보관 개수
+}
+
+# 재고 저널 설정 (재시작 시 재고 / 누적 재고 복구)
+INVENTORY_JOURNAL_CONFIG = {
+  'directory' : 'data',               # 저널 / 스냅샷 저장 경로 (상대 경로는 LMS 폴더 기준)
+  'commit_interval' : 0.01,           # group commit 주기 (초) : 이 사이의 기록을 fsync 1회로 처리
+  'durable_timeout' : 1.0,            # RI / SI 응답 전 fsync 대기 시간 (초)
+  'sync_ack' : True,                  # True : fsync 완료 후 응답 (응답한 변경은 재시작 후에도 유지)
+  'snapshot_transactions' : 5000,     # 스냅샷 간 최대 트랜잭션 수 (재시작 시 재생량 상한)
+  'snapshot_interval' : 600.0,        # 스냅샷 최대 간격 (초)
+}
+
+# 재고 이력 저장소 설정 (write-behind : TCP 응답 경로에서 DB 접근 없음)
+INVENTORY_STORE_CONFIG = {
+  'driver' : 'sqlite',                # 'sqlite' : 로컬 WAL 파일 / 'mysql' : MySQL 서버 (mysql-connector-python 필요)
+  'sqlite_path' : 'data/inventory.db', # 상대 경로는 LMS 폴더 기준
+  'mysql' : {'host' : 'localhost', 'port' : 3306, 'user' : 'lms', 'password' : '', 'database' : 'lms'},
+  'batch_size' : 500,                 # 트랜잭션 1회에 기록할 최대 변경 건수
+  'flush_interval' : 0.5,             # 기록 주기 (초)
+  'max_pending' : 100000,             # 큐 최대 길이 (초과 시 오래된 기록부터 버림)
+}
+
+# 색상별 처리량 통계 설정 (RS 명령)
+THROUGHPUT_STATS_CONFIG = {
+  'granularities' : [60, 3600, 86400],           # 버킷 단위 (초) : 분 / 시 / 일
+  'retention' : {60 : 2 * 86400, 3600 : 90 * 86400}, # 메모리 보관 기간 (초), 없는 단위는 무제한
+  'ranges' : {0 : None, 1 : 3600, 2 : 86400, 3 : 7 * 86400}, # RS stats_type -> 최근 N초 (None : 전체 누적)
+  'custom_range_type' : 4,                       # 구간 지정 : Data = Type(1) + Start(4) + End(4) (unix 시각, End 0 = 현재)
+}
+
+# 실시간 KPI 엔진 설정 (KS 구독 -> KU 발행)
+KPI_ENGINE_CONFIG = {
+  'window' : 60.0,                    # 이동 창 길이 (초) : 처리량 / 사이클 / 점유율 모두 최근 window 초 기준
+  'resolution' : 1.0,                 # 처리량 슬롯 단위 (초) : 같은 슬롯 이벤트는 합산 (버퍼 크기 = window / resolution)
+  'max_samples' : 4096,               # 분류 사이클 표본 최대 개수 (초과 시 오래된 값부터 덮어씀)
+  'percentile' : 0.95,                # 사이클 시간 백분위수
+  'publish_interval' : 1.0,           # KU 발행 주기 (초)
+}
+
+# 출고 주문 큐 설정 (SI 배치 처리)
+ORDER_QUEUE_CONFIG = {
+  'batch_window' : 0.2,               # 첫 주문 도착 후 같은 배치로 묶을 시간 (초)
+  'max_batch' : 32,                   # 배치 최대 주문 수 (도달 시 창이 끝나기 전에 처리)
+  'order_timeout' : 5.0,              # 배치 창 이후 결과 대기 시간 (초), 초과 시 대기 중 주문은 취소
+  'max_latency_samples' : 1000,       # 대기 시간 / 배치 크기 통계 보관 개수
+}
+
+# AGV 이동 계획 설정 (RI / SI 작업 방문 순서)
+TRIP_PLANNER_CONFIG = {
+  'positions' : {'RECEIVING' : 0.0, 'RED_STORAGE' : 1.5, 'GREEN_STORAGE' : 2.5, 'YELLOW_STORAGE' : 3.5, 'SHIPPING' : 4.5}, # 입고 기준 이동 시간 초기 추정 (초)
+  'default_spacing' : 1.0,            # positions 에 없는 지점 : 지점 순서 x 간격 (초)
+  'learning_rate' : 0.2,              # 실측 이동 시간 반영 비율 (지수 이동 평균)
+  'exact_limit' : 9,                  # 이 작업 수 이하는 최적 순서 (부분집합 DP), 초과 시 근사
+  'handling_time' : 1.0,              # 적재 / 하역 1회 시간 (초, 처리량 계산용)
+}
+
+# 입고 흐름 제어 설정 (RI / DC1 컨베이어 투입 페이싱)
+INBOUND_CONTROL_CONFIG = {
+  'min_interval' : 2.7,               # 최소 투입 간격 (초) : 레인 스테퍼 구동 창 (lms_main 은 ActuatorScheduler.actuation_window 사용)
+  'burst' : 1.0,                      # 토큰 버킷 크기 (연속 투입 가능 개수)
+  'high_watermark' : 0.67,            # 레인 목표 적재율 : 이보다 비어 있으면 출고 속도보다 빠르게 투입
+  'horizon' : 10.0,                   # 목표 적재량까지 채우는 시간 (초)
+  'min_rate' : 0.0,                   # 최소 투입 속도 (개/초)
+  'rate_window' : 60.0,               # 출고 속도 계산 창 (초)
+  'hold_when_full' : True,            # True : 레인 빈 자리 합계가 이동 중 물품 수보다 많을 때만 투입 (False : 조건 없음)
+  'transit_timeout' : 10.0,           # 투입 후 분류 확인 대기 시간 (초), 초과 시 이동 중 물품에서 제외
+  'max_backlog' : 500,                # 입고 대기열 최대 수량 (초과 RI 는 실패 응답)
+  'check_interval' : 0.5,             # 투입 보류 중 재확인 주기 (초)
+}
+
+# 출고 대기 주문 설정 (재고 부족 SI 보관 -> 입고 시 자동 출고)
+BACKORDER_CONFIG = {
+  'max_backorders' : 1000,            # 최대 대기 주문 수 (초과 시 기존처럼 실패 응답)
+  'max_wait_samples' : 1000,          # 대기 시간 통계 보관 개수
+  'path' : 'data/backorders.bin',     # 대기 주문 파일 (등록 시 fsync 후 BACKORDERED 응답, 재시작 시 복구, 상대 경로는 LMS 폴더 기준)
+}
+
+# 명령 우선순위 스케줄러 설정 (control > operator > telemetry)
+COMMAND_SCHEDULER_CONFIG = {
+  'max_queue' : 100,                  # 전체 대기 명령 수 (config.py PROTOCOL_CONFIG['max_message_queue'], 초과 시 BUSY 응답, control 명령 제외)
+  'workers' : 8,                      # 일반 워커 수 (control 전용 워커 1개는 별도, SI 는 주문 큐 배치 창 동안 워커를 점유)
+  'priorities' : {                    # 명령 -> 우선순위 (0 control / 1 operator / 2 telemetry), 없는 명령은 1
+    'RH' : 0, 'IR' : 0, 'IS' : 0, 'IH' : 0, 'IA' : 0,
+    'RA' : 2, 'KS' : 2, 'AS' : 2, 'RQ' : 2,
+  },
+  'aging_interval' : 0.5,             # 대기 시간 aging_interval 초마다 우선순위 한 단계 상승 (굶주림 방지)
+  'preempt_timeout' : 1.0,            # 선점 지점에서 control 명령을 기다리는 최대 시간 (초)
+  'preempt_chunk' : 5,                # 대량 RI 를 이 수량 단위 트랜잭션으로 나누고 사이마다 선점 지점 확인
+  'histogram_bounds' : [1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000], # 지연 히스토그램 구간 (ms)
+}
+
+# 요청 중복 제거 (request_dedupe.py) : 요청 ID 가 붙은 명령을 (클라이언트 호스트, 클라이언트 ID, 요청 ID) 로 기억해 재전송 시 저장된 응답 반환
+REQUEST_DEDUPE_CONFIG = {
+  'commands' : ['RI', 'SI'],          # 중복 제거 대상 (재고를 바꾸는 명령, 재실행하면 이중 반영)
+  'max_entries' : 1024,               # LRU 캐시 최대 항목 수 (초과 시 가장 오래 쓰이지 않은 응답부터 제거)
+  'ttl' : 600.0,                      # 저장된 응답 유지 시간 (초, 클라이언트 재시도 기간보다 길게)
+}
+
+# 관찰자 중계 서버 (observer_relay.py, 별도 프로세스) : LMS 연결 1개로 관찰용 클라이언트에 재고 / KPI / 대기 주문 현황 제공
+OBSERVER_RELAY_CONFIG = {
+  'upstream_host' : 'localhost',      # LMS 주소 (TCP_PROTOCOL_CONFIG host / port)
+  'upstream_port' : 8100,
+  'host' : '0.0.0.0',                 # 관찰자 접속 주소
+  'port' : 8101,
+  'bq_interval' : 2.0,                # LMS 대기 주문 현황 (BQ) 조회 주기 (초)
+  'reconnect_interval' : 3.0,         # LMS 연결이 끊겼을 때 재연결 간격 (초)
+}
+
+# 프레임 탭 (communication/frame_tap.py) : TCP 핸들러가 송수신한 프레임을 링 버퍼에 기록, SIGUSR1 수신 시 캡처 파일로 덤프
+FRAME_TAP_CONFIG = {
+  'slots' : 16384,                    # 링 버퍼 크기 (최근 프레임 수, 64바이트씩 = 1MB, 모든 클라이언트 공용)
+  'capture_dir' : 'data',             # 캡처 파일 저장 경로 (상대 경로는 LMS 폴더 기준, lms_<시각>.cap)
 }
@@ -0,0 +1,262 @@
+import os
+import sys
+import math
+import time
+import threading
+from collections import deque
+from typing import Callable
+
+# stw_lib import (상위 경로)
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from stw_lib.sector_manager2 import STORAGE_LANES
+from config import INBOUND_CONTROL_CONFIG
+from kpi_engine import RollingWindow
+
+"""
+입고 흐름 제어 (RI / DC1 컨베이어 페이싱)
+
+- RI 수량은 입고 대기열 (backlog) 에 넣고 바로 응답하며, 대기열의 물품을 토큰 버킷 속도로 1개씩 입고 구역에 투입한다.
+  - lms_main 에서 InventoryManager 에 연결 : feeder = InventoryManager.feed_inbound (입고 구역 재고 반영, 저널 기록)
+  - 입고 구역이 가득 차 투입하지 못한 물품은 대기열로 되돌리고 다음 주기에 다시 시도
+  - 대기열은 메모리에만 있으므로 재시작하면 아직 투입하지 않은 물품은 사라진다. (입고 구역에 투입된 물품만 저널로 복구)
+  - IM.ino 에는 DC1 컨베이어 명령이 없으므로 컨베이어는 구동하지 않음 (펌웨어에 구동 명령이 생기면 feeder 에서 함께 구동)
+  - 투입 속도 = 최근 출고 속도 + (레인 목표 적재량 - 현재 재고 - 이동 중 물품) / horizon
+    (출고된 만큼 채우고, 목표 적재량 (high_watermark) 보다 비어 있으면 horizon 초에 걸쳐 채움)
+  - 최대 속도 = 1 / min_interval : Storage Box 는 레인 스테퍼 구동 창 (약 2.7초) 동안 루프가 멈추므로
+    구동 창 안에 도착한 물품은 IR 카운트 / 분류를 놓친다. 투입 간격을 구동 창 이상으로 벌려 이를 막는다.
+- 투입 조건 (hold_when_full) : 레인 빈 자리 합계 > 이동 중 물품 수
+  (레인 하나가 FULL 이어도 입고 전체를 멈추지 않음, 분류 전에는 색상을 모르므로 FULL 레인으로 간 물품은 재순환)
+- 이동 중 물품 : 투입 후 레인 재고 증가 (분류 완료) 로 확인되지 않은 물품, transit_timeout 이 지나면 제외
+- 재고 변화 / 출고 속도는 InventoryManager 재고 이벤트 구독으로 받는다.
+"""
+
+CAPACITIES = [lane['capacity'] for lane in STORAGE_LANES]
+
+
+class InboundController(threading.Thread):
+  def __init__(self, feeder: Callable = None, min_interval: float = None, clock: Callable = time.monotonic):
+    """
+    Args:
+        feeder: feeder(count) -> 투입한 수 : 물품 count 개를 입고 구역에 투입 (None 반환은 count 개 모두 투입)
+        min_interval: 최소 투입 간격 (초, 기본값 : 설정값 / 운영 : ActuatorScheduler.actuation_window)
+        clock: 현재 시각 함수 (시뮬레이터는 가상 시각)
+    """
+    # daemon = True 옵션으로 메인 스레드 (lms_main.py)가 종료되면 즉시 종료되도록 설정
+    super().__init__(daemon=True)
+    self.config = INBOUND_CONTROL_CONFIG
+    self.feeder = feeder
+    self.min_interval = self.config['min_interval'] if min_interval is None else min_interval
+    self.clock = clock
+
+    window = self.config['rate_window']
+    self.shipped = RollingWindow(window, int(math.ceil(window)) + 1, 1.0)
+    self.lane_stock = [0] * len(STORAGE_LANES)
+    self.backlog = 0
+    self.in_flight = deque()   # 투입 시각 (분류 완료 순서로 앞에서 제거)
+    self.tokens = self.config['burst']
+    self.refilled_at = clock()
+    self.held_since = None
+
+    self.condition = threading.Condition()
+    self.counters = {'accepted': 0, 'rejected': 0, 'released': 0, 'refused': 0, 'expired': 0, 'held_time': 0.0}
+    self.is_running = False
+
+  # --- 입력 ---
+  def submit(self, quantity: int) -> bool:
+    """RI 수량을 입고 대기열에 추가 (대기열이 max_backlog 를 넘으면 전체 거절)"""
+    with self.condition:
+      if self.backlog + quantity > self.config['max_backlog']:
+        self.counters['rejected'] += quantity
+        return False
+      self.backlog += quantity
+      self.counters['accepted'] += quantity
+      self.condition.notify()
+    return True
+
+  def on_inventory_event(self, event: dict):
+    """InventoryManager 재고 이벤트 구독 : 레인 재고 / 분류 완료 / 출고 수량 반영"""
+    with self.condition:
+      now = self.clock()
+      self.lane_stock = list(event['lane_stock'])
+      for _ in range(min(sum(event['lane_received']), len(self.in_flight))):
+        self.in_flight.popleft()
+      if event['shipped']:
+        self.shipped.add(now, event['shipped'])
+      self.condition.notify()
+
+  # --- 제어 ---
+  def rate(self) -> float:
+    """현재 투입 속도 (개/초)"""
+    self.shipped.expire(self.clock())
+    watermark = self.config['high_watermark']
+    headroom = sum(capacity * watermark - stock for capacity, stock in zip(CAPACITIES, self.lane_stock)) - len(self.in_flight)
+    rate = max(self.config['min_rate'], self.shipped.rate() / 60.0 + headroom / self.config['horizon'])
+    return min(rate, 1.0 / self.min_interval) if self.min_interval else rate
+
+  def _gate_open(self) -> bool:
+    """
+    투입 조건 : 레인 빈 자리 합계 > 이동 중 물품 수 (condition 잠금 상태에서 호출)
+    레인 하나가 FULL 이어도 다른 레인에 자리가 있으면 투입 (FULL 레인으로 간 물품은 재순환, 전체 입고를 막지 않음)
+    """
+    if not self.config['hold_when_full']:
+      return True
+    return sum(max(0, capacity - stock) for capacity, stock in zip(CAPACITIES, self.lane_stock)) > len(self.in_flight)
+
+  def poll(self) -> float:
+    """
+    토큰 충전 후 조건이 맞으면 1개 투입
+
+    Returns:
+        다음 확인까지 대기 시간 (초)
+    """
+    with self.condition:
+      now = self.clock()
+      while self.in_flight and now - self.in_flight[0] > self.config['transit_timeout']:
+        self.in_flight.popleft()  # 분류 확인 실패 (IR 누락 / 수동 처리) : 이동 중에서 제외
+        self.counters['expired'] += 1
+      rate = self.rate()
+      self.tokens = min(self.config['burst'], self.tokens + rate * (now - self.refilled_at))
+      self.refilled_at = now
+      if not self.backlog:
+        return self.config['check_interval']
+      if self.tokens < 1.0:
+        return min((1.0 - self.tokens) / rate, self.config['check_interval']) if rate > 0 else self.config['check_interval']
+      if not self._gate_open():
+        self.held_since = self.held_since if self.held_since is not None else now
+        return self.config['check_interval']
+      if self.held_since is not None:
+        self.counters['held_time'] += now - self.held_since
+        self.held_since = None
+      self.tokens -= 1.0
+      self.backlog -= 1
+      self.in_flight.append(now)
+      self.counters['released'] += 1
+    if self.feeder and self.feeder(1) == 0:  # 재고 이벤트 (on_inventory_event) 가 다시 잠금을 잡으므로 잠금 밖에서 호출
+      with self.condition:
+        self.backlog += 1  # 입고 구역이 가득 참 : 대기열로 되돌리고 다음 주기에 재시도
+        if self.in_flight:
+          self.in_flight.pop()
+        self.counters['released'] -= 1
+        self.counters['refused'] += 1
+      return self.config['check_interval']
+    return 0.0
+
+  def run(self):
+    self.is_running = True
+    while self.is_running:
+      delay = self.poll()
+      if delay > 0:
+        with self.condition:
+          self.condition.wait(delay)
+
+  def stats(self) -> dict:
+    with self.condition:
+      return {
+        'backlog': self.backlog,
+        'in_flight': len(self.in_flight),
+        'rate': self.rate() * 60.0,   # 개/분
+        'tokens': self.tokens,
+        **self.counters,
+      }
+
+  def stop(self):
+    self.is_running = False
+    with self.condition:
+      self.condition.notify_all()
+
+
+if __name__ == '__main__':
+  import heapq
+  import random
+  # 사용법 : python inbound_controller.py [시뮬레이션 시간(초)]
+  # RI 일괄 투입 (컨베이어 연속 구동) 과 흐름 제어의 시간당 출고량 비교 (가상 시각)
+  # - Storage Box 는 분류 1회마다 구동 창 동안 멈추고, 그동안 도착한 물품과 FULL 레인으로 간 물품은 재투입 (recirculation 초 후)
+  # - 출고 주문은 색상별 포아송 도착, 재고가 없으면 재고가 생길 때까지 대기
+  duration = float(sys.argv[1]) if len(sys.argv) > 1 else 36000.0
+  actuation_window = 2.69
+  belt_spacing = 1.0
+  recirculation = 30.0
+  ri_interval, ri_quantity = 60.0, 25
+
+  def simulate(paced: bool, demand: float, seed: int = 0):
+    rng = random.Random(seed)
+    state = {'now': 0.0, 'busy_until': 0.0, 'shipped': 0, 'missed': 0, 'overflow': 0, 'max_stock': 0}
+    stock = [1] * len(STORAGE_LANES)
+    backorders = [0] * len(STORAGE_LANES)
+    events, sequence = [], [0]
+    controller = InboundController(min_interval=actuation_window, clock=lambda: state['now'])
+    backlog = deque()
+
+    def schedule(at, callback):
+      sequence[0] += 1
+      heapq.heappush(events, (at, sequence[0], callback))
+
+    def publish(received, shipped):
+      controller.on_inventory_event({'lane_stock': stock, 'lane_received': received, 'shipped': sum(shipped)})
+
+    def ship():
+      shipped = [min(waiting, available) for waiting, available in zip(backorders, stock)]
+      for lane, count in enumerate(shipped):
+        backorders[lane] -= count
+        stock[lane] -= count
+      state['shipped'] += sum(shipped)
+      return shipped
+
+    def arrive_at_sorter():
+      lane = rng.randrange(len(STORAGE_LANES))
+      now = state['now']
+      if now < state['busy_until'] or stock[lane] >= CAPACITIES[lane]:
+        state['missed' if now < state['busy_until'] else 'overflow'] += 1
+        schedule(now + recirculation, lambda: requeue(1))
+        return
+      stock[lane] += 1
+      state['max_stock'] = max(state['max_stock'], stock[lane] / CAPACITIES[lane])
+      state['busy_until'] = now + actuation_window
+      received = [0] * len(STORAGE_LANES)
+      received[lane] = 1
+      publish(received, ship())
+
+    def requeue(count):
+      if paced:
+        controller.submit(count)
+      else:
+        backlog.extend([0] * count)
+
+    def order():
+      backorders[rng.randrange(len(STORAGE_LANES))] += 1
+      publish([0] * len(STORAGE_LANES), ship())
+      schedule(state['now'] + rng.expovariate(demand), order)
+
+    def intake():
+      requeue(ri_quantity)
+      schedule(state['now'] + ri_interval, intake)
+
+    def belt():
+      # 일괄 투입 : 대기 물품이 있으면 컨베이어 간격마다 1개씩
+      if backlog:
+        backlog.popleft()
+        arrive_at_sorter()
+      schedule(state['now'] + belt_spacing, belt)
+
+    def control():
+      delay = controller.poll()
+      schedule(state['now'] + max(delay, 0.01), control)
+
+    controller.feeder = lambda count: arrive_at_sorter()
+    controller.config = dict(INBOUND_CONTROL_CONFIG, max_backlog=10 ** 9)
+    schedule(0.0, intake)
+    schedule(rng.expovariate(demand), order)
+    schedule(0.0, control if paced else belt)
+    while events and events[0][0] <= duration:
+      state['now'], _, callback = heapq.heappop(events)
+      callback()
+    return state
+
+  print(f"RI {ri_quantity}개 / {ri_interval:.0f}초, 구동 창 {actuation_window}초, 컨베이어 간격 {belt_spacing}초")
+  for demand in (0.2, 0.3, 0.35, 0.4):
+    flood, paced = simulate(False, demand), simulate(True, demand)
+    print(f"출고 수요 {demand * 3600:.0f}개/시간")
+    for label, state in (('일괄 투입', flood), ('흐름 제어', paced)):
+      print(f"  [{label}] 출고 {state['shipped'] / duration * 3600:.0f}개/시간, 분류 누락 {state['missed']}회, "
+            f"FULL 레인 유입 {state['overflow']}회")
+    print(f"  -> 시간당 출고 {(paced['shipped'] / flood['shipped'] - 1) * 100:+.1f}%")
@@ -0,0 +1,384 @@
+import os
+import time
+import zlib
+import struct
+import threading
+from config import INVENTORY_JOURNAL_CONFIG
+
+"""
+재고 저널 (append-only) + 스냅샷
+
+- 재고 변경 트랜잭션마다 변경된 값(구역 재고 / 누적 재고)을 고정 크기 레코드로 저널 파일 끝에 추가한다.
+- 기록은 메모리 버퍼에 모았다가 저널 스레드가 commit_interval 마다 한 번에 write + fsync 한다. (group commit)
+- 주기적으로 전체 재고 스냅샷을 쓰고 저널 파일을 새 세그먼트로 교체, 스냅샷 이전 세그먼트는 삭제한다.
+- 시작 시 : 최신 스냅샷 로드 -> 스냅샷 이후 세그먼트 레코드만 재생 (재생량은 snapshot_transactions 이하)
+
+레코드 (32바이트) : Seq(8) + Time(8) + Kind(1) + Target(1) + Flags(2) + Value(8) + CRC32(4)
+  - 한 트랜잭션의 레코드는 같은 Seq 를 가지며 마지막 레코드에 FLAG_COMMIT 이 있다.
+  - 값은 변경 후 절대값이므로 같은 레코드를 다시 재생해도 결과가 같다.
+  - 기록 도중 종료되어 잘린 트랜잭션 / CRC 불일치 레코드부터는 재생하지 않고 파일을 잘라낸다.
+- 기록 (write / fsync) 실패 : 세그먼트를 기록 전 길이로 되돌리고 버퍼를 다시 앞에 넣어 다음 주기에 재시도 (durable_seq 유지)
+  세그먼트를 되돌리지 못하면 저널을 실패 상태로 두고 이후 기록은 fsync 완료로 처리하지 않는다. (wait_durable -> False)
+"""
+
+RECORD = struct.Struct('<QdBBHq')
+RECORD_SIZE = RECORD.size + 4  # + CRC32
+
+KIND_STOCK = 1   # Target : 구역 배열 인덱스 (SectorName 순서)
+KIND_TOTAL = 2   # Target : TOTAL_RECEIVING / TOTAL_SHIPPING
+TOTAL_RECEIVING = 0
+TOTAL_SHIPPING = 1
+FLAG_COMMIT = 0x01
+
+SNAPSHOT_MAGIC = b'LMSS'
+SNAPSHOT_HEADER = struct.Struct('<4sQdHH')  # Magic + Seq + Time + 구역 수 + 구역 이름 블록 길이
+SNAPSHOT_FILE = 'snapshot.bin'
+SEGMENT_PREFIX = 'journal-'
+
+
+def pack_record(seq: int, timestamp: float, kind: int, target: int, flags: int, value: int) -> bytes:
+  body = RECORD.pack(seq, timestamp, kind, target, flags, value)
+  return body + struct.pack('<I', zlib.crc32(body))
+
+
+class InventoryJournal(threading.Thread):
+  def __init__(self, directory=None, checkpoint=None):
+    # daemon = True 옵션으로 메인 스레드 (lms_main.py)가 종료되면 즉시 종료되도록 설정
+    super().__init__(daemon=True)
+    self.config = INVENTORY_JOURNAL_CONFIG
+    directory = directory or self.config['directory']
+    if not os.path.isabs(directory):
+      directory = os.path.join(os.path.dirname(os.path.abspath(__file__)), directory)
+    self.directory = directory
+    os.makedirs(self.directory, exist_ok=True)
+
+    # 스냅샷 작성 콜백 : checkpoint() -> 재고 관리자가 상태를 복사하고 rotate() / write_snapshot() 호출
+    self.checkpoint = checkpoint
+
+    # 버퍼 / 시퀀스 (condition) 와 파일 쓰기 (io_lock) 를 분리 : fsync 중에도 append 는 막히지 않음
+    self.condition = threading.Condition()
+    self.io_lock = threading.Lock()
+    self.pending = bytearray()
+    self.seq = 0              # 마지막으로 발급한 트랜잭션 번호
+    self.durable_seq = 0      # fsync 까지 끝난 트랜잭션 번호
+    self.snapshot_seq = 0
+    self.snapshot_at = time.monotonic()
+    self.segment = None
+    self.failed = False       # 기록 실패 후 세그먼트를 되돌리지 못함 : durable_seq 를 더 올리지 않음
+    self.stats = {'transactions': 0, 'records': 0, 'commits': 0, 'snapshots': 0, 'replayed': 0, 'recovery_time': 0.0}
+    self.is_running = False
+
+  # --- 복구 ---
+  def recover(self):
+    """
+    스냅샷 + 저널 재생으로 마지막 상태를 복원합니다. (저널 스레드 시작 전에 호출)
+
+    Returns:
+        (named_stock, indexed_stock, totals)
+        - named_stock : 스냅샷의 {구역 이름: 재고} (구역 구성이 바뀌어도 이름으로 맞춤)
+        - indexed_stock : 스냅샷 이후 저널의 {구역 인덱스: 재고}
+        - totals : [입고 누적, 출고 누적]
+    """
+    started = time.monotonic()
+    named_stock, totals, seq = self._load_snapshot()
+    self.snapshot_seq = seq
+    indexed_stock = {}
+    segments = self._segments()
+    for i, (start, path) in enumerate(segments):
+      last_seq, valid_size = self._replay_segment(path, seq, indexed_stock, totals)
+      seq = max(seq, last_seq)
+      if valid_size < os.path.getsize(path):
+        print(f"[저널] {os.path.basename(path)} 손상된 끝부분 제거 ({os.path.getsize(path) - valid_size} bytes)")
+        with open(path, 'r+b') as f:
+          f.truncate(valid_size)
+        for _, later in segments[i + 1:]:
+          os.remove(later)  # 손상 지점 이후 세그먼트는 순서를 보장할 수 없으므로 폐기
+        break
+    self.seq = self.durable_seq = seq
+
+    # 이어서 기록할 세그먼트 : 마지막 세그먼트 (없으면 새로 생성)
+    segments = self._segments()
+    path = segments[-1][1] if segments else self._segment_path(seq + 1)
+    self.segment = open(path, 'ab')
+    self.stats['recovery_time'] = time.monotonic() - started
+    return named_stock, indexed_stock, totals
+
+  def _load_snapshot(self):
+    path = os.path.join(self.directory, SNAPSHOT_FILE)
+    if not os.path.exists(path):
+      return {}, [0, 0], 0
+    with open(path, 'rb') as f:
+      data = f.read()
+    try:
+      if zlib.crc32(data[:-4]) != struct.unpack('<I', data[-4:])[0]:
+        raise ValueError("CRC 불일치")
+      magic, seq, _, count, names_size = SNAPSHOT_HEADER.unpack_from(data)
+      if magic != SNAPSHOT_MAGIC:
+        raise ValueError("형식 불일치")
+      offset = SNAPSHOT_HEADER.size
+      names = data[offset:offset + names_size].decode('ascii').split('\n')
+      offset += names_size
+      values = struct.unpack_from(f'<{count + 2}q', data, offset)
+    except (ValueError, struct.error) as e:
+      print(f"[저널] 스냅샷 로드 실패: {e} (저널만으로 복구)")
+      return {}, [0, 0], 0
+    return dict(zip(names, values[:count])), list(values[count:]), seq
+
+  def _replay_segment(self, path, after_seq, stock, totals):
+    """세그먼트 재생 : 커밋된 트랜잭션만 반영, (마지막 seq, 유효한 파일 길이) 반환"""
+    with open(path, 'rb') as f:
+      data = f.read()
+    last_seq = after_seq
+    valid_size = 0
+    group = []
+    for offset in range(0, len(data) - RECORD_SIZE + 1, RECORD_SIZE):
+      body = data[offset:offset + RECORD.size]
+      if zlib.crc32(body) != struct.unpack_from('<I', data, offset + RECORD.size)[0]:
+        break
+      seq, _, kind, target, flags, value = RECORD.unpack(body)
+      group.append((kind, target, value))
+      if not flags & FLAG_COMMIT:
+        continue
+      if seq > after_seq:
+        for kind, target, value in group:
+          if kind == KIND_STOCK:
+            stock[target] = value
+          elif kind == KIND_TOTAL and target < len(totals):
+            totals[target] = value
+        self.stats['replayed'] += 1
+        last_seq = seq
+      group = []
+      valid_size = offset + RECORD_SIZE
+    return last_seq, valid_size
+
+  def _segments(self):
+    """저널 세그먼트 목록 [(시작 seq, 경로)] (시작 seq 순)"""
+    segments = []
+    for name in os.listdir(self.directory):
+      if name.startswith(SEGMENT_PREFIX) and name.endswith('.bin'):
+        segments.append((int(name[len(SEGMENT_PREFIX):-4]), os.path.join(self.directory, name)))
+    return sorted(segments)
+
+  def _segment_path(self, start_seq: int) -> str:
+    return os.path.join(self.directory, f"{SEGMENT_PREFIX}{start_seq:020d}.bin")
+
+  # --- 기록 ---
+  def append(self, changes) -> int:
+    """
+    트랜잭션 1건 기록 (재고 트랜잭션 안에서 호출하여 seq 순서 = 적용 순서)
+
+    Args:
+        changes: [(kind, target, value), ...] 변경 후 값
+
+    Returns:
+        int: 트랜잭션 번호 (wait_durable 에 전달)
+    """
+    now = time.time()
+    with self.condition:
+      self.seq += 1
+      last = len(changes) - 1
+      for i, (kind, target, value) in enumerate(changes):
+        self.pending += pack_record(self.seq, now, kind, target, FLAG_COMMIT if i == last else 0, value)
+      self.stats['transactions'] += 1
+      self.stats['records'] += len(changes)
+      self.condition.notify_all()
+      return self.seq
+
+  def wait_durable(self, seq: int, timeout: float = None) -> bool:
+    """seq 트랜잭션이 fsync 될 때까지 대기 (group commit 주기 이내)"""
+    deadline = time.monotonic() + (timeout or self.config['durable_timeout'])
+    with self.condition:
+      while self.durable_seq < seq:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0 or not self.is_running or self.failed:
+          return self.durable_seq >= seq
+        self.condition.wait(remaining)
+    return True
+
+  def _flush(self):
+    """
+    버퍼를 현재 세그먼트에 기록하고 fsync (io_lock 보유 상태에서 호출)
+    실패 시 세그먼트를 기록 전 길이로 되돌리고 버퍼를 복원한 뒤 OSError 를 다시 던진다. (durable_seq 는 그대로)
+    """
+    if self.failed:
+      raise OSError("저널 실패 상태 (세그먼트 복구 실패)")
+    with self.condition:
+      data, self.pending = bytes(self.pending), bytearray()
+      seq = self.seq
+    if data:
+      offset = self.segment.tell()
+      try:
+        self.segment.write(data)
+        self.segment.flush()
+        os.fsync(self.segment.fileno())
+      except OSError:
+        with self.condition:
+          self.pending[:0] = data  # 이후 append 된 기록보다 앞에 (seq 순서 유지)
+        self._restore_segment(offset)
+        raise
+      self.stats['commits'] += 1
+    with self.condition:
+      self.durable_seq = seq
+      self.condition.notify_all()
+
+  def _restore_segment(self, offset: int):
+    """기록 실패 : 일부만 기록된 레코드를 잘라내고 세그먼트를 다시 연다. 실패하면 저널을 실패 상태로"""
+    path = self.segment.name
+    try:
+      self.segment.close()  # 버퍼에 남은 데이터를 버리기 위해 닫음 (닫기 중 오류는 아래 truncate 로 정리)
+    except OSError:
+      pass
+    try:
+      os.truncate(path, offset)
+      self.segment = open(path, 'ab')
+    except OSError as e:
+      print(f"[저널] 세그먼트 복구 실패: {e} (이후 기록은 실패 응답)")
+      with self.condition:
+        self.failed = True
+        self.condition.notify_all()
+
+  def run(self):
+    self.is_running = True
+    while self.is_running:
+      with self.condition:
+        if not self.pending:
+          self.condition.wait(self.config['commit_interval'])
+      failed = self.failed
+      try:
+        with self.io_lock:
+          self._flush()
+      except OSError as e:
+        if not failed:  # 실패 상태 진입 이후에는 반복 출력하지 않음
+          print(f"[저널] 기록 오류: {e}")
+        time.sleep(self.config['commit_interval'])
+        continue
+      if self.checkpoint and self._snapshot_due():
+        try:
+          self.checkpoint()
+        except Exception as e:
+          print(f"[저널] 스냅샷 오류: {e}")
+      time.sleep(self.config['commit_interval'])  # 이 사이에 들어온 기록을 다음 fsync 에 모음
+
+  # --- 스냅샷 ---
+  def _snapshot_due(self) -> bool:
+    if self.seq == self.snapshot_seq:
+      return False
+    return (self.seq - self.snapshot_seq >= self.config['snapshot_transactions']
+            or time.monotonic() - self.snapshot_at >= self.config['snapshot_interval'])
+
+  def rotate(self) -> int:
+    """
+    현재 세그먼트를 fsync 후 닫고 새 세그먼트로 교체합니다. (재고 트랜잭션 안에서 호출)
+
+    Returns:
+        int: 교체 시점의 마지막 트랜잭션 번호 (스냅샷 seq)
+    """
+    with self.io_lock:
+      self._flush()
+      seq = self.seq
+      if self.segment.tell() > 0:
+        self.segment.close()
+        self.segment = open(self._segment_path(seq + 1), 'ab')
+    return seq
+
+  def write_snapshot(self, seq: int, names, stock, totals):
+    """전체 재고 스냅샷 기록 (임시 파일 -> fsync -> rename) 후 스냅샷 이전 세그먼트 삭제"""
+    names_block = '\n'.join(names).encode('ascii')
+    body = (SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, seq, time.time(), len(stock), len(names_block))
+            + names_block + struct.pack(f'<{len(stock) + len(totals)}q', *stock, *totals))
+    path = os.path.join(self.directory, SNAPSHOT_FILE)
+    temp = path + '.tmp'
+    with open(temp, 'wb') as f:
+      f.write(body + struct.pack('<I', zlib.crc32(body)))
+      f.flush()
+      os.fsync(f.fileno())
+    os.replace(temp, path)
+    self._sync_directory()
+
+    # 현재 세그먼트보다 앞선 세그먼트는 모두 seq 이하 레코드만 가지고 있음
+    current = os.path.abspath(self.segment.name)
+    for start, segment in self._segments():
+      if start <= seq and os.path.abspath(segment) != current:
+        os.remove(segment)
+    self.snapshot_seq = seq
+    self.snapshot_at = time.monotonic()
+    self.stats['snapshots'] += 1
+
+  def _sync_directory(self):
+    """rename 결과를 디스크에 반영 (디렉터리 fsync, 지원하지 않는 OS 는 건너뜀)"""
+    try:
+      fd = os.open(self.directory, os.O_RDONLY)
+    except OSError:
+      return
+    try:
+      os.fsync(fd)
+    except OSError:
+      pass
+    finally:
+      os.close(fd)
+
+  def stop(self):
+    """남은 기록을 fsync 하고 저널 종료"""
+    self.is_running = False
+    with self.io_lock:
+      if self.segment:
+        try:
+          self._flush()
+        except OSError as e:
+          print(f"[저널] 종료 시 기록 오류: {e}")
+        if not self.segment.closed:
+          self.segment.close()
+        self.segment = None
+    print("재고 저널 종료")
+
+
+if __name__ == '__main__':
+  import sys
+  import tempfile
+  # 사용법 : python inventory_journal.py [트랜잭션 수] [스레드 수] : group commit 처리량 / 재시작 복구 시간 측정
+  total = int(sys.argv[1]) if len(sys.argv) > 1 else 4000
+  threads = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+  directory = tempfile.mkdtemp(prefix='lms_journal_')
+  stock = [0] * 5
+  lock = threading.Lock()
+
+  journal = InventoryJournal(directory)
+  journal.recover()
+
+  def checkpoint():
+    with lock:
+      values = list(stock)
+      seq = journal.rotate()
+    journal.write_snapshot(seq, ['RECEIVING', 'RED_STORAGE', 'GREEN_STORAGE', 'YELLOW_STORAGE', 'SHIPPING'], values, (0, 0))
+
+  journal.checkpoint = checkpoint
+  journal.start()
+
+  def writer(index):
+    for i in range(total // threads):
+      with lock:
+        target = (index + i) % len(stock)
+        stock[target] += 1
+        seq = journal.append([(KIND_STOCK, target, stock[target])])
+      journal.wait_durable(seq)
+
+  started = time.monotonic()
+  workers = [threading.Thread(target=writer, args=(i,)) for i in range(threads)]
+  for worker in workers:
+    worker.start()
+  for worker in workers:
+    worker.join()
+  elapsed = time.monotonic() - started
+  journal.stop()
+  stats = journal.stats
+  print(f"트랜잭션 {stats['transactions']}건 / {elapsed:.2f}초 ({stats['transactions'] / elapsed:.0f}건/초), "
+        f"fsync {stats['commits']}회 (평균 {stats['transactions'] / max(stats['commits'], 1):.1f}건/회), 스냅샷 {stats['snapshots']}회")
+
+  restarted = InventoryJournal(directory)
+  named, indexed, _ = restarted.recover()
+  recovered = [named.get(name, 0) for name in ['RECEIVING', 'RED_STORAGE', 'GREEN_STORAGE', 'YELLOW_STORAGE', 'SHIPPING']]
+  for i, value in indexed.items():
+    recovered[i] = value
+  print(f"복구 {restarted.stats['recovery_time'] * 1000:.1f}ms (재생 {restarted.stats['replayed']}건), "
+        f"{'일치' if recovered == stock else f'불일치 {recovered} != {stock}'}")
+  restarted.stop()
@@ -0,0 +1,120 @@
+import os
+import tempfile
+import threading
+import inventory_journal
+from inventory_journal import InventoryJournal, KIND_STOCK, KIND_TOTAL, TOTAL_RECEIVING, RECORD_SIZE
+
+NAMES = ['RECEIVING', 'RED_STORAGE', 'GREEN_STORAGE', 'YELLOW_STORAGE', 'SHIPPING']
+
+
+def restore(directory):
+  """재시작 : 새 저널로 복구한 구역 재고 / 누적 재고 / 마지막 seq"""
+  journal = InventoryJournal(directory)
+  named, indexed, totals = journal.recover()
+  stock = [named.get(name, 0) for name in NAMES]
+  for i, value in indexed.items():
+    stock[i] = value
+  journal.stop()
+  return stock, totals, journal.seq
+
+
+def check(label, actual, expected):
+  print(f"  {label}: {actual} {'OK' if actual == expected else f'!= {expected}'}")
+  assert actual == expected, label
+
+
+if __name__ == "__main__":
+  # 저널 스레드 없이 _flush 를 직접 호출 (group commit 주기와 무관하게 시나리오 순서대로 기록)
+
+  # 1. 시나리오: 스냅샷 + 이후 저널 재생
+  print("\n--- [시나리오 1: 스냅샷 + 저널 재생] ---")
+  directory = tempfile.mkdtemp(prefix='lms_journal_test_')
+  journal = InventoryJournal(directory)
+  journal.recover()
+  journal.append([(KIND_STOCK, 0, 3), (KIND_TOTAL, TOTAL_RECEIVING, 3)])
+  journal.append([(KIND_STOCK, 0, 2), (KIND_STOCK, 1, 1)])
+  seq = journal.rotate()
+  journal.write_snapshot(seq, NAMES, [2, 1, 0, 0, 0], (3, 0))
+  journal.append([(KIND_STOCK, 0, 1), (KIND_STOCK, 2, 1)])  # 스냅샷 이후 : 재생 대상
+  with journal.io_lock:
+    journal._flush()
+  journal.stop()
+  stock, totals, seq = restore(directory)
+  check("재고", stock, [1, 1, 1, 0, 0])
+  check("누적 재고", totals, [3, 0])
+  check("마지막 seq", seq, 3)
+
+  # 2. 시나리오: 기록 도중 종료 (잘린 마지막 레코드) -> 잘린 부분만 제거, 앞 트랜잭션은 유지
+  print("\n--- [시나리오 2: 잘린 끝부분] ---")
+  segment = journal._segments()[-1][1]
+  size = os.path.getsize(segment)
+  with open(segment, 'ab') as f:
+    f.write(inventory_journal.pack_record(4, 0.0, KIND_STOCK, 3, inventory_journal.FLAG_COMMIT, 9)[:RECORD_SIZE // 2])
+  stock, totals, seq = restore(directory)
+  check("재고", stock, [1, 1, 1, 0, 0])
+  check("세그먼트 길이", os.path.getsize(segment), size)
+
+  # 3. 시나리오: fsync 실패 -> durable_seq 유지, 세그먼트 복원, 다음 기록에서 재시도
+  print("\n--- [시나리오 3: fsync 실패 후 재시도] ---")
+  journal = InventoryJournal(directory)
+  journal.recover()
+  journal.is_running = True  # wait_durable 이 바로 반환하지 않도록
+  fsync = os.fsync
+  calls = {'count': 0}
+
+  def failing_fsync(fd):
+    calls['count'] += 1
+    if calls['count'] == 1:
+      raise OSError("디스크 오류 (테스트)")
+    fsync(fd)
+
+  inventory_journal.os.fsync = failing_fsync
+  lost = journal.append([(KIND_STOCK, 3, 5)])
+  try:
+    with journal.io_lock:
+      journal._flush()
+  except OSError as e:
+    print(f"  기록 실패: {e}")
+  check("fsync 완료 여부", journal.wait_durable(lost, timeout=0.05), False)
+  check("세그먼트 길이 (기록 전으로 복원)", os.path.getsize(segment), size)
+  later = journal.append([(KIND_STOCK, 4, 2)])
+  with journal.io_lock:
+    journal._flush()  # 실패한 기록이 먼저 다시 기록됨
+  inventory_journal.os.fsync = fsync
+  check("fsync 완료 여부 (재시도 후)", (journal.wait_durable(lost, 0.05), journal.wait_durable(later, 0.05)), (True, True))
+  journal.stop()
+  stock, totals, seq = restore(directory)
+  check("재고", stock, [1, 1, 1, 5, 2])
+  check("마지막 seq", seq, later)
+
+  # 4. 시나리오: 기록 실패 후 세그먼트도 되돌리지 못함 -> 실패 상태, 이후 기록은 fsync 완료로 처리하지 않음
+  print("\n--- [시나리오 4: 세그먼트 복원 실패] ---")
+  journal = InventoryJournal(directory)
+  journal.recover()
+  journal.is_running = True
+  truncate = os.truncate
+
+  def failing_truncate(path, length):
+    raise OSError("truncate 실패 (테스트)")
+
+  inventory_journal.os.fsync = failing_fsync
+  calls['count'] = 0  # 다음 fsync 는 다시 실패
+  inventory_journal.os.truncate = failing_truncate
+  seq = journal.append([(KIND_STOCK, 0, 0)])
+  try:
+    with journal.io_lock:
+      journal._flush()
+  except OSError as e:
+    print(f"  기록 실패: {e}")
+  inventory_journal.os.fsync = fsync
+  inventory_journal.os.truncate = truncate
+  check("실패 상태", journal.failed, True)
+  journal.append([(KIND_STOCK, 1, 0)])
+  try:
+    with journal.io_lock:
+      journal._flush()
+  except OSError as e:
+    print(f"  기록 거부: {e}")
+  check("fsync 완료 여부", journal.wait_durable(journal.seq, timeout=0.05), False)
+  journal.stop()
+  print("\n모든 시나리오 통과")
@@ -1,5 +1,454 @@
+import os
+import sys
+import time
+import struct
+from typing import Callable, Dict
+from contextlib import contextmanager
+
+# stw_lib / communication import (상위 경로)
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from stw_lib.sector_manager2 import SectorManager, SectorName, SectorStatus, LANE_COLORS, LANE_SECTORS, CODE_TO_COLOR, COLOR_TO_SECTOR
+from communication.message_protocol import MessageProtocol
+from config import SERIAL_PROTOCOL_CONFIG, INVENTORY_JOURNAL_CONFIG, ORDER_QUEUE_CONFIG, COMMAND_SCHEDULER_CONFIG
+from inventory_journal import KIND_STOCK, KIND_TOTAL, TOTAL_RECEIVING, TOTAL_SHIPPING
+from inventory_stats import ThroughputStats
+
+# 응답 상태 코드
+STATUS_SUCCESS = 0x00
+STATUS_FAILURE = 0x01
+STATUS_INVALID_CMD = 0x02
+STATUS_INVALID_DATA = 0x03
+STATUS_BACKORDERED = 0x04
+
+# Storage Box 카운트 명령 (레인 코드 + 'C') -> 물품 색상
+COUNT_COLORS = {f'{code}C': color for code, color in CODE_TO_COLOR.items()}
+
+# SI 수량 필드 : 레인 순서의 uint16 (구성된 레인 수만큼)
+SI_FORMAT = struct.Struct(f'<{len(LANE_COLORS)}H')
+
+# RS 데이터 : 통계 종류(1) + 구간 시작(4) + 구간 끝(4)
+RS_FORMAT = struct.Struct('<BII')
+
+# 초기화 명령 -> 재고를 0 으로 만들 구역 (IR / IH / IA 는 해당 누적 재고도 초기화)
+RESET_SECTORS = {
+  'IR': [SectorName.RECEIVING],
+  'IS': list(LANE_SECTORS),
+  'IH': [SectorName.SHIPPING],
+  'IA': list(SectorName),
+}
+
+
 class InventoryManager:
-    # 명령어 전송 기능을 지원하기 위해 생성자 호출시 인자 전달
-    def __init__(self, tcp_sencer = None, serial_sender = None):
-        self.tcp_sender = tcp_sencer
-        self.serial_sender = serial_sender
\ No newline at end of file
+  # 명령어 전송 기능을 지원하기 위해 생성자 호출시 인자 전달
+  def __init__(self, tcp_sencer = None, serial_sender = None, journal = None, store = None, order_queue = None, backorders = None,
+               inbound = None):
+    self.tcp_sender = tcp_sencer
+    self.serial_sender = serial_sender
+
+    self.sector_manager = SectorManager()
+    self.sector_manager.initialize_all_sectors()
+    # 쓰기는 SectorManager.transaction() 락 하나로 직렬화 (누적 재고 / AU 캐시도 같은 트랜잭션에서 갱신)
+
+    # 누적 재고 (입고 / 출고)
+    self.receiving_total = 0
+    self.shipping_total = 0
+
+    # 재고 이력 저장소 (write-behind, None 이면 이력 기록 안 함)
+    self.store = store
+
+    # 색상별 처리량 통계 (RS) : 레인 구역의 재고 증가 = 입고, 감소 = 출고
+    self.throughput = ThroughputStats([color.name for color in LANE_COLORS])
+    if store is not None:
+      self.throughput.load(store.load_stats())
+    table = self.sector_manager.table
+    self.lane_of_index = {table.index[sector]: lane for lane, sector in enumerate(LANE_SECTORS)}
+    self.lane_indexes = [table.index[sector] for sector in LANE_SECTORS]
+
+    # 재고 이벤트 구독자 (KPI 엔진 등) : 트랜잭션마다 변화량을 전달
+    self.subscribers: Dict[str, Callable] = {}
+
+    # 재고 저널 (None 이면 메모리에만 유지) : 이전 실행의 재고 / 누적 재고 복구
+    self.journal = journal
+    if journal is not None:
+      journal.checkpoint = self.checkpoint
+      self._restore(*journal.recover())
+
+    # 출고 주문 큐 (None 이면 SI 를 요청마다 즉시 처리) : 배치 창 안의 주문을 ship_batch 로 한 번에 처리
+    self.order_queue = order_queue
+    if order_queue is not None:
+      order_queue.dispatcher = self.ship_batch
+
+    # 출고 대기 주문 (None 이면 재고 부족 SI 는 실패 응답) : 재고가 들어온 색상의 대기 주문만 깨워 ship_batch 로 출고
+    self.backorders = backorders
+    if backorders is not None:
+      backorders.dispatcher = self.ship_batch
+      backorders.lane_stock = [self.sector_manager.table.stock[i] for i in self.lane_indexes]
+      self.register_subscriber('backorder', backorders.on_inventory_event)
+
+    # 입고 흐름 제어 (None 이면 RI 를 요청마다 즉시 입고 구역에 반영) : RI 수량을 대기열에 넣고 레인 빈 자리에 맞춰 1개씩 투입
+    self.inbound = inbound
+    if inbound is not None:
+      inbound.feeder = self.feed_inbound
+      inbound.lane_stock = [self.sector_manager.table.stock[i] for i in self.lane_indexes]
+      self.register_subscriber('inbound', inbound.on_inventory_event)
+
+    # TCP 응답용 AU 프레임 캐시 : 시리얼 장치가 복구 중이어도 RA 는 캐시로 즉시 응답
+    self.au_frame = b''
+    self._refresh_cache()
+
+    # 장치 상태 / Storage Box 카운트 기준값 (보드 리셋 시 초기화)
+    self.device_healthy = {}
+    self.last_counts = {}     # 카운트 명령 -> 재고에 반영한 카운트 (반영하지 못한 증가분은 다음 조회에서 다시 시도)
+    self.pending_counts = {}  # 카운트 명령 -> 반영하지 못한 증가분 (변할 때만 로그)
+
+    self.handlers = {
+      'RA': self.handle_ra,
+      'RI': self.handle_ri,
+      'SI': self.handle_si,
+      'RS': self.handle_rs,
+      'BQ': self.handle_bq,
+    }
+    self.handlers.update({command: (lambda data, command=command: self.handle_reset(command)) for command in RESET_SECTORS})
+    # 클라이언트 주소가 필요한 명령 (구독 등) : handler(client_address, data) -> bytes
+    self.client_handlers = {'AS': self.handle_as}
+    # AU 구독 프레임 송신 함수 (client_address, frame) -> bool (TCPHandler.send_to, 송신함에 넣고 바로 반환)
+    self.sender = None
+
+    # 선점 지점 콜백 (CommandScheduler.yield_point) : 여러 트랜잭션으로 나뉜 작업 (대량 RI / 주문별 SI) 의 트랜잭션 사이에서 호출
+    self.preempt = None
+
+  def register_subscriber(self, name: str, callback: Callable):
+    """재고 이벤트 콜백 등록 (트랜잭션 안에서 호출되므로 콜백은 짧게 끝나야 함)"""
+    self.subscribers[name] = callback
+
+  # --- 재고 캐시 ---
+  def _refresh_cache(self):
+    """
+    재고 변경 후 호출 : AU 응답 프레임을 미리 만들어 둠 (트랜잭션 안에서 호출, 읽기는 참조만 가져가므로 락 불필요)
+    구역 배열 순서 (입고 -> 레인 -> 출고) 가 AU 필드 순서와 같으므로 배열을 그대로 패킹한다.
+    """
+    values = self.sector_manager.table.stock.tolist() + [self.receiving_total, self.shipping_total]
+    self.au_frame = MessageProtocol.pack_stock_frame(values, STATUS_SUCCESS)
+
+  # --- 재고 저널 ---
+  def _restore(self, named_stock: dict, indexed_stock: dict, totals: list):
+    """저널 복구 결과 반영 : 스냅샷 (구역 이름 기준) -> 스냅샷 이후 저널 (구역 인덱스 기준) 순서로 덮어씀"""
+    table = self.sector_manager.table
+    with self.sector_manager.transaction():
+      for name, stock in named_stock.items():
+        if name in SectorName.__members__:
+          table.set_stock(table.index[SectorName[name]], stock)
+      for i, stock in indexed_stock.items():
+        if i < len(table.stock):
+          table.set_stock(i, stock)
+      for sector in self.sector_manager.sectors.values():
+        sector.status = sector.status_for_stock()
+      self.receiving_total, self.shipping_total = totals
+      self._refresh_cache()
+    print(f"[저널] 재고 복구 완료 (트랜잭션 {self.journal.stats['replayed']}건 재생, "
+          f"{self.journal.stats['recovery_time'] * 1000:.1f}ms)")
+
+  @contextmanager
+  def _mutation(self, command: str):
+    """
+    재고 변경 트랜잭션 : 블록이 끝나면 바뀐 구역 재고 / 누적 재고를 저널과 이력 저장소 큐에 넣고 AU 캐시를 갱신한다.
+    블록 (또는 저널 기록) 에서 예외가 나면 구역 재고 / 상태 / 누적 재고를 블록 시작 전으로 되돌리고 예외를 다시 던진다.
+    블록에 전달하는 dict 의 'seq' 는 저널 트랜잭션 번호 : 응답 전에 _durable(seq) 로 fsync 완료를 확인한다.
+    (이력 저장소는 write-behind 이므로 응답 경로에서 DB 를 기다리지 않음)
+    """
+    mutation = {'seq': None}
+    with self.sector_manager.transaction():
+      before = self.sector_manager.snapshot()  # 직전 트랜잭션까지의 상태
+      totals = (self.receiving_total, self.shipping_total)
+      try:
+        yield mutation
+        changed = [(i, old, stock) for i, (old, stock) in enumerate(zip(before.stock, self.sector_manager.table.stock)) if old != stock]
+        counters = {}
+        if totals[0] != self.receiving_total:
+          counters['receiving_total'] = self.receiving_total
+        if totals[1] != self.shipping_total:
+          counters['shipping_total'] = self.shipping_total
+        if (changed or counters) and self.journal is not None:
+          changes = [(KIND_STOCK, i, stock) for i, _, stock in changed]
+          changes += [(KIND_TOTAL, TOTAL_RECEIVING if name == 'receiving_total' else TOTAL_SHIPPING, value) for name, value in counters.items()]
+          mutation['seq'] = self.journal.append(changes)
+      except BaseException:
+        self._rollback(before, totals)
+        raise
+      if changed or counters:
+        timestamp = time.time()
+        if command in RESET_SECTORS:
+          received = shipped = [0] * len(LANE_COLORS)  # 초기화는 입고 / 출고 처리량이 아님
+        else:
+          received, shipped = self._lane_deltas(changed)
+        stats_rows = self.throughput.record(timestamp, received, shipped) if any(received) or any(shipped) else []
+        if self.store is not None:
+          names = before.names
+          self.store.submit(command, [(names[i].name, stock - old, stock) for i, old, stock in changed], counters, stats_rows)
+        self._refresh_cache()
+        if self.subscribers:
+          self._notify_subscribers({
+            'command': command, 'timestamp': timestamp,
+            'received': max(0, self.receiving_total - totals[0]), 'shipped': max(0, self.shipping_total - totals[1]),
+            'lane_received': received, 'lane_shipped': shipped,
+            'lane_stock': [self.sector_manager.table.stock[i] for i in self.lane_indexes],
+          })
+
+  def _rollback(self, before, totals):
+    """_mutation 블록 실패 : 구역 재고 / 상태 / 누적 재고를 블록 시작 전 스냅샷으로 복원 (트랜잭션 안에서 호출)"""
+    table = self.sector_manager.table
+    for i, (stock, status) in enumerate(zip(before.stock, before.status_codes)):
+      table.set_stock(i, stock)
+      table.status[i] = status
+    self.receiving_total, self.shipping_total = totals
+
+  def _durable(self, seq: int = None) -> bool:
+    """
+    sync_ack 설정 시 저널 트랜잭션 seq (None 이면 지금까지 기록한 마지막 트랜잭션) 의 fsync 완료까지 대기 (락 밖에서 호출)
+    durable_timeout 안에 fsync 되지 않으면 False : 재시작 후 유지를 보장할 수 없으므로 실패 응답
+    """
+    if self.journal is None or not INVENTORY_JOURNAL_CONFIG['sync_ack']:
+      return True
+    if seq is None:
+      seq = self.journal.seq
+    if self.journal.wait_durable(seq):
+      return True
+    print(f"[저널] 트랜잭션 {seq} fsync 대기 시간 초과 : 실패 응답")
+    return False
+
+  def _lane_deltas(self, changed):
+    """레인 구역 재고 변화량 -> 레인 순서의 (입고, 출고) 수량 목록"""
+    received = [0] * len(LANE_COLORS)
+    shipped = [0] * len(LANE_COLORS)
+    for i, old, stock in changed:
+      lane = self.lane_of_index.get(i)
+      if lane is None:
+        continue
+      if stock > old:
+        received[lane] += stock - old
+      else:
+        shipped[lane] += old - stock
+    return received, shipped
+
+  def _notify_subscribers(self, event):
+    for name, callback in list(self.subscribers.items()):
+      try:
+        callback(event)
+      except Exception as e:
+        print(f"[재고] {name} 콜백 오류: {e}")
+
+  def checkpoint(self):
+    """스냅샷 기록 : 트랜잭션 안에서 상태 복사 + 저널 세그먼트 교체, 파일 기록은 락 밖에서"""
+    if self.journal is None:
+      return
+    with self.sector_manager.transaction():
+      names = [name.name for name in self.sector_manager.table.names]
+      stock = self.sector_manager.table.stock.tolist()
+      totals = (self.receiving_total, self.shipping_total)
+      seq = self.journal.rotate()
+    self.journal.write_snapshot(seq, names, stock, totals)
+
+  # --- TCP 명령 처리 ---
+  def handle_command(self, client_address, message: bytes) -> bytes:
+    """TCPHandler 콜백 : 17바이트 명령 -> 응답 바이트"""
+    parsed = MessageProtocol.unpack_command(message)
+    if 'error' in parsed:
+      return MessageProtocol.pack_response('??', STATUS_INVALID_DATA)
+    command = parsed['command']
+    handler = self.handlers.get(command)
+    if handler is None:
+      client_handler = self.client_handlers.get(command)
+      if client_handler is None:
+        return MessageProtocol.pack_response(command, STATUS_INVALID_CMD)
+      handler = lambda data: client_handler(client_address, data)
+    try:
+      return handler(parsed['data'])
+    except struct.error:
+      return MessageProtocol.pack_response(command, STATUS_INVALID_DATA)
+
+  def handle_ra(self, data: bytes) -> bytes:
+    """RA : 캐시된 AU 프레임 반환 (시리얼 통신 없음)"""
+    return self.au_frame
+
+  def handle_ri(self, data: bytes) -> bytes:
+    """
+    RI : 입고 구역에 물품 추가 (RED(2) + GREEN(2), GUI 는 첫 필드에 전체 수량 전송)
+    입고 흐름 제어기가 있으면 대기열에 넣고 응답 (투입은 제어기가 1개씩), 없으면 응답 전에 재고에 반영
+    """
+    red, green = struct.unpack('<HH', data[:4])
+    if self.inbound is not None:
+      success = self.inbound.submit(red + green)  # 대기열이 max_backlog 를 넘으면 실패 응답
+    else:
+      success = self.release_items(red + green)
+    return MessageProtocol.pack_response('RI', STATUS_SUCCESS if success else STATUS_FAILURE)
+
+  def release_items(self, quantity: int) -> bool:
+    """
+    물품 quantity 개를 입고 구역에 투입 (입고 누적 재고 증가)
+    IM.ino 에는 DC1 컨베이어 명령이 없으므로 재고 반영만 하고, 컨베이어 구동은 입고 구역 장치 쪽에서 처리한다.
+    대량 투입은 preempt_chunk 개 단위 트랜잭션으로 나누고, 트랜잭션 사이에서 선점 지점 (control 명령 우선) 을 확인한다.
+    """
+    chunk = COMMAND_SCHEDULER_CONFIG['preempt_chunk']
+    for start in range(0, quantity, chunk):
+      if start and self.preempt is not None:
+        self.preempt()
+      count = min(chunk, quantity - start)
+      received, seq = self._receive(count)
+      if received < count or not self._durable(seq):
+        return False
+    return True
+
+  def feed_inbound(self, count: int) -> int:
+    """입고 흐름 제어기 feeder : 대기열 물품 count 개를 입고 구역에 투입, 투입한 수 반환 (응답 대기가 없으므로 fsync 를 기다리지 않음)"""
+    return self._receive(count)[0]
+
+  def _receive(self, count: int) -> tuple:
+    """입고 구역에 물품 count 개 추가 (트랜잭션 1회) : (추가한 수, 저널 트랜잭션 번호)"""
+    with self._mutation('RI') as mutation:
+      received = 0
+      while received < count and self.sector_manager.receive_new_item():
+        received += 1
+      self.receiving_total += received  # 입고 구역이 가득 차 실패한 물품은 누적 재고에 넣지 않음
+    return received, mutation['seq']
+
+  def handle_si(self, data: bytes) -> bytes:
+    """SI : 주문 전체 (레인별 수량) 를 저장 구역 -> 출고 구역으로 일괄 이동 (전부 성공 또는 전부 실패)"""
+    quantities = SI_FORMAT.unpack_from(data)
+    order = dict(zip(LANE_COLORS, quantities))
+    if self.order_queue is None:
+      success = self.ship_batch([order])[0]
+    else:
+      ticket = self.order_queue.submit(order)
+      timeout = ORDER_QUEUE_CONFIG['batch_window'] + ORDER_QUEUE_CONFIG['order_timeout']
+      if not ticket.event.wait(timeout) and not self.order_queue.cancel(ticket):
+        ticket.wait()  # 이미 배치 처리 중 : 결과까지 대기 (응답과 실제 출고가 어긋나지 않도록)
+      success = bool(ticket.success)
+    if success and not self._durable():
+      # 출고는 반영됐지만 fsync 확인 실패 : 대기 주문으로 보관하면 같은 주문이 다시 출고되므로 실패 응답만
+      return MessageProtocol.pack_response('SI', STATUS_FAILURE)
+    if not success and self.backorders is not None and self.backorders.hold(order):
+      return MessageProtocol.pack_response('SI', STATUS_BACKORDERED)
+    return MessageProtocol.pack_response('SI', STATUS_SUCCESS if success else STATUS_FAILURE)
+
+  def ship_batch(self, orders) -> list:
+    """
+    출고 주문 배치 처리 : 합산 주문을 트랜잭션 1회로 한 번에 이동하고,
+    재고가 부족하면 도착 순서대로 주문별 트랜잭션으로 처리하며 주문 사이에서 선점 지점 (control 명령 우선) 을 확인한다.
+    각 주문은 전부 성공 또는 전부 실패, 반환값은 주문 순서의 성공 여부 목록
+    """
+    if len(orders) > 1:
+      merged = {}
+      for order in orders:
+        for color, quantity in order.items():
+          merged[color] = merged.get(color, 0) + quantity
+      with self._mutation('SI'):
+        shipped = self.sector_manager.ship_order(merged)
+        if shipped:
+          self.shipping_total += sum(merged.values())
+      if shipped:
+        return [True] * len(orders)
+    results = []
+    for i, order in enumerate(orders):
+      if i and self.preempt is not None:
+        self.preempt()
+      with self._mutation('SI'):
+        success = self.sector_manager.ship_order(order)
+        if success:
+          self.shipping_total += sum(order.values())
+      results.append(success)
+    return results
+
+  def handle_reset(self, command: str) -> bytes:
+    """IR / IS / IH / IA : 구역 재고 초기화 (IR 입고 / IS 저장 레인 / IH 출고 / IA 전체, 입고 / 출고 누적 재고 포함)"""
+    with self._mutation(command) as mutation:
+      for name in RESET_SECTORS[command]:
+        sector = self.sector_manager.get_sector(name)
+        sector.stock = 0
+        if sector.status != SectorStatus.UNAVAILABLE:
+          sector.status = sector.status_for_stock()
+      if command in ('IR', 'IA'):
+        self.receiving_total = 0
+      if command in ('IH', 'IA'):
+        self.shipping_total = 0
+    return MessageProtocol.pack_response(command, STATUS_SUCCESS if self._durable(mutation['seq']) else STATUS_FAILURE)
+
+  def handle_as(self, client_address, data: bytes) -> bytes:
+    """AS : Data[0] = 1 구독 / 0 해제, 성공 응답에 현재 AU 데이터 포함 (이후 재고가 바뀔 때마다 AU 송신)"""
+    name = f"tcp:{client_address[0]}:{client_address[1]}"
+    if data[0] == 1:
+      if self.sender is None:
+        return MessageProtocol.pack_response('AS', STATUS_INVALID_DATA)
+      self.register_subscriber(name, lambda event: self._push_stock(name, client_address))
+    elif data[0] == 0:
+      self.subscribers.pop(name, None)
+    else:
+      return MessageProtocol.pack_response('AS', STATUS_INVALID_DATA)
+    return MessageProtocol.pack_variable_response('AS', STATUS_SUCCESS, self.au_frame[3:-1])
+
+  def _push_stock(self, name: str, client_address):
+    """재고 이벤트 -> AU 구독 프레임 송신 (트랜잭션 안에서 호출, send_to 는 송신함에 넣기만 함), 연결이 끊겼으면 구독 해제"""
+    if not self.sender(client_address, self.au_frame):
+      self.subscribers.pop(name, None)
+
+  def handle_bq(self, data: bytes) -> bytes:
+    """BQ : 출고 대기 주문 수 / 가장 오래된 대기 시간 / 색상별 대기 주문 수 -> BU 응답"""
+    if self.backorders is None:
+      return MessageProtocol.pack_variable_response('BU', STATUS_SUCCESS, MessageProtocol.pack_backorder_data(0, 0, [0] * len(LANE_COLORS)))
+    return self.backorders.query_frame()
+
+  def handle_rs(self, data: bytes) -> bytes:
+    """RS : 색상별 입고 / 출고 통계 (분 / 시 / 일 집계에서 조회) -> RU 응답"""
+    stats_type, start, end = RS_FORMAT.unpack_from(data)
+    try:
+      stats = self.throughput.query_type(stats_type, start, end)
+    except KeyError:
+      return MessageProtocol.pack_response('RS', STATUS_INVALID_DATA)
+    return MessageProtocol.pack_variable_response('RU', STATUS_SUCCESS, MessageProtocol.pack_lane_stats(stats))
+
+  # --- 시리얼 이벤트 처리 ---
+  def on_device_status(self, device: str, healthy: bool):
+    """SerialWatchdog 콜백 : 장치 이상 시 담당 구역을 UNAVAILABLE 로, 복구 시 재고 기준 상태로 복원"""
+    with self.sector_manager.transaction():
+      self.device_healthy[device] = healthy
+      if healthy:
+        self.last_counts.clear()  # 보드 리셋으로 카운트가 0 부터 다시 시작
+        self.pending_counts.clear()
+      for sector_name in SERIAL_PROTOCOL_CONFIG['sectors']:
+        sector = self.sector_manager.get_sector(SectorName[sector_name])
+        if not healthy:
+          sector.update_status(SectorStatus.UNAVAILABLE)
+        elif sector.status == SectorStatus.UNAVAILABLE:
+          sector.update_status(sector.status_for_stock())
+
+  def on_count(self, command: str, count: int):
+    """
+    ActuatorScheduler 콜백 : 구역 IR 카운트 증가분만큼 입고 구역 -> 저장 구역 이동
+    입고 구역 재고 / 레인 여유 / 레인 상태가 허용하는 만큼만 옮기고, last_counts 도 옮긴 만큼만 진행한다.
+    (나머지는 다음 카운트 조회에서 다시 시도되므로 분류된 물품이 재고에서 사라지지 않음)
+    """
+    color = COUNT_COLORS.get(command)
+    if color is None:
+      return
+    with self._mutation(command):
+      last = self.last_counts.get(command)
+      if last is None:
+        self.last_counts[command] = count
+        return  # 첫 조회는 기준값
+      delta = (count - last) & 0xFFFF  # 16bit 카운터 순환
+      if not delta:
+        return
+      receiving = self.sector_manager.get_sector(SectorName.RECEIVING)
+      lane = self.sector_manager.get_sector(COLOR_TO_SECTOR[color])
+      applied = 0
+      if SectorStatus.UNAVAILABLE not in (receiving.status, lane.status):
+        applied = min(delta, receiving.stock)
+        if lane.capacity:
+          applied = min(applied, max(0, lane.capacity - lane.stock))
+        if applied and not self.sector_manager.store_order({color: applied}):
+          applied = 0
+      self.last_counts[command] = (last + applied) & 0xFFFF
+      remainder = delta - applied
+      if remainder != self.pending_counts.get(command, 0):
+        if remainder:
+          print(f"[재고] {command} 카운트 {remainder}개 미반영 (입고 구역 {receiving.stock}, {lane.name.name} {lane.stock}/{lane.capacity or '무제한'}), 다음 조회에서 재시도")
+        self.pending_counts[command] = remainder
@@ -0,0 +1,145 @@
+import time
+import bisect
+import threading
+from config import THROUGHPUT_STATS_CONFIG
+
+"""
+색상(레인)별 입고 / 출고 처리량 통계
+
+- 분 / 시 / 일 단위 버킷마다 레인별 (입고, 출고) 수량과 해당 버킷까지의 누적값을 함께 보관한다.
+- 구간 [start, end) 조회는 두 경계의 누적값 차이로 계산 : 버킷 목록 이분 탐색 2회 (구간 길이 / 이벤트 수와 무관)
+- 오래된 분 / 시 버킷은 보관 기간이 지나면 메모리에서 제거, 그 이전 구간은 더 큰 단위 버킷으로 계산한다.
+- 버킷 값은 이력 저장소 (inventory_stats 테이블, 기본 키 = (단위, 버킷, 색상)) 에 기록되고 시작 시 다시 로드된다.
+"""
+
+
+class RollupSeries:
+  """단위 하나 (예: 60초) 의 버킷 목록 : buckets[i] 시작 시각, counts[i] 버킷 수량, cumulative[i] 버킷 끝까지의 누적"""
+  __slots__ = ('granularity', 'retention', 'buckets', 'counts', 'cumulative', 'horizon', 'base')
+
+  def __init__(self, granularity: int, retention, width: int):
+    self.granularity = granularity
+    self.retention = retention  # 보관 기간 (초, None 이면 무제한)
+    self.buckets = []
+    self.counts = []
+    self.cumulative = []
+    self.horizon = 0            # 이 시각 이후 구간은 이 단위로 정확히 계산 가능 (버킷 제거 시 증가)
+    self.base = (0,) * width    # 첫 번째 보관 버킷 이전까지의 누적 (제거된 버킷 합)
+
+  def add(self, bucket: int, values):
+    """bucket 에 values (레인별 입고..., 출고...) 를 더하고, 변경 후 버킷 수량을 반환"""
+    if self.buckets and self.buckets[-1] == bucket:
+      counts = tuple(a + b for a, b in zip(self.counts[-1], values))
+      self.counts[-1] = counts
+      self.cumulative[-1] = tuple(a + b for a, b in zip(self.cumulative[-1], values))
+      return counts
+    if self.buckets and bucket < self.buckets[-1]:
+      return self._insert(bucket, values)  # 시계 역행 등 과거 버킷 (드묾)
+    previous = self.cumulative[-1] if self.cumulative else self.base
+    self.buckets.append(bucket)
+    self.counts.append(tuple(values))
+    self.cumulative.append(tuple(a + b for a, b in zip(previous, values)))
+    self._prune(bucket)
+    return self.counts[-1]
+
+  def _insert(self, bucket: int, values):
+    i = bisect.bisect_left(self.buckets, bucket)
+    if i < len(self.buckets) and self.buckets[i] == bucket:
+      self.counts[i] = tuple(a + b for a, b in zip(self.counts[i], values))
+    else:
+      self.buckets.insert(i, bucket)
+      self.counts.insert(i, tuple(values))
+      self.cumulative.insert(i, self.cumulative[i - 1] if i else self.base)
+    for j in range(i, len(self.buckets)):
+      self.cumulative[j] = tuple(a + b for a, b in zip(self.cumulative[j], values))
+    return self.counts[i]
+
+  def _prune(self, latest: int):
+    if self.retention is None:
+      return
+    cutoff = latest - self.retention
+    count = bisect.bisect_left(self.buckets, cutoff)
+    if count:
+      self.base = self.cumulative[count - 1]
+      self.horizon = self.buckets[count - 1] + self.granularity
+      del self.buckets[:count], self.counts[:count], self.cumulative[:count]
+
+  def total_before(self, timestamp: float):
+    """timestamp 이전 (버킷 경계 기준) 까지의 누적"""
+    i = bisect.bisect_left(self.buckets, timestamp)
+    return self.cumulative[i - 1] if i else self.base
+
+
+class ThroughputStats:
+  def __init__(self, lanes):
+    """
+    Args:
+        lanes: 레인 색상 이름 목록 (STORAGE_LANES 순서)
+    """
+    self.config = THROUGHPUT_STATS_CONFIG
+    self.lanes = list(lanes)
+    self.lane_index = {name: i for i, name in enumerate(self.lanes)}
+    width = 2 * len(self.lanes)
+    self.series = [RollupSeries(g, self.config['retention'].get(g), width) for g in sorted(self.config['granularities'])]
+    self.lock = threading.Lock()
+
+  def record(self, timestamp: float, received, shipped):
+    """
+    레인별 입고 / 출고 수량 기록
+
+    Args:
+        received / shipped: 레인 순서의 수량 목록
+
+    Returns:
+        [(단위, 버킷, 색상, 입고, 출고), ...] : 값이 바뀐 버킷 행 (이력 저장소 기록용)
+    """
+    values = list(received) + list(shipped)
+    width = len(self.lanes)
+    rows = []
+    with self.lock:
+      for series in self.series:
+        bucket = int(timestamp // series.granularity) * series.granularity
+        counts = series.add(bucket, values)
+        for i, color in enumerate(self.lanes):
+          if values[i] or values[width + i]:
+            rows.append((series.granularity, bucket, color, counts[i], counts[width + i]))
+    return rows
+
+  def query(self, start: float, end: float):
+    """
+    [start, end) 구간의 레인별 (입고, 출고)
+
+    보관 기간 안의 가장 작은 단위 버킷 경계로 맞춰 계산한다. (결과의 시간 해상도 = 선택된 단위)
+    """
+    width = len(self.lanes)
+    with self.lock:
+      series = next((s for s in self.series if s.horizon <= start), self.series[-1])
+      g = series.granularity
+      low = series.total_before(int(start // g) * g)
+      high = series.total_before(-int(-end // g) * g)  # 끝 경계는 올림 : 진행 중인 버킷 포함
+    diff = [b - a for a, b in zip(low, high)]
+    return [(diff[i], diff[width + i]) for i in range(width)]
+
+  def query_type(self, stats_type: int, start: int = 0, end: int = 0, now: float = None):
+    """RS stats_type 에 맞는 구간 조회 (config 의 ranges : 최근 N초 / None 은 전체, 구간 지정은 start / end 사용)"""
+    now = now or time.time()
+    if stats_type == self.config['custom_range_type']:
+      return self.query(start, end or now)
+    window = self.config['ranges'][stats_type]  # KeyError : 지원하지 않는 통계 종류
+    return self.query(0 if window is None else now - window, now)
+
+  def load(self, rows):
+    """이력 저장소의 버킷 행 [(단위, 버킷, 색상, 입고, 출고)] 로 복원 (시작 시 1회)"""
+    width = len(self.lanes)
+    merged = {}
+    for granularity, bucket, color, received, shipped in rows:
+      i = self.lane_index.get(color)
+      if i is None:
+        continue  # 구성에서 빠진 레인
+      values = merged.setdefault((granularity, bucket), [0] * (2 * width))
+      values[i], values[width + i] = received, shipped
+    with self.lock:
+      for series in self.series:
+        for (granularity, bucket), values in sorted(merged.items()):
+          if granularity == series.granularity:
+            series.add(bucket, values)
@@ -0,0 +1,304 @@
+import os
+import time
+import sqlite3
+import threading
+from collections import deque
+from config import INVENTORY_STORE_CONFIG
+
+"""
+재고 이력 저장소 (write-behind)
+
+- 재고 관리자는 메모리 상태로 TCP 명령에 응답하고, 변경 내역만 submit() 으로 큐에 넣는다. (DB 왕복 없음)
+- 저장소 스레드가 flush_interval 마다 큐를 batch_size 단위로 꺼내 트랜잭션 1회로 기록한다.
+- 재시작 복구는 재고 저널(inventory_journal.py)이 담당하고, DB 는 조회 / 통계용 이력을 보관한다.
+  큐가 max_pending 을 넘으면 가장 오래된 기록부터 버리고 stats['dropped'] 에 남긴다.
+- 드라이버 : SQLite (WAL 모드, 기본) / MySQL (mysql-connector-python 설치 시) - 스키마는 두 DB 공통
+"""
+
+# 공통 스키마 : MySQL / SQLite 모두 그대로 실행 가능한 타입과 구문만 사용 ({id_column} 만 드라이버별)
+SCHEMA = [
+  """CREATE TABLE IF NOT EXISTS inventory_event (
+    id {id_column},
+    created_at DOUBLE NOT NULL,
+    command VARCHAR(4) NOT NULL,
+    sector VARCHAR(32) NOT NULL,
+    delta INT NOT NULL,
+    stock INT NOT NULL
+  )""",
+  """CREATE TABLE IF NOT EXISTS inventory_stock (
+    sector VARCHAR(32) NOT NULL PRIMARY KEY,
+    stock INT NOT NULL,
+    updated_at DOUBLE NOT NULL
+  )""",
+  """CREATE TABLE IF NOT EXISTS inventory_counter (
+    name VARCHAR(32) NOT NULL PRIMARY KEY,
+    value BIGINT NOT NULL,
+    updated_at DOUBLE NOT NULL
+  )""",
+  # 색상별 처리량 집계 (분 / 시 / 일 버킷) : 기본 키 (granularity, bucket, color) 가 조회 인덱스
+  """CREATE TABLE IF NOT EXISTS inventory_stats (
+    granularity INT NOT NULL,
+    bucket BIGINT NOT NULL,
+    color VARCHAR(16) NOT NULL,
+    received INT NOT NULL,
+    shipped INT NOT NULL,
+    PRIMARY KEY (granularity, bucket, color)
+  )""",
+]
+
+# REPLACE INTO 는 MySQL / SQLite 공통 구문 (기본 키 기준 덮어쓰기)
+INSERT_EVENT = "INSERT INTO inventory_event (created_at, command, sector, delta, stock) VALUES ({p}, {p}, {p}, {p}, {p})"
+REPLACE_STOCK = "REPLACE INTO inventory_stock (sector, stock, updated_at) VALUES ({p}, {p}, {p})"
+REPLACE_COUNTER = "REPLACE INTO inventory_counter (name, value, updated_at) VALUES ({p}, {p}, {p})"
+REPLACE_STATS = "REPLACE INTO inventory_stats (granularity, bucket, color, received, shipped) VALUES ({p}, {p}, {p}, {p}, {p})"
+SELECT_STATS = "SELECT granularity, bucket, color, received, shipped FROM inventory_stats ORDER BY granularity, bucket"
+
+
+class SQLiteDriver:
+  """SQLite 드라이버 : WAL 모드 (기록 중에도 조회 가능), synchronous=NORMAL (체크포인트 시에만 fsync)"""
+  placeholder = '?'
+  id_column = 'INTEGER PRIMARY KEY'
+
+  def __init__(self, path: str):
+    if not os.path.isabs(path):
+      path = os.path.join(os.path.dirname(os.path.abspath(__file__)), path)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    self.path = path
+    self.connection = None
+
+  def connect(self):
+    # 저장소 스레드에서 연결 (sqlite3 연결은 생성한 스레드에서만 사용)
+    self.connection = sqlite3.connect(self.path, isolation_level=None)
+    self.connection.execute("PRAGMA journal_mode=WAL")
+    self.connection.execute("PRAGMA synchronous=NORMAL")
+
+  def create_tables(self, statements):
+    for sql in statements:
+      self.connection.execute(sql)
+
+  def fetch_all(self, sql):
+    """조회 전용 연결로 실행 (WAL 이므로 저장소 스레드의 기록과 동시에 가능, 테이블이 없으면 빈 목록)"""
+    if not os.path.exists(self.path):
+      return []
+    connection = sqlite3.connect(self.path)
+    try:
+      return connection.execute(sql).fetchall()
+    except sqlite3.OperationalError:
+      return []
+    finally:
+      connection.close()
+
+  def execute_batch(self, statements):
+    """[(sql, rows), ...] 를 트랜잭션 1회로 실행"""
+    cursor = self.connection.cursor()
+    cursor.execute("BEGIN")
+    try:
+      for sql, rows in statements:
+        if rows:
+          cursor.executemany(sql, rows)
+      cursor.execute("COMMIT")
+    except Exception:
+      cursor.execute("ROLLBACK")
+      raise
+
+  def close(self):
+    if self.connection:
+      self.connection.close()
+      self.connection = None
+
+
+class MySQLDriver:
+  """MySQL 드라이버 (mysql-connector-python 필요)"""
+  placeholder = '%s'
+  id_column = 'BIGINT NOT NULL AUTO_INCREMENT PRIMARY KEY'
+
+  def __init__(self, host, port, user, password, database):
+    self.params = {'host': host, 'port': port, 'user': user, 'password': password, 'database': database}
+    self.connection = None
+
+  def connect(self):
+    import mysql.connector  # 선택 의존성 : MySQL 드라이버를 쓸 때만 필요
+    self.connection = mysql.connector.connect(autocommit=False, **self.params)
+
+  def create_tables(self, statements):
+    cursor = self.connection.cursor()
+    try:
+      for sql in statements:
+        cursor.execute(sql)
+      self.connection.commit()
+    finally:
+      cursor.close()
+
+  def fetch_all(self, sql):
+    import mysql.connector
+    connection = mysql.connector.connect(**self.params)
+    try:
+      cursor = connection.cursor()
+      try:
+        cursor.execute(sql)
+        return cursor.fetchall()
+      except mysql.connector.ProgrammingError:
+        return []  # 테이블 없음 (첫 실행)
+    finally:
+      connection.close()
+
+  def execute_batch(self, statements):
+    cursor = self.connection.cursor()
+    try:
+      for sql, rows in statements:
+        if rows:
+          cursor.executemany(sql, rows)
+      self.connection.commit()
+    except Exception:
+      self.connection.rollback()
+      raise
+    finally:
+      cursor.close()
+
+  def close(self):
+    if self.connection:
+      self.connection.close()
+      self.connection = None
+
+
+def create_driver(config=None):
+  """설정의 driver 값 ('sqlite' / 'mysql') 에 맞는 드라이버 생성"""
+  config = config or INVENTORY_STORE_CONFIG
+  if config['driver'] == 'sqlite':
+    return SQLiteDriver(config['sqlite_path'])
+  if config['driver'] == 'mysql':
+    return MySQLDriver(**config['mysql'])
+  raise ValueError(f"지원하지 않는 저장소 드라이버: {config['driver']}")
+
+
+class InventoryStore(threading.Thread):
+  def __init__(self, driver=None):
+    # daemon = True 옵션으로 메인 스레드 (lms_main.py)가 종료되면 즉시 종료되도록 설정
+    super().__init__(daemon=True)
+    self.config = INVENTORY_STORE_CONFIG
+    self.driver = driver or create_driver()
+    p = self.driver.placeholder
+    self.insert_event = INSERT_EVENT.format(p=p)
+    self.replace_stock = REPLACE_STOCK.format(p=p)
+    self.replace_counter = REPLACE_COUNTER.format(p=p)
+    self.replace_stats = REPLACE_STATS.format(p=p)
+
+    # 쓰기 대기 큐 : (시각, 명령, [(구역, 변화량, 재고)], {누적 이름: 값}, [통계 버킷 행])
+    self.pending = deque()
+    self.condition = threading.Condition()
+    self.stats = {'submitted': 0, 'written': 0, 'batches': 0, 'dropped': 0, 'errors': 0, 'last_batch_time': 0.0}
+    self.is_running = False
+
+  def submit(self, command: str, sectors, counters=None, stats=None):
+    """
+    재고 변경 내역을 큐에 추가 (락 / DB 접근 없음, 재고 트랜잭션 안에서 호출해 기록 순서 = 적용 순서)
+
+    Args:
+        command (str): 변경 원인 명령 (RI / SI / RC 등)
+        sectors: [(구역 이름, 변화량, 변경 후 재고), ...]
+        counters: {누적 재고 이름: 변경 후 값}
+        stats: [(단위, 버킷, 색상, 입고, 출고), ...] 변경 후 통계 버킷 값 (ThroughputStats.record 반환값)
+    """
+    with self.condition:
+      if len(self.pending) >= self.config['max_pending']:
+        self.pending.popleft()
+        self.stats['dropped'] += 1
+      self.pending.append((time.time(), command, sectors, counters or {}, stats or ()))
+      self.stats['submitted'] += 1
+      if len(self.pending) >= self.config['batch_size']:
+        self.condition.notify()
+
+  def _write_batch(self, batch):
+    events, stock, counters, stats = [], {}, {}, {}
+    for created_at, command, sectors, changed, rows in batch:
+      for sector, delta, value in sectors:
+        events.append((created_at, command, sector, delta, value))
+        stock[sector] = (sector, value, created_at)  # 최신 값만 남김
+      for name, value in changed.items():
+        counters[name] = (name, value, created_at)
+      for row in rows:
+        stats[row[:3]] = row
+    started = time.monotonic()
+    self.driver.execute_batch([
+      (self.insert_event, events),
+      (self.replace_stock, list(stock.values())),
+      (self.replace_counter, list(counters.values())),
+      (self.replace_stats, list(stats.values())),
+    ])
+    self.stats['last_batch_time'] = time.monotonic() - started
+    self.stats['written'] += len(batch)
+    self.stats['batches'] += 1
+
+  def flush(self):
+    """큐에 쌓인 기록을 batch_size 단위로 모두 기록 (저장소 스레드에서 호출)"""
+    while True:
+      with self.condition:
+        count = min(len(self.pending), self.config['batch_size'])
+        batch = [self.pending.popleft() for _ in range(count)]
+      if not batch:
+        return
+      try:
+        self._write_batch(batch)
+      except Exception as e:
+        self.stats['errors'] += 1
+        print(f"[저장소] 기록 실패: {e} ({len(batch)}건 재시도 대기)")
+        with self.condition:
+          self.pending.extendleft(reversed(batch))  # 순서를 유지한 채 큐 앞으로 되돌림
+        return
+
+  def load_stats(self):
+    """저장된 처리량 집계 행 조회 (시작 시 ThroughputStats.load 에 전달)"""
+    try:
+      return self.driver.fetch_all(SELECT_STATS)
+    except Exception as e:
+      print(f"[저장소] 통계 로드 실패: {e}")
+      return []
+
+  def run(self):
+    try:
+      self.driver.connect()
+      self.driver.create_tables([statement.format(id_column=self.driver.id_column) for statement in SCHEMA])
+    except Exception as e:
+      print(f"[저장소] 연결 실패: {e}")
+      return
+    self.is_running = True
+    while self.is_running:
+      with self.condition:
+        if len(self.pending) < self.config['batch_size']:
+          self.condition.wait(self.config['flush_interval'])
+      self.flush()
+    self.flush()
+    self.driver.close()
+
+  def stop(self):
+    """남은 기록을 모두 기록하고 저장소 종료"""
+    self.is_running = False
+    with self.condition:
+      self.condition.notify()
+    if self.is_alive():
+      self.join(timeout=5)
+    print("재고 저장소 종료")
+
+
+if __name__ == '__main__':
+  import sys
+  import tempfile
+  # 사용법 : python inventory_store.py [변경 건수] : submit 지연 / 일괄 기록 처리량 측정 (임시 SQLite 파일)
+  total = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+  store = InventoryStore(SQLiteDriver(os.path.join(tempfile.mkdtemp(prefix='lms_store_'), 'inventory.db')))
+  store.start()
+  started = time.monotonic()
+  for i in range(total):
+    store.submit('RI', [('RECEIVING', 1, i + 1)], {'receiving_total': i + 1})
+  submit_time = time.monotonic() - started
+  while store.stats['written'] + store.stats['dropped'] < total and store.is_alive():
+    time.sleep(0.05)
+  elapsed = time.monotonic() - started
+  store.stop()
+  stats = store.stats
+  print(f"submit 평균 {submit_time / total * 1e6:.1f}us, 기록 {stats['written']}건 / {elapsed:.2f}초 "
+        f"({stats['batches']}회 트랜잭션, 마지막 {stats['last_batch_time'] * 1000:.1f}ms)")
+  connection = sqlite3.connect(store.driver.path)
+  print("inventory_event:", connection.execute("SELECT COUNT(*) FROM inventory_event").fetchone()[0],
+        "/ inventory_stock:", connection.execute("SELECT sector, stock FROM inventory_stock").fetchall(),
+        "/ inventory_counter:", connection.execute("SELECT name, value FROM inventory_counter").fetchall())
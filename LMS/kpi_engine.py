@@ -0,0 +1,252 @@
+import os
+import sys
+import math
+import time
+import struct
+import threading
+from array import array
+from typing import Callable, Dict
+
+# stw_lib / communication import (상위 경로)
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from stw_lib.sector_manager2 import STORAGE_LANES
+from communication.message_protocol import MessageProtocol
+from config import KPI_ENGINE_CONFIG
+
+"""
+실시간 KPI 엔진 (최근 window 초 기준)
+
+- 입고 / 분류 / 출고 처리량 (개/분), 분류 사이클 평균 / p95 (ms), 레인별 점유율 평균 (%)
+- 지표마다 고정 크기 링 버퍼 (array('d') : 시각, 값) + 누적합을 두고, 이벤트 1건마다 O(1) 로 갱신한다.
+  처리량은 resolution 초 단위 슬롯에 합산하므로 이벤트가 몰려도 버퍼가 넘치지 않는다.
+- 백분위수는 발행 시점 (publish_interval 마다) 에만 창 안의 값을 정렬해 계산한다. (이벤트 경로에서 정렬 없음)
+- 점유율은 발행 시점마다 현재 레인 재고 / 용량을 표본으로 넣어 시간 가중 평균이 되도록 한다.
+- KU 프레임은 구독자 콜백으로 전달 (TCP 클라이언트는 KS 명령으로 구독 / 해제)
+"""
+
+STATUS_SUCCESS = 0x00
+STATUS_INVALID_DATA = 0x03
+
+# KU 데이터 : 입고 / 분류 / 출고 처리량 (0.1개/분 단위), 사이클 평균 / p95 (ms) + 레인별 점유율 (%, 1바이트)
+KPI_FORMAT = struct.Struct('<5H')
+
+
+class RollingWindow:
+  """최근 window 초의 (시각, 값) 링 버퍼 : 누적합 유지, 오래된 값은 추가 / 조회 시 앞에서부터 제거"""
+  __slots__ = ('window', 'resolution', 'times', 'values', 'head', 'size', 'total')
+
+  def __init__(self, window: float, capacity: int, resolution: float = 0.0):
+    self.window = window
+    self.resolution = resolution  # 0 이면 값마다 슬롯 1개 (백분위수용), 0 보다 크면 같은 슬롯에 합산
+    self.times = array('d', bytes(8 * capacity))
+    self.values = array('d', bytes(8 * capacity))
+    self.head = 0   # 가장 오래된 값 위치
+    self.size = 0
+    self.total = 0.0
+
+  def add(self, timestamp: float, value: float):
+    capacity = len(self.values)
+    if self.resolution and self.size:
+      last = (self.head + self.size - 1) % capacity
+      if timestamp - self.times[last] < self.resolution:
+        self.values[last] += value
+        self.total += value
+        return
+    if self.size == capacity:
+      self._pop()  # 버퍼가 가득 차면 가장 오래된 값을 덮어씀
+    i = (self.head + self.size) % capacity
+    self.times[i] = timestamp
+    self.values[i] = value
+    self.size += 1
+    self.total += value
+    self.expire(timestamp)
+
+  def expire(self, now: float):
+    cutoff = now - self.window
+    while self.size and self.times[self.head] < cutoff:
+      self._pop()
+
+  def _pop(self):
+    self.total -= self.values[self.head]
+    self.head = (self.head + 1) % len(self.values)
+    self.size -= 1
+    if not self.size:
+      self.total = 0.0  # 부동소수 누적 오차 초기화
+
+  def mean(self) -> float:
+    return self.total / self.size if self.size else 0.0
+
+  def rate(self) -> float:
+    """창 전체 기준 분당 합계"""
+    return self.total * 60.0 / self.window
+
+  def percentile(self, q: float) -> float:
+    if not self.size:
+      return 0.0
+    end = self.head + self.size
+    capacity = len(self.values)
+    samples = self.values[self.head:end] if end <= capacity else self.values[self.head:] + self.values[:end - capacity]
+    samples = sorted(samples)
+    return samples[max(0, math.ceil(q * len(samples)) - 1)]
+
+
+class KpiEngine(threading.Thread):
+  def __init__(self, sender: Callable = None):
+    """
+    Args:
+        sender: TCP 구독자 송신 함수 (client_address, frame) -> bool (TCPHandler.send_to)
+    """
+    # daemon = True 옵션으로 메인 스레드 (lms_main.py)가 종료되면 즉시 종료되도록 설정
+    super().__init__(daemon=True)
+    self.config = KPI_ENGINE_CONFIG
+    self.sender = sender
+    window = self.config['window']
+    resolution = self.config['resolution']
+    slots = int(math.ceil(window / resolution)) + 1
+    self.received = RollingWindow(window, slots, resolution)
+    self.sorted = RollingWindow(window, slots, resolution)
+    self.shipped = RollingWindow(window, slots, resolution)
+    self.cycles = RollingWindow(window, self.config['max_samples'])
+    samples = int(math.ceil(window / self.config['publish_interval'])) + 1
+    self.utilization = [RollingWindow(window, samples) for _ in STORAGE_LANES]
+    self.capacities = [lane['capacity'] for lane in STORAGE_LANES]
+    self.lane_stock = [0] * len(STORAGE_LANES)
+
+    self.lock = threading.Lock()
+    self.subscribers: Dict[str, Callable] = {}
+    self.frame = b''
+    self.stop_event = threading.Event()
+    self.is_running = False
+
+  def register_subscriber(self, name: str, callback: Callable):
+    """KU 프레임 콜백 등록 (callback(frame) 이 False 를 반환하면 구독 해제)"""
+    self.subscribers[name] = callback
+
+  def unregister_subscriber(self, name: str):
+    self.subscribers.pop(name, None)
+
+  # --- 이벤트 입력 ---
+  def on_inventory_event(self, event: dict):
+    """InventoryManager 구독 콜백 : 재고 트랜잭션 1건 (재고 관리자 트랜잭션 안에서 호출되므로 O(1) 만 수행)"""
+    timestamp = event['timestamp']
+    with self.lock:
+      if event['received']:
+        self.received.add(timestamp, event['received'])
+      sorted_count = sum(event['lane_received'])
+      if sorted_count:
+        self.sorted.add(timestamp, sorted_count)
+      if event['shipped']:
+        self.shipped.add(timestamp, event['shipped'])
+      self.lane_stock = event['lane_stock']
+
+  def on_agv_event(self, event: dict):
+    """AgvGateway 구독 콜백 : CI 수신 시 분류 사이클 지연 (초) 기록"""
+    latency = event.get('cycle_latency')
+    if latency is not None:
+      with self.lock:
+        self.cycles.add(time.time(), latency)
+
+  # --- KU 프레임 ---
+  def snapshot(self, now: float = None) -> dict:
+    """현재 KPI 값 (발행 시점마다 호출 : 오래된 값 제거 + 점유율 표본 추가 + 백분위수 계산)"""
+    now = now or time.time()
+    with self.lock:
+      for series in (self.received, self.sorted, self.shipped, self.cycles):
+        series.expire(now)
+      for lane, series in enumerate(self.utilization):
+        capacity = self.capacities[lane]
+        series.add(now, self.lane_stock[lane] / capacity if capacity else 0.0)
+      return {
+        'received_per_min': self.received.rate(),
+        'sorted_per_min': self.sorted.rate(),
+        'shipped_per_min': self.shipped.rate(),
+        'cycle_mean': self.cycles.mean(),
+        'cycle_p95': self.cycles.percentile(self.config['percentile']),
+        'utilization': [series.mean() for series in self.utilization],
+      }
+
+  @staticmethod
+  def pack_kpi_frame(kpi: dict) -> bytes:
+    """KU 프레임 : Command(2) + Status(1) + KPI(10) + 레인별 점유율(1 x 레인 수) + End(1)"""
+    clamp = lambda value: max(0, min(int(round(value)), 0xFFFF))
+    data = KPI_FORMAT.pack(clamp(kpi['received_per_min'] * 10), clamp(kpi['sorted_per_min'] * 10),
+                           clamp(kpi['shipped_per_min'] * 10), clamp(kpi['cycle_mean'] * 1000),
+                           clamp(kpi['cycle_p95'] * 1000))
+    data += bytes(min(int(round(value * 100)), 100) for value in kpi['utilization'])
+    return MessageProtocol.pack_variable_response('KU', STATUS_SUCCESS, data)
+
+  def publish(self, now: float = None) -> bytes:
+    self.frame = self.pack_kpi_frame(self.snapshot(now))
+    for name, callback in list(self.subscribers.items()):
+      try:
+        if callback(self.frame) is False:
+          self.unregister_subscriber(name)  # 연결이 끊긴 구독자
+      except Exception as e:
+        print(f"[KPI] {name} 콜백 오류: {e}")
+    return self.frame
+
+  # --- TCP 명령 (KS) ---
+  def handle_ks(self, client_address, data: bytes) -> bytes:
+    """KS : Data[0] = 1 구독 / 0 해제, 성공 응답에 현재 KU 데이터 포함 (이후 publish_interval 마다 KU 송신)"""
+    name = f"tcp:{client_address[0]}:{client_address[1]}"
+    if data[0] == 1:
+      if self.sender is None:
+        return MessageProtocol.pack_response('KS', STATUS_INVALID_DATA)
+      self.register_subscriber(name, lambda frame: self.sender(client_address, frame))
+    elif data[0] == 0:
+      self.unregister_subscriber(name)
+    else:
+      return MessageProtocol.pack_response('KS', STATUS_INVALID_DATA)
+    return MessageProtocol.pack_variable_response('KS', STATUS_SUCCESS, self.frame[3:-1])
+
+  def run(self):
+    self.is_running = True
+    interval = self.config['publish_interval']
+    try:
+      while not self.stop_event.wait(interval):
+        self.publish()
+    except Exception as e:
+      print(f"KPI 엔진 처리 오류: {e}")
+    finally:
+      self.is_running = False
+
+  def stop(self):
+    """KPI 엔진 중지"""
+    self.stop_event.set()
+    if self.is_alive():
+      self.join(timeout=1.0)
+
+
+if __name__ == '__main__':
+  import random
+  # 사용법 : python kpi_engine.py [이벤트 수] : 이벤트 1건 처리 시간 / KU 발행 시간 측정
+  total = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+  engine = KpiEngine()
+  rng = random.Random(0)
+  lanes = len(STORAGE_LANES)
+  events = []
+  now = time.time() - KPI_ENGINE_CONFIG['window']
+  for i in range(total):
+    lane = rng.randrange(lanes)
+    kind = rng.random()
+    lane_received = [0] * lanes
+    if 0.33 <= kind < 0.66:
+      lane_received[lane] = 1
+    events.append({'command': 'RI', 'timestamp': now + i * KPI_ENGINE_CONFIG['window'] / total,
+                   'received': int(kind < 0.33), 'shipped': int(kind >= 0.66),
+                   'lane_received': lane_received, 'lane_shipped': [0] * lanes,
+                   'lane_stock': [rng.randrange(lane['capacity'] + 1) for lane in STORAGE_LANES]})
+  started = time.perf_counter()
+  for event in events:
+    engine.on_inventory_event(event)
+  inventory_time = time.perf_counter() - started
+  started = time.perf_counter()
+  for i in range(total):
+    engine.on_agv_event({'command': 'CI', 'cycle_latency': 1.5 + rng.random()})
+  agv_time = time.perf_counter() - started
+  started = time.perf_counter()
+  frame = engine.publish()
+  publish_time = time.perf_counter() - started
+  print(f"재고 이벤트 {inventory_time / total * 1e6:.2f}us/건, AGV 이벤트 {agv_time / total * 1e6:.2f}us/건, "
+        f"KU 발행 {publish_time * 1000:.2f}ms ({len(frame)}바이트)")
+  print(engine.snapshot())
@@ -0,0 +1,111 @@
+import signal
+import time
+from tcp_handler import TCPHandler
+from serial_handler import SerialHandler, SerialWatchdog
+from actuator_scheduler import ActuatorScheduler
+from inventory_manager import InventoryManager
+from inventory_journal import InventoryJournal
+from inventory_store import InventoryStore
+from kpi_engine import KpiEngine
+from order_queue import OrderQueue
+from backorder_queue import BackorderQueue
+from inbound_controller import InboundController
+from agv_gateway import AgvGateway, RobotService, track_robot
+from stw_lib.sector_manager2 import Robot
+from command_scheduler import CommandScheduler
+from request_dedupe import RequestDedupe
+
+"""
+물류 서버 (LMS) 메인
+
+- TCP 핸들러 : GUI 명령 수신 -> 재고 관리자 처리 -> 응답, 연결별 명령 큐 / 전체 대기 명령 수 제한 (초과 시 BUSY)
+  AS / KS 구독 프레임은 연결별 송신함에 최신 값만 유지 (느린 클라이언트가 LMS 를 막지 않음)
+- 시리얼 핸들러 + 워치독 : Storage Box 연결 유지, 장애 시 재연결 (LMS 재시작 불필요)
+- 액추에이터 스케줄러 : 모터 명령 페이싱 / 카운트 조회 -> 재고 관리자 반영
+- 재고 저널 : 재고 변경 기록 / 스냅샷, 시작 시 이전 재고 복구
+- 재고 이력 저장소 : 변경 이력을 SQLite (WAL) / MySQL 에 일괄 기록 (write-behind)
+- 출고 주문 큐 : 배치 창 안에 들어온 SI 주문을 묶어 트랜잭션 1회로 순서대로 처리
+- KPI 엔진 : 최근 1분 처리량 / 레인 점유율을 이벤트마다 갱신, KS 로 구독한 GUI 에 KU 발행
+- AGV 게이트웨이 : ESP-NOW 메시지 (UCx / CI) 수신 -> KPI 엔진 분류 사이클 지연, 적재 AGV 상태 머신 진행 (전송 계층을 열 수 없으면 AGV 없이 동작)
+  GUI 로봇 이동 (RM) 은 게이트웨이로 송신, 도착은 RQ 상태 조회로 GUI 에 전달
+- 출고 대기 주문 : 재고 부족 SI 를 보관하고, 해당 색상 재고가 들어오면 자동 출고 (BQ 로 현황 조회)
+- 입고 흐름 제어 : RI 수량을 대기열에 넣고 레인 빈 자리 / 출고 속도에 맞춰 1개씩 입고 구역에 투입 (최소 간격 = 스테퍼 구동 창)
+- 명령 스케줄러 : TCP 명령을 control (RH / 초기화) > operator (RI / SI) > telemetry (RA) 우선순위로 처리
+- 요청 중복 제거 : 요청 ID 가 붙은 RI / SI 재전송은 다시 실행하지 않고 처음 응답을 반환
+- 프레임 탭 : TCP 송수신 프레임을 링 버퍼에 기록, SIGUSR1 (kill -USR1 <pid>) 수신 시 캡처 파일로 덤프
+"""
+
+
+def main():
+  serial_handler = SerialHandler()
+  journal = InventoryJournal()
+  store = InventoryStore()
+  order_queue = OrderQueue()
+  backorders = BackorderQueue()
+  inbound = InboundController()
+  inventory_manager = InventoryManager(serial_sender=serial_handler, journal=journal, store=store, order_queue=order_queue,
+                                       backorders=backorders, inbound=inbound)
+  watchdog = SerialWatchdog(serial_handler, on_status=inventory_manager.on_device_status)
+  scheduler = ActuatorScheduler(serial_handler, on_count=inventory_manager.on_count)
+  inbound.min_interval = scheduler.actuation_window  # 구동 창 안에 도착한 물품은 분류 / IR 카운트를 놓침
+  command_scheduler = CommandScheduler(command_handler=inventory_manager.handle_command)
+  inventory_manager.preempt = command_scheduler.yield_point
+  backorders.preempt = command_scheduler.yield_point
+  request_dedupe = RequestDedupe(command_handler=command_scheduler.execute)
+  tcp_handler = TCPHandler(command_handler=request_dedupe.execute)
+  inventory_manager.sender = tcp_handler.send_to
+  kpi_engine = KpiEngine(sender=tcp_handler.send_to)
+  inventory_manager.register_subscriber('kpi', kpi_engine.on_inventory_event)
+  inventory_manager.client_handlers['KS'] = kpi_engine.handle_ks
+  try:
+    gateway = AgvGateway()
+    gateway.register_subscriber('kpi', kpi_engine.on_agv_event)
+    robot = Robot("AGV_1")
+    track_robot(gateway, robot)  # 실제 송신 / 도착 (CI) 이벤트로만 구간 이동 시간 기록
+    inventory_manager.handlers.update(RobotService(gateway, robot).handlers())  # GUI RM (이동) / RQ (상태 조회)
+  except Exception as e:
+    gateway = None
+    print(f"AGV 게이트웨이 시작 실패 (AGV 이벤트 없이 동작): {e}")
+  if hasattr(signal, 'SIGUSR1'):  # Windows 에는 SIGUSR1 없음 (tcp_handler.dump_capture 직접 호출)
+    signal.signal(signal.SIGUSR1, lambda signum, frame: tcp_handler.dump_capture())
+
+  # 시리얼 포트는 워치독이 열고 유지 (장치가 없어도 TCP 서버는 캐시로 동작)
+  journal.start()
+  store.start()
+  order_queue.start()
+  backorders.start()
+  inbound.start()
+  serial_handler.start()
+  watchdog.start()
+  scheduler.start()
+  kpi_engine.start()
+  if gateway is not None:
+    gateway.start()
+  command_scheduler.start()
+  tcp_handler.start()
+  print("LMS 서버 시작")
+
+  try:
+    while True:
+      time.sleep(1)
+  except KeyboardInterrupt:
+    print("LMS 서버 종료 요청")
+  finally:
+    tcp_handler.stop()
+    command_scheduler.stop()
+    order_queue.stop()
+    backorders.stop()
+    inbound.stop()
+    if gateway is not None:
+      gateway.stop()
+    kpi_engine.stop()
+    scheduler.stop()
+    watchdog.stop()
+    serial_handler.stop()
+    inventory_manager.checkpoint()  # 종료 시 스냅샷 : 다음 시작 시 재생할 저널 없음
+    journal.stop()
+    store.stop()
+
+
+if __name__ == '__main__':
+  main()
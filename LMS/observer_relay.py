@@ -0,0 +1,316 @@
+import os
+import sys
+import time
+import socket
+import threading
+from typing import Dict
+
+# stw_lib / communication import (상위 경로)
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from stw_lib.sector_manager2 import STORAGE_LANES
+from communication.message_protocol import MessageProtocol
+from tcp_handler import TCPHandler
+from config import OBSERVER_RELAY_CONFIG
+
+"""
+관찰자 중계 서버 (읽기 전용 fan-out relay)
+
+- 벽면 모니터 / 원격 노트북 등 관찰용 클라이언트를 LMS 대신 받는 별도 프로세스 (python observer_relay.py)
+- LMS 와는 연결 1개만 유지 : AS (재고) / KS (KPI) 구독 + bq_interval 마다 BQ 조회 1회
+  -> 관찰자 수와 관계없이 LMS 부하는 일정
+- 최신 AU / KU / BU 프레임을 캐시하고, 관찰자에게 같은 17바이트 프로토콜로 응답한다.
+  - RA -> 캐시된 AU, BQ -> 캐시된 BU
+  - AS / KS -> 관찰자별 구독 (LMS 에서 새 프레임이 오면 구독자 송신함에 넣음, 느린 관찰자는 최신 값만 받음)
+  - 그 외 명령 (RI / SI / 초기화 등 쓰기 명령) 은 READ_ONLY 응답 (LMS 로 전달하지 않음)
+- LMS 연결이 끊기면 reconnect_interval 마다 재연결, 그동안은 마지막 캐시로 응답
+"""
+
+STATUS_SUCCESS = 0x00
+STATUS_READ_ONLY = 0x06
+
+LANE_COUNT = len(STORAGE_LANES)
+
+
+def frame_size(data_size: int) -> int:
+  """가변 길이 응답 전체 길이 : Command(2) + Status(1) + Data(14 이상) + End(1)"""
+  return 3 + max(14, data_size) + 1
+
+
+# LMS 에서 받는 프레임 종류 -> 전체 길이 (구독 응답 / 구독 프레임 / BQ 응답)
+UPSTREAM_FRAME_SIZES = {
+  b'AS': MessageProtocol.au_frame_size(LANE_COUNT),
+  b'AU': MessageProtocol.au_frame_size(LANE_COUNT),
+  b'KS': frame_size(10 + LANE_COUNT),
+  b'KU': frame_size(10 + LANE_COUNT),
+  b'BU': frame_size(2 * (2 + LANE_COUNT)),
+}
+
+
+class ObserverRelay(threading.Thread):
+  def __init__(self, upstream_host: str = None, upstream_port: int = None, port: int = None):
+    # daemon = True 옵션으로 메인 스레드가 종료되면 즉시 종료되도록 설정
+    super().__init__(daemon=True)
+    self.config = OBSERVER_RELAY_CONFIG
+    self.upstream_address = (upstream_host or self.config['upstream_host'], upstream_port or self.config['upstream_port'])
+    self.upstream = None
+    self.upstream_lock = threading.Lock()   # LMS 송신 직렬화 (구독 / BQ 조회)
+
+    # 관찰자 서버 : TCPHandler 재사용 (연결별 명령 큐 / 구독 송신함)
+    self.server = TCPHandler(command_handler=self.handle_command)
+    self.server.host = self.config['host']
+    self.server.port = port or self.config['port']
+
+    # 최신 프레임 캐시 (LMS 연결 전에는 빈 재고)
+    self.frames: Dict[bytes, bytes] = {
+      b'AU': MessageProtocol.pack_stock_frame([0] * MessageProtocol.stock_field_count(LANE_COUNT)),
+      b'KU': MessageProtocol.pack_variable_response('KU', STATUS_SUCCESS, b''),
+      b'BU': MessageProtocol.pack_variable_response('BU', STATUS_SUCCESS, b''),
+    }
+    self.subscribers = {b'AU': set(), b'KU': set()}   # 프레임 종류 -> 구독 관찰자 주소
+    self.lock = threading.Lock()
+    self.counters = {'upstream_frames': 0, 'upstream_sent': 0, 'reconnects': 0, 'served': 0, 'rejected': 0}
+    self.is_running = False
+
+  # --- 관찰자 명령 ---
+  def handle_command(self, client_address, message: bytes) -> bytes:
+    """TCPHandler 콜백 : 캐시로 응답 (LMS 로 전달하지 않음), 쓰기 명령은 READ_ONLY"""
+    command = message[:2]
+    with self.lock:
+      self.counters['served'] += 1
+      if command == b'RA':
+        return self.frames[b'AU']
+      if command == b'BQ':
+        return self.frames[b'BU']
+      if command in (b'AS', b'KS'):
+        return self._subscribe(client_address, command, message[2])
+      self.counters['rejected'] += 1
+    return MessageProtocol.pack_response(command.decode('ascii', 'replace'), STATUS_READ_ONLY)
+
+  def _subscribe(self, client_address, command: bytes, subscribe: int) -> bytes:
+    """AS / KS : 관찰자 구독 등록 / 해제, 응답에 현재 캐시 데이터 포함 (self.lock 잠금 상태에서 호출)"""
+    kind = b'AU' if command == b'AS' else b'KU'
+    if subscribe == 1:
+      self.subscribers[kind].add(client_address)
+    else:
+      self.subscribers[kind].discard(client_address)
+    return MessageProtocol.pack_variable_response(command.decode(), STATUS_SUCCESS, self.frames[kind][3:-1])
+
+  # --- LMS 연결 ---
+  def _connect(self) -> bool:
+    try:
+      upstream = socket.create_connection(self.upstream_address, timeout=self.config['reconnect_interval'])
+      upstream.settimeout(None)
+      with self.upstream_lock:
+        self.upstream = upstream
+        for command in ('AS', 'KS'):
+          upstream.sendall(MessageProtocol.pack_command(command, MessageProtocol.pack_subscribe_data(True)))
+        self.counters['upstream_sent'] += 2
+      print(f"[중계] LMS 연결: {self.upstream_address[0]}:{self.upstream_address[1]}")
+      return True
+    except OSError as e:
+      print(f"[중계] LMS 연결 실패: {e}")
+      return False
+
+  def _recv_exact(self, size: int) -> bytes:
+    data = b''
+    while len(data) < size:
+      chunk = self.upstream.recv(size - len(data))
+      if not chunk:
+        raise ConnectionError("LMS 연결 종료")
+      data += chunk
+    return data
+
+  def _read_upstream(self):
+    """LMS 프레임 수신 반복 : 종류별 길이로 프레임을 나눠 캐시 갱신 후 구독 관찰자에게 전달"""
+    while self.is_running:
+      header = self._recv_exact(3)
+      if header[2] != STATUS_SUCCESS:
+        self._recv_exact(MessageProtocol.RESPONSE_SIZE - 3)
+        continue  # BUSY 등 (고정 길이 응답) : 다음 조회 / 구독 프레임을 기다림
+      size = UPSTREAM_FRAME_SIZES.get(header[:2])
+      if size is None:
+        raise ConnectionError(f"알 수 없는 프레임: {header[:2]!r}")
+      frame = header + self._recv_exact(size - 3)
+      kind = {b'AS': b'AU', b'KS': b'KU'}.get(frame[:2], frame[:2])
+      if kind != frame[:2]:
+        frame = kind + frame[2:]  # 구독 응답 = 현재 값 : 구독 프레임과 같은 형식으로 저장
+      with self.lock:
+        self.frames[kind] = frame
+        self.counters['upstream_frames'] += 1
+        subscribers = list(self.subscribers.get(kind, ()))
+      for client_address in subscribers:
+        if not self.server.send_to(client_address, frame):
+          with self.lock:
+            self.subscribers[kind].discard(client_address)  # 연결이 끊긴 관찰자
+
+  def _poll_backorders(self):
+    """bq_interval 마다 BQ 조회 (응답은 _read_upstream 에서 수신)"""
+    while self.is_running:
+      time.sleep(self.config['bq_interval'])
+      with self.upstream_lock:
+        if self.upstream is None:
+          continue
+        try:
+          self.upstream.sendall(MessageProtocol.pack_command('BQ', MessageProtocol.pack_bq_data()))
+          self.counters['upstream_sent'] += 1
+        except OSError:
+          pass  # 수신 스레드가 연결 끊김을 처리
+
+  def run(self):
+    self.is_running = True
+    self.server.start()
+    threading.Thread(target=self._poll_backorders, daemon=True).start()
+    while self.is_running:
+      if not self._connect():
+        time.sleep(self.config['reconnect_interval'])
+        continue
+      try:
+        self._read_upstream()
+      except (OSError, ConnectionError) as e:
+        if self.is_running:
+          print(f"[중계] LMS 연결 끊김: {e}")
+      with self.upstream_lock:
+        try:
+          self.upstream.close()
+        except OSError:
+          pass
+        self.upstream = None
+      if self.is_running:
+        self.counters['reconnects'] += 1
+        time.sleep(self.config['reconnect_interval'])
+
+  def stats(self) -> dict:
+    with self.lock:
+      return {
+        'observers': len(self.server.clients),
+        'subscribers': {kind.decode(): len(clients) for kind, clients in self.subscribers.items()},
+        **self.counters,
+      }
+
+  def stop(self):
+    self.is_running = False
+    self.server.stop()
+    with self.upstream_lock:
+      if self.upstream is not None:
+        try:
+          self.upstream.close()
+        except OSError:
+          pass
+
+
+if __name__ == '__main__':
+  import random
+  # 사용법 : python observer_relay.py                  -> 중계 서버 실행 (OBSERVER_RELAY_CONFIG 의 LMS 에 연결)
+  #          python observer_relay.py bench [관찰자 수] -> 관찰자 수에 따른 LMS 처리 명령 수 (직접 연결 / 중계)
+  if len(sys.argv) < 2 or sys.argv[1] != 'bench':
+    relay = ObserverRelay()
+    relay.start()
+    try:
+      while True:
+        time.sleep(10)
+        print(f"[중계] {relay.stats()}")
+    except KeyboardInterrupt:
+      relay.stop()
+    sys.exit(0)
+
+  observers = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+  duration = 3.0
+
+  def free_port() -> int:
+    with socket.socket() as probe:
+      probe.bind(('localhost', 0))
+      return probe.getsockname()[1]
+
+  def fake_lms():
+    """LMS 대용 : AS / KS 구독과 RA / BQ 만 처리, 0.1초마다 재고 변경 (AU 구독 프레임)"""
+    handled = {'count': 0}
+    state = {'stock': [0] * MessageProtocol.stock_field_count(LANE_COUNT)}
+    subscribers = set()
+
+    def handler(client_address, message):
+      handled['count'] += 1
+      command = message[:2]
+      if command == b'AS':
+        subscribers.add(client_address)
+        return MessageProtocol.pack_variable_response('AS', STATUS_SUCCESS, MessageProtocol.pack_stock_frame(state['stock'])[3:-1])
+      if command == b'KS':
+        return MessageProtocol.pack_variable_response('KS', STATUS_SUCCESS, b'')
+      if command == b'BQ':
+        return MessageProtocol.pack_variable_response('BU', STATUS_SUCCESS, b'')
+      return MessageProtocol.pack_stock_frame(state['stock'])
+
+    server = TCPHandler(command_handler=handler)
+    server.port = free_port()
+    server.start()
+
+    def change():
+      while server.is_running or not handled['count']:
+        time.sleep(0.1)
+        state['stock'][0] = (state['stock'][0] + 1) % 20
+        for client_address in list(subscribers):
+          server.send_to(client_address, MessageProtocol.pack_stock_frame(state['stock']))
+
+    threading.Thread(target=change, daemon=True).start()
+    return server, handled
+
+  def observe(port: int, count: int):
+    """관찰자 count 개 : AS 구독 + 0.5초마다 RA 조회, 받은 재고 프레임 수 반환"""
+    frames = [0]
+    frames_lock = threading.Lock()
+    stop = threading.Event()
+
+    def observer(seed):
+      rng = random.Random(seed)
+      time.sleep(seed * 0.005)  # 접속 분산 (listen 대기열)
+      sock = socket.create_connection(('localhost', port))
+      sock.settimeout(0.1)
+      sock.sendall(MessageProtocol.pack_command('AS', MessageProtocol.pack_subscribe_data(True)))
+      if seed == 0:
+        sock.sendall(MessageProtocol.pack_command('RI', MessageProtocol.pack_ri_data(1, 0)))  # 쓰기 명령 : 중계 서버는 거절
+      next_poll = time.monotonic() + rng.random() * 0.5
+      while not stop.is_set():
+        if time.monotonic() >= next_poll:
+          sock.sendall(MessageProtocol.pack_command('RA', MessageProtocol.pack_ra_data()))
+          next_poll += 0.5
+        try:
+          data = sock.recv(4096)
+        except socket.timeout:
+          continue
+        except OSError:
+          break
+        if not data:
+          break
+        with frames_lock:
+          frames[0] += len(data) // 18
+      sock.close()
+
+    threads = [threading.Thread(target=observer, args=(i,)) for i in range(count)]
+    for thread in threads:
+      thread.start()
+    time.sleep(duration)
+    stop.set()
+    for thread in threads:
+      thread.join()
+    return frames[0]
+
+  print(f"관찰자 : AS 구독 + 0.5초마다 RA, {duration:.0f}초")
+  for count in (1, observers // 5, observers):
+    lms, handled = fake_lms()
+    time.sleep(0.2)
+    received = observe(lms.port, count)
+    direct = handled['count']
+    lms.stop()
+
+    lms, handled = fake_lms()
+    relay = ObserverRelay('localhost', lms.port, free_port())
+    relay.config = dict(OBSERVER_RELAY_CONFIG, bq_interval=1.0)
+    relay.start()
+    time.sleep(0.5)
+    before = handled['count']
+    relayed = observe(relay.server.port, count)
+    through_relay = handled['count'] - before
+    stats = relay.stats()
+    relay.stop()
+    lms.stop()
+    print(f"[관찰자 {count}개] LMS 처리 명령 : 직접 {direct}건 / 중계 {through_relay}건, "
+          f"관찰자 수신 프레임 : 직접 {received} / 중계 {relayed}, 중계 거절 {stats['rejected']}건")
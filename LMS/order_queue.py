@@ -0,0 +1,174 @@
+import time
+import threading
+from collections import deque
+from typing import Callable, Optional
+from config import ORDER_QUEUE_CONFIG
+
+"""
+출고 주문 큐 (SI 배치 처리)
+
+- SI 요청은 바로 재고를 옮기지 않고 주문 큐에 들어간다.
+- 첫 주문이 들어온 뒤 batch_window 초 동안 (또는 max_batch 건이 모일 때까지) 들어온 주문을 하나의 배치로 묶어
+  도착 순서대로 dispatcher(orders) 에 전달한다. (재고 관리자 트랜잭션 1회, 저널 fsync 1회, AU 갱신 1회)
+- 각 요청 스레드는 자기 주문의 결과가 나올 때까지 OrderTicket 으로 대기한 뒤 응답한다.
+- stats() : 큐 길이, 대기 시간 (큐 진입 -> 배치 시작), 처리 시간 (큐 진입 -> 결과), 배치 크기
+"""
+
+
+class OrderTicket:
+  """출고 주문 1건의 진행 상태"""
+  __slots__ = ('order', 'enqueued_at', 'dispatched_at', 'done_at', 'success', 'event')
+
+  def __init__(self, order: dict):
+    self.order = order
+    self.enqueued_at = time.monotonic()
+    self.dispatched_at = None
+    self.done_at = None
+    self.success = None
+    self.event = threading.Event()
+
+  def wait(self, timeout: Optional[float] = None) -> bool:
+    self.event.wait(timeout)
+    return bool(self.success)
+
+
+class OrderQueue(threading.Thread):
+  def __init__(self, dispatcher: Callable = None):
+    """
+    Args:
+        dispatcher: dispatcher(orders) -> [성공 여부, ...] : 주문 목록을 순서대로 처리 (InventoryManager.ship_batch)
+    """
+    # daemon = True 옵션으로 메인 스레드 (lms_main.py)가 종료되면 즉시 종료되도록 설정
+    super().__init__(daemon=True)
+    self.dispatcher = dispatcher
+    self.batch_window = ORDER_QUEUE_CONFIG['batch_window']
+    self.max_batch = ORDER_QUEUE_CONFIG['max_batch']
+
+    self.queue = deque()
+    self.condition = threading.Condition()
+
+    samples = ORDER_QUEUE_CONFIG['max_latency_samples']
+    self.wait_times = deque(maxlen=samples)     # 큐 진입 -> 배치 시작
+    self.order_latencies = deque(maxlen=samples)  # 큐 진입 -> 결과
+    self.batch_sizes = deque(maxlen=samples)
+    self.counters = {'orders': 0, 'batches': 0, 'shipped': 0, 'failed': 0}
+    self.is_running = False
+
+  def submit(self, order: dict) -> OrderTicket:
+    """출고 주문 등록 ({색상: 수량}) : 배치 처리 후 ticket.wait() 로 결과 확인"""
+    ticket = OrderTicket(order)
+    with self.condition:
+      self.queue.append(ticket)
+      self.condition.notify()
+    return ticket
+
+  def cancel(self, ticket: OrderTicket) -> bool:
+    """배치 시작 전 주문 취소 (이미 배치 처리 중이거나 끝난 주문이면 False)"""
+    with self.condition:
+      try:
+        self.queue.remove(ticket)
+      except ValueError:
+        return False
+    ticket.success = False
+    ticket.event.set()
+    return True
+
+  def queue_depth(self) -> int:
+    with self.condition:
+      return len(self.queue)
+
+  def stats(self) -> dict:
+    """큐 길이, 대기 / 처리 시간 (ms), 배치 크기 통계"""
+    def summary(samples, scale=1000):
+      ordered = sorted(samples)
+      if not ordered:
+        return {'count': 0, 'mean': 0.0, 'p95': 0.0, 'max': 0.0}
+      return {
+        'count': len(ordered),
+        'mean': sum(ordered) / len(ordered) * scale,
+        'p95': ordered[max(0, int(len(ordered) * 0.95) - 1)] * scale,
+        'max': ordered[-1] * scale,
+      }
+    return {
+      'queue_depth': self.queue_depth(),
+      'wait_time': summary(self.wait_times),
+      'order_latency': summary(self.order_latencies),
+      'batch_size': summary(self.batch_sizes, 1),
+      **self.counters,
+    }
+
+  def _next_batch(self):
+    """첫 주문 도착 후 batch_window 가 지나거나 max_batch 건이 모이면 배치를 꺼냄 (condition 잠금 상태에서 호출)"""
+    while self.is_running:
+      if not self.queue:
+        self.condition.wait()
+        continue
+      remaining = self.queue[0].enqueued_at + self.batch_window - time.monotonic()
+      if remaining > 0 and len(self.queue) < self.max_batch:
+        self.condition.wait(remaining)
+        continue
+      count = min(len(self.queue), self.max_batch)
+      return [self.queue.popleft() for _ in range(count)]
+    return []
+
+  def run(self):
+    self.is_running = True
+    while self.is_running:
+      with self.condition:
+        batch = self._next_batch()
+      if batch:
+        self._dispatch(batch)
+
+  def _dispatch(self, batch):
+    now = time.monotonic()
+    for ticket in batch:
+      ticket.dispatched_at = now
+      self.wait_times.append(now - ticket.enqueued_at)
+    try:
+      results = self.dispatcher([ticket.order for ticket in batch])
+    except Exception as e:
+      print(f"[주문 큐] 배치 처리 오류: {e}")
+      results = [False] * len(batch)
+    now = time.monotonic()
+    self.counters['orders'] += len(batch)
+    self.counters['batches'] += 1
+    self.batch_sizes.append(len(batch))
+    for ticket, success in zip(batch, results):
+      ticket.success = success
+      ticket.done_at = now
+      self.counters['shipped' if success else 'failed'] += 1
+      self.order_latencies.append(now - ticket.enqueued_at)
+      ticket.event.set()
+
+  def stop(self):
+    """주문 큐 중지 (대기 중인 주문은 실패 처리)"""
+    self.is_running = False
+    with self.condition:
+      while self.queue:
+        ticket = self.queue.popleft()
+        ticket.success = False
+        ticket.event.set()
+      self.condition.notify_all()
+
+
+if __name__ == '__main__':
+  import random
+  # 배치 창 안에 들어온 주문이 한 번에 처리되는지 / 주문별 대기 시간 측정
+  dispatched = []
+
+  def dispatcher(orders):
+    dispatched.append(len(orders))
+    return [True] * len(orders)
+
+  order_queue = OrderQueue(dispatcher)
+  order_queue.start()
+  rng = random.Random(0)
+  tickets = []
+  for _ in range(50):
+    tickets.append(order_queue.submit({'RED': rng.randrange(3), 'GREEN': rng.randrange(3)}))
+    time.sleep(rng.random() * ORDER_QUEUE_CONFIG['batch_window'] / 4)
+  for ticket in tickets:
+    ticket.wait(5)
+  print(f"주문 {len(tickets)}건 / 배치 {len(dispatched)}회 (배치 크기 {dispatched})")
+  print(order_queue.stats())
+  order_queue.stop()
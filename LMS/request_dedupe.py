@@ -0,0 +1,150 @@
+import os
+import sys
+import time
+import threading
+from collections import OrderedDict
+from typing import Callable, Optional
+
+# communication import (상위 경로)
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from communication.message_protocol import MessageProtocol
+from config import REQUEST_DEDUPE_CONFIG
+
+"""
+요청 중복 제거 (멱등 명령 실행)
+
+- 클라이언트 (ComManager) 는 RI / SI 명령 데이터 마지막 4바이트에 클라이언트 ID + 요청 ID 를 붙이고,
+  응답을 못 받으면 (시간 초과 / 재연결) 같은 요청 ID 로 다시 보낸다.
+- LMS 는 (클라이언트 호스트, 클라이언트 ID, 요청 ID) -> 응답 을 LRU 캐시에 기억하고, 같은 요청이 다시 오면 실행하지 않고 저장된 응답을 돌려준다.
+  - 재연결하면 클라이언트 포트가 바뀌므로 포트 대신 클라이언트가 보낸 ID 로 같은 호스트의 클라이언트를 구분한다.
+  - 첫 요청이 아직 처리 중이면 재전송 요청은 그 결과를 기다린다. (두 번 실행하지 않음)
+  - 처리 중 예외가 나거나 BUSY (과부하로 처리하지 않음) 응답이면 항목을 지워 재시도가 다시 실행되도록 한다.
+- 요청 ID 0 / 대상이 아닌 명령은 그대로 command_handler 로 넘긴다.
+"""
+
+
+class DedupeEntry:
+  """요청 1건의 처리 결과"""
+  __slots__ = ('response', 'stored_at', 'event')
+
+  def __init__(self):
+    self.response = None
+    self.stored_at = None
+    self.event = threading.Event()
+
+
+class RequestDedupe:
+  def __init__(self, command_handler: Callable, max_entries: int = None, ttl: float = None):
+    """
+    Args:
+        command_handler: command_handler(client_address, message) -> bytes (CommandScheduler.execute)
+    """
+    self.command_handler = command_handler
+    self.commands = set(REQUEST_DEDUPE_CONFIG['commands'])
+    self.max_entries = max_entries or REQUEST_DEDUPE_CONFIG['max_entries']
+    self.ttl = REQUEST_DEDUPE_CONFIG['ttl'] if ttl is None else ttl
+    self.entries = OrderedDict()  # (호스트, 클라이언트 ID, 요청 ID) -> DedupeEntry (앞쪽이 가장 오래 쓰이지 않은 항목)
+    self.lock = threading.Lock()
+    self.counters = {'executed': 0, 'duplicates': 0, 'waited': 0, 'evicted': 0, 'expired': 0}
+
+  def _key(self, client_address, message: bytes):
+    """중복 제거 키, 대상이 아니면 None"""
+    if message[:2].decode('ascii', errors='replace') not in self.commands:
+      return None
+    request_id = MessageProtocol.unpack_request_id(message)
+    if not request_id:
+      return None
+    host = client_address[0] if isinstance(client_address, tuple) else client_address
+    return host, MessageProtocol.unpack_client_id(message), request_id
+
+  def execute(self, client_address, message: bytes) -> Optional[bytes]:
+    """TCPHandler 콜백 : 처음 보는 요청은 실행 후 응답 저장, 중복 요청은 저장된 응답 반환"""
+    key = self._key(client_address, message)
+    if key is None:
+      return self.command_handler(client_address, message)
+
+    owner = False
+    with self.lock:
+      entry = self.entries.get(key)
+      if entry is not None and entry.stored_at is not None and time.monotonic() - entry.stored_at > self.ttl:
+        del self.entries[key]
+        self.counters['expired'] += 1
+        entry = None
+      if entry is not None:
+        self.entries.move_to_end(key)
+        self.counters['duplicates'] += 1
+        if not entry.event.is_set():
+          self.counters['waited'] += 1  # 첫 요청 처리 중 : 결과를 기다림
+      else:
+        owner = True
+        entry = self.entries[key] = DedupeEntry()
+        while len(self.entries) > self.max_entries:
+          self.entries.popitem(last=False)
+          self.counters['evicted'] += 1
+
+    if owner:
+      self._run(key, entry, client_address, message)
+    else:
+      entry.event.wait()
+    return entry.response
+
+  def _run(self, key, entry: DedupeEntry, client_address, message: bytes):
+    """첫 요청 실행 후 결과 저장, 예외 / BUSY 시 항목을 지워 재시도가 다시 실행되도록 함"""
+    try:
+      entry.response = self.command_handler(client_address, message)
+    except Exception:
+      self._forget(key, entry)
+      raise
+    else:
+      if entry.response and len(entry.response) > 2 and entry.response[2] == MessageProtocol.STATUS_BUSY:
+        self._forget(key, entry)
+    finally:
+      entry.stored_at = time.monotonic()
+      entry.event.set()  # 기다리던 재전송 요청에 결과 전달 (예외 시 None 응답 -> 클라이언트가 다시 재시도)
+    with self.lock:
+      self.counters['executed'] += 1
+
+  def _forget(self, key, entry: DedupeEntry):
+    with self.lock:
+      if self.entries.get(key) is entry:
+        del self.entries[key]
+
+  def stats(self) -> dict:
+    with self.lock:
+      return {'entries': len(self.entries), **self.counters}
+
+
+if __name__ == '__main__':
+  import random
+  # 재전송 시뮬레이션 : 응답 유실 후 같은 요청 ID 로 재시도해도 재고가 한 번만 반영되는지 확인
+  stock = {'count': 0}
+
+  def handler(client_address, message):
+    time.sleep(0.002)
+    stock['count'] += int.from_bytes(message[2:4], 'little')
+    return MessageProtocol.pack_response(message[:2].decode(), 0x00)
+
+  dedupe = RequestDedupe(handler, max_entries=256)
+  rng = random.Random(0)
+  # 같은 호스트의 클라이언트 2개가 같은 요청 ID 시작값 사용 : 클라이언트 ID 로 구분되어 서로의 응답을 받지 않아야 함
+  start = rng.getrandbits(16) or 1
+  request_ids = {1: start, 2: start}
+  expected = 0
+  threads = []
+  for _ in range(200):
+    client_id = 1 + rng.randrange(2)
+    request_id = request_ids[client_id] = (request_ids[client_id] + 1) & 0xFFFF or 1
+    message = MessageProtocol.pack_command('RI', MessageProtocol.attach_request_id(MessageProtocol.pack_ri_data(1, 0), client_id, request_id))
+    expected += 1
+    # 응답 유실 : 재연결 (포트 변경) 후 1~3회 재전송, 일부는 첫 요청 처리 중에 도착
+    for attempt in range(1 + rng.randrange(3)):
+      client = ('192.168.0.10', 50000 + attempt)
+      thread = threading.Thread(target=dedupe.execute, args=(client, message))
+      thread.start()
+      threads.append(thread)
+      if rng.random() < 0.5:
+        thread.join()
+  for thread in threads:
+    thread.join()
+  print(f"요청 {expected}건 / 전송 {len(threads)}회 -> 재고 {stock['count']} (기대값 {expected})")
+  print(dedupe.stats())
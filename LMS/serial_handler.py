@@ -0,0 +1,261 @@
+import time
+import struct
+import threading
+import serial
+from config import SERIAL_PROTOCOL_CONFIG, STORAGE_BOX_PROTOCOL_CONFIG, SERIAL_WATCHDOG_CONFIG
+
+"""
+Storage Box 시리얼 핸들러
+
+- IM.ino 는 마지막 명령의 응답을 매 loop 마다 반복 송신하고 그 사이에 "\r\n" 을 섞어 보내므로,
+  수신 스레드가 스트림을 계속 읽으면서 7바이트 응답 프레임만 골라내고 명령별 최신 응답을 보관한다.
+- request() 는 명령 송신 후, 송신 시각 이후에 수신된 같은 명령의 응답을 기다린다. (요청별 마감 시간)
+- 포트 오류 / 응답 없음은 핸들러를 멈추지 않고 기록만 하며, 재연결은 SerialWatchdog 가 담당한다.
+"""
+
+KNOWN_COMMANDS = frozenset(c.encode('ascii') for c in
+                           STORAGE_BOX_PROTOCOL_CONFIG['count_commands'] + STORAGE_BOX_PROTOCOL_CONFIG['motor_commands'])
+REPLY_SIZE = STORAGE_BOX_PROTOCOL_CONFIG['reply_size']
+
+
+def parse_frames(buffer: bytearray) -> list:
+  """
+  수신 버퍼에서 응답 프레임을 추출합니다. (처리한 바이트는 버퍼에서 제거)
+
+  프레임 : Command(2) + Flag(1) + Value(4) + "\\r\\n"
+  Value 에 0x0D 0x0A 가 포함될 수 있으므로 CRLF 로 분리하지 않고 명령어 위치 기준으로 동기화한다.
+  """
+  frames = []
+  i = 0
+  while len(buffer) - i >= 2:
+    if buffer[i:i + 2] == b'\r\n':
+      i += 2
+      continue
+    if bytes(buffer[i:i + 2]) in KNOWN_COMMANDS:
+      if len(buffer) - i < REPLY_SIZE + 2:
+        break  # 프레임 미완성 : 다음 수신까지 대기
+      if buffer[i + REPLY_SIZE:i + REPLY_SIZE + 2] == b'\r\n':
+        raw = bytes(buffer[i:i + REPLY_SIZE])
+        frames.append({
+          'command': raw[:2].decode('ascii'),
+          'flag': raw[2],
+          'count': struct.unpack('<H', raw[3:5])[0],  # AVR unsigned int (16bit)
+          'raw': raw,
+        })
+        i += REPLY_SIZE + 2
+        continue
+    i += 1  # 노이즈 / 변조 바이트 건너뛰기
+  del buffer[:i]
+  return frames
+
+
+class SerialHandler(threading.Thread):
+  def __init__(self, device=None, baud_rate=None):
+    # daemon = True 옵션으로 메인 스레드 (lms_main.py)가 종료되면 즉시 종료되도록 설정
+    super().__init__(daemon=True)
+    self.device = device or SERIAL_PROTOCOL_CONFIG['device']
+    self.baud_rate = baud_rate or SERIAL_PROTOCOL_CONFIG['baud_rate']
+    self.serial_port = None
+
+    # 명령별 최신 응답 : {command: (수신 시각, frame)}
+    self.latest = {}
+    self.condition = threading.Condition()
+    self.write_lock = threading.Lock()
+
+    # 워치독 판단 근거
+    self.opened_at = 0.0
+    self.last_rx_at = 0.0
+    self.consecutive_failures = 0
+    self.is_running = False
+
+  def open(self):
+    """시리얼 포트 열기 (실제 보드 또는 storage_box_emulator 의 PTY 경로)"""
+    port = serial.Serial(self.device, self.baud_rate, timeout=0.05)
+    with self.condition:
+      self.latest.clear()  # 이전 연결의 응답은 폐기
+      self.consecutive_failures = 0
+      self.opened_at = time.monotonic()
+      self.serial_port = port
+    return port
+
+  def close_port(self):
+    """포트만 닫기 (핸들러 스레드는 유지, 대기 중인 요청은 즉시 실패)"""
+    with self.condition:
+      port, self.serial_port = self.serial_port, None
+      self.condition.notify_all()
+    if port:
+      try:
+        port.close()
+      except Exception:
+        pass
+
+  @property
+  def is_open(self) -> bool:
+    return self.serial_port is not None
+
+  def run(self):
+    buffer = bytearray()
+    self.is_running = True
+    while self.is_running:
+      port = self.serial_port
+      if port is None:
+        buffer.clear()
+        time.sleep(0.05)
+        continue
+      try:
+        chunk = port.read(max(1, port.in_waiting))
+      except Exception as e:
+        print(f"시리얼 수신 오류 ({self.device}): {e}")
+        self.close_port()
+        continue
+      if not chunk:
+        continue
+      now = time.monotonic()
+      self.last_rx_at = now
+      buffer += chunk
+      frames = parse_frames(buffer)
+      if frames:
+        with self.condition:
+          for frame in frames:
+            self.latest[frame['command']] = (now, frame)
+          self.condition.notify_all()
+
+  def send(self, command: str):
+    """명령 송신 (응답 대기 없음) : 송신 시각 반환, 포트 오류 시 None"""
+    port = self.serial_port
+    if port is None:
+      return None
+    try:
+      with self.write_lock:
+        port.write(command.encode('ascii') + b'\n')
+    except Exception as e:
+      print(f"시리얼 송신 오류 ({self.device}): {e}")
+      self.close_port()
+      return None
+    return time.monotonic()
+
+  def request(self, command: str, timeout: float = None):
+    """명령 송신 후 송신 이후에 수신된 응답 프레임 반환 (마감 시간 초과 / 포트 닫힘 시 None)"""
+    sent_at = self.send(command)
+    if sent_at is None:
+      self.consecutive_failures += 1
+      return None
+    deadline = sent_at + (timeout or SERIAL_WATCHDOG_CONFIG['request_timeout'])
+    with self.condition:
+      while True:
+        received = self.latest.get(command)
+        if received and received[0] >= sent_at:
+          self.consecutive_failures = 0
+          return received[1]
+        remaining = deadline - time.monotonic()
+        if remaining <= 0 or self.serial_port is None or not self.is_running:
+          self.consecutive_failures += 1
+          return None
+        self.condition.wait(remaining)
+
+  def stop(self):
+    """핸들러 중지"""
+    self.is_running = False
+    self.close_port()
+    print("시리얼 핸들러 종료")
+
+
+class SerialWatchdog(threading.Thread):
+  """
+  장치별 워치독
+
+  - 이상 판단 : 포트 닫힘 / 연속 요청 실패 / 수신 정지 (IM.ino 는 매 loop 마다 CRLF 를 보내므로
+    stall_timeout 동안 1바이트도 없으면 보드 정지 또는 분리로 판단)
+  - 복구 : 포트를 닫고 지수 백오프로 다시 열기, 수신이 재개되면 정상으로 전환
+  - 상태 변화는 on_status(device, healthy) 콜백으로 알림 (LMS 는 해당 구역을 UNAVAILABLE 로 표시)
+  """
+  def __init__(self, handler: SerialHandler, on_status=None):
+    super().__init__(daemon=True)
+    self.handler = handler
+    self.on_status = on_status
+    self.config = SERIAL_WATCHDOG_CONFIG
+    self.healthy = None  # 시작 시 상태 미확인 : 첫 판단 결과 (시작부터 장치 없음 포함) 를 반드시 on_status 로 알림
+    self.backoff = self.config['backoff_initial']
+    self.next_attempt_at = 0.0
+    self.stats = {'degraded': 0, 'reopen_attempts': 0, 'recoveries': 0, 'last_recovery_time': None}
+    self.degraded_at = None
+    self.is_running = False
+
+  def _is_faulty(self, now) -> bool:
+    handler = self.handler
+    if not handler.is_open:
+      return True
+    if handler.consecutive_failures >= self.config['max_consecutive_failures']:
+      return True
+    return now - max(handler.last_rx_at, handler.opened_at) > self.config['stall_timeout']
+
+  def _set_healthy(self, healthy: bool):
+    if self.healthy == healthy:
+      return
+    first = self.healthy is None
+    self.healthy = healthy
+    now = time.monotonic()
+    if healthy:
+      if not first:
+        self.stats['recoveries'] += 1
+        if self.degraded_at is not None:
+          self.stats['last_recovery_time'] = now - self.degraded_at
+      print(f"[워치독] {self.handler.device} {'연결 확인' if first else '복구'}")
+    else:
+      self.degraded_at = now
+      self.stats['degraded'] += 1
+      print(f"[워치독] {self.handler.device} 응답 없음 - 재연결 시도")
+    if self.on_status:
+      try:
+        self.on_status(self.handler.device, healthy)
+      except Exception as e:
+        print(f"[워치독] 상태 콜백 오류: {e}")
+
+  def _try_reopen(self, now):
+    if now < self.next_attempt_at:
+      return
+    self.handler.close_port()
+    self.stats['reopen_attempts'] += 1
+    try:
+      self.handler.open()
+      self.backoff = self.config['backoff_initial']
+    except Exception as e:
+      print(f"[워치독] {self.handler.device} 열기 실패: {e} ({self.backoff:.1f}초 후 재시도)")
+      self.next_attempt_at = now + self.backoff
+      self.backoff = min(self.backoff * 2, self.config['backoff_max'])
+
+  def run(self):
+    self.is_running = True
+    while self.is_running:
+      now = time.monotonic()
+      handler = self.handler
+      if self._is_faulty(now):
+        self._set_healthy(False)
+        self._try_reopen(now)
+      elif handler.last_rx_at > handler.opened_at:
+        self._set_healthy(True)  # 재연결 후 수신 재개 확인
+      time.sleep(self.config['check_interval'])
+
+  def stop(self):
+    self.is_running = False
+
+
+if __name__ == '__main__':
+  import sys
+  # 사용법 : python serial_handler.py [device] [반복 횟수] : 카운트 조회 왕복 지연 측정
+  handler = SerialHandler(sys.argv[1] if len(sys.argv) > 1 else None)
+  handler.open()
+  handler.start()
+  rounds = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+  latencies = []
+  commands = STORAGE_BOX_PROTOCOL_CONFIG['count_commands']
+  for i in range(rounds):
+    started = time.monotonic()
+    frame = handler.request(commands[i % len(commands)])
+    if frame:
+      latencies.append(time.monotonic() - started)
+  latencies.sort()
+  if latencies:
+    print(f"응답 {len(latencies)}/{rounds}, 평균 {sum(latencies) / len(latencies) * 1000:.1f}ms, "
+          f"p95 {latencies[int(len(latencies) * 0.95) - 1] * 1000:.1f}ms")
+  handler.stop()
@@ -0,0 +1,285 @@
+import os
+import tty
+import time
+import errno
+import random
+import select
+import struct
+import threading
+from config import STORAGE_BOX_PROTOCOL_CONFIG, STORAGE_BOX_EMULATOR_CONFIG, SERIAL_PROTOCOL_CONFIG
+
+"""
+Storage Box (Arduino/Storage_Box/IM.ino) 에뮬레이터
+
+- 의사 터미널(PTY)을 열고 IM.ino 의 loop() 를 그대로 재현한다.
+  LMS 는 SERIAL_PROTOCOL_CONFIG['device'] 를 link_path 로 지정하면 실제 보드 대신 에뮬레이터와 통신한다.
+- 재현하는 펌웨어 동작
+  1. 마지막으로 수신한 명령(cmd)은 전역 변수로 유지되므로, 새 명령이 올 때까지 매 loop 마다 같은 응답을 반복 송신
+  2. 매 loop 마다 Serial.println() 으로 "\r\n" 송신 (명령이 없어도 CRLF 노이즈 발생)
+  3. 카운트는 unsigned int (AVR 16bit) : 65535 다음 0 으로 순환, 응답 Value(4) 의 상위 2바이트는 인접 전역 변수
+  4. YM/GM/RM 은 플래그만 세우고, STEP_MOTOR_PERIOD(500ms) 마다 Stepper.step() 이 loop 전체를 블로킹
+  5. 송신은 9600bps / 64바이트 송신 버퍼에 맞춰 지연
+"""
+
+# IR 센서 / 스테퍼 모터 구역 (IM.ino 변수 선언 순서 : green, yellow, red, out)
+LANES = ('Y', 'G', 'R')
+
+# 카운트 응답 시 memcpy(…, &count, 4) 로 함께 복사되는 인접 전역 변수
+ADJACENT_COUNTER = {
+  'GC' : ('G', 'Y'),  # green_in_count  -> yellow_in_count
+  'YC' : ('Y', 'R'),  # yellow_in_count -> red_in_count
+  'RC' : ('R', 'O'),  # red_in_count    -> out_total_count
+  'OC' : ('O', None), # out_total_count -> green_out_count (항상 0)
+}
+
+
+class StorageBoxEmulator(threading.Thread):
+  def __init__(self, link_path=None, arrival_rates=None, seed=None, **faults):
+    # daemon = True 옵션으로 메인 스레드가 종료되면 즉시 종료되도록 설정
+    super().__init__(daemon=True)
+    self.link_path = link_path or STORAGE_BOX_EMULATOR_CONFIG['link_path']
+    self.arrival_rates = dict(STORAGE_BOX_EMULATOR_CONFIG['arrival_rates'])
+    self.arrival_rates.update(arrival_rates or {})
+    self.faults = {key: STORAGE_BOX_EMULATOR_CONFIG[key] for key in
+                   ('drop_reply_rate', 'corrupt_rate', 'noise_rate', 'stall_rate', 'stall_duration')}
+    self.faults.update(faults)
+    self.random = random.Random(seed)
+
+    # 펌웨어 타이밍
+    self.ir_period = STORAGE_BOX_PROTOCOL_CONFIG['ir_sensor_period']
+    self.step_period = STORAGE_BOX_PROTOCOL_CONFIG['step_motor_period']
+    self.read_timeout = STORAGE_BOX_PROTOCOL_CONFIG['read_timeout']
+    # Stepper 라이브러리 : step_delay = 60s / steps / rpm, 1회 구동 = steps * step_delay
+    steps = STORAGE_BOX_PROTOCOL_CONFIG['steps_per_revolution']
+    self.step_duration = steps * (60.0 / steps / STORAGE_BOX_PROTOCOL_CONFIG['stepper_rpm'])
+    self.byte_time = 10.0 / SERIAL_PROTOCOL_CONFIG['baud_rate']  # start + 8bit + stop
+    self.tx_buffer_size = STORAGE_BOX_PROTOCOL_CONFIG['tx_buffer_size']
+
+    # 펌웨어 전역 변수
+    self.counts = {'Y': 0, 'G': 0, 'R': 0, 'O': 0}
+    self.last_ir_state = {'Y': True, 'G': True, 'R': True, 'O': True}  # HIGH : 물체 없음
+    self.motor_flags = {lane: False for lane in LANES}
+    self.motor_prev_time = {lane: 0.0 for lane in LANES}
+    self.ir_prev_time = 0.0
+    self.cmd = b''
+
+    # 물품 도착 스케줄 : 구역별 (센서 가림 시작, 종료) 목록
+    self.beam_blocks = {lane: [] for lane in self.counts}
+    self.next_arrival = {}
+
+    # 통계
+    self.stats = {'commands': 0, 'replies': 0, 'motor_runs': 0, 'dropped_tx': 0, 'faults': 0}
+
+    self.master_fd = None
+    self.slave_fd = None
+    self.device = None
+    self._tx_free_at = 0.0
+    self._rx_buffer = bytearray()
+    self.is_running = False
+
+  # --- PTY 관리 ---
+  def open(self):
+    """PTY 생성 및 link_path 심볼릭 링크 갱신"""
+    self.master_fd, self.slave_fd = os.openpty()
+    tty.setraw(self.slave_fd)
+    os.set_blocking(self.master_fd, False)
+    self.device = os.ttyname(self.slave_fd)
+
+    tmp_link = self.link_path + '.tmp'
+    if os.path.lexists(tmp_link):
+      os.unlink(tmp_link)
+    os.symlink(self.device, tmp_link)
+    os.replace(tmp_link, self.link_path)  # 원자적 교체 : 재연결 중에도 경로가 항상 존재
+    return self.link_path
+
+  def close(self):
+    """PTY 닫기 (보드 분리와 동일)"""
+    for fd in (self.master_fd, self.slave_fd):
+      if fd is not None:
+        try:
+          os.close(fd)
+        except OSError:
+          pass
+    self.master_fd = self.slave_fd = None
+
+  def unplug(self, duration=0.0):
+    """USB 분리 장애 주입 : duration 초 후 새 PTY 로 재연결 (리셋되므로 카운트 초기화)"""
+    self.close()
+    self.stats['faults'] += 1
+    if duration > 0:
+      threading.Timer(duration, self._replug).start()
+
+  def _replug(self):
+    self.counts = dict.fromkeys(self.counts, 0)
+    self.cmd = b''
+    self.open()
+
+  # --- 물품 도착 시뮬레이션 ---
+  def add_item(self, lane, at=None):
+    """lane 센서 앞에 물품 1개 통과 예약 (at : 가림 시작 시각, 기본 즉시)"""
+    start = time.monotonic() if at is None else at
+    self.beam_blocks[lane].append((start, start + STORAGE_BOX_EMULATOR_CONFIG['item_dwell']))
+
+  def _schedule_arrivals(self, now):
+    for lane, rate in self.arrival_rates.items():
+      if rate <= 0:
+        continue
+      if lane not in self.next_arrival:
+        self.next_arrival[lane] = now + self.random.expovariate(rate / 60.0)
+      while self.next_arrival[lane] <= now:
+        self.add_item(lane, self.next_arrival[lane])
+        self.next_arrival[lane] += self.random.expovariate(rate / 60.0)
+
+  def _sample_ir(self, now):
+    """IR_SENSOR_PERIOD 마다 샘플링 : HIGH -> LOW 변화에서만 카운트 (짧은 간격의 물품은 합쳐짐)"""
+    for lane, blocks in self.beam_blocks.items():
+      blocks[:] = [b for b in blocks if b[1] > now]
+      current_state = not any(start <= now for start, _ in blocks)
+      if self.last_ir_state[lane] and not current_state:
+        self.counts[lane] = (self.counts[lane] + 1) & 0xFFFF
+      self.last_ir_state[lane] = current_state
+
+  # --- 시리얼 송수신 ---
+  def _read_until_newline(self):
+    """Serial.readBytesUntil('\\n', buf, 16) : 바이트 간 read_timeout 동안 대기"""
+    deadline = time.monotonic() + self.read_timeout
+    while b'\n' not in self._rx_buffer and len(self._rx_buffer) < 16:
+      remaining = deadline - time.monotonic()
+      if remaining <= 0 or not self._fill_rx(remaining):
+        break
+      deadline = time.monotonic() + self.read_timeout
+
+    end = self._rx_buffer.find(b'\n')
+    if 0 <= end < 16:
+      data = bytes(self._rx_buffer[:end])
+      del self._rx_buffer[:end + 1]
+    else:
+      data = bytes(self._rx_buffer[:16])
+      del self._rx_buffer[:16]
+    return data
+
+  def _fill_rx(self, timeout):
+    if self.master_fd is None:
+      return False
+    readable, _, _ = select.select([self.master_fd], [], [], timeout)
+    if not readable:
+      return False
+    try:
+      chunk = os.read(self.master_fd, 256)
+    except OSError:
+      return False
+    self._rx_buffer += chunk
+    return bool(chunk)
+
+  def _write(self, data):
+    """9600bps 송신 : 64바이트 송신 버퍼가 차면 Serial.write 가 블로킹"""
+    now = time.monotonic()
+    queued = max(0.0, self._tx_free_at - now) / self.byte_time
+    overflow = queued + len(data) - self.tx_buffer_size
+    if overflow > 0:
+      time.sleep(overflow * self.byte_time)
+    self._tx_free_at = max(self._tx_free_at, now) + len(data) * self.byte_time
+
+    if self.master_fd is None:
+      return
+    try:
+      os.write(self.master_fd, data)
+    except OSError as e:
+      # 호스트가 읽지 않아 PTY 버퍼가 가득 찬 경우 : 실제 보드처럼 유실
+      if e.errno not in (errno.EAGAIN, errno.EIO):
+        raise
+      self.stats['dropped_tx'] += 1
+
+  def _build_reply(self):
+    name = self.cmd[:2].decode('ascii', 'replace')
+    if name in ADJACENT_COUNTER:
+      lane, adjacent = ADJACENT_COUNTER[name]
+      value = struct.pack('<HH', self.counts[lane], self.counts[adjacent] if adjacent else 0)
+      return self.cmd[:2] + b'\x00' + value
+    if name in ('YM', 'GM', 'RM'):
+      self.motor_flags[name[0]] = True
+      # memcpy(send_buffer + 3, 0x00, 4) : 주소 0 (레지스터 영역) 복사, 값은 0 으로 취급
+      return self.cmd[:2] + b'\x01' + b'\x00' * 4
+    return None
+
+  def _inject_faults(self, reply):
+    if self.random.random() < self.faults['drop_reply_rate']:
+      self.stats['faults'] += 1
+      return b''
+    if self.random.random() < self.faults['corrupt_rate']:
+      self.stats['faults'] += 1
+      index = self.random.randrange(len(reply))
+      reply = reply[:index] + bytes([reply[index] ^ 0xFF]) + reply[index + 1:]
+    if self.random.random() < self.faults['noise_rate']:
+      self.stats['faults'] += 1
+      reply = bytes(self.random.getrandbits(8) for _ in range(self.random.randint(1, 4))) + reply
+    return reply
+
+  # --- loop() ---
+  def loop_once(self):
+    now = time.monotonic()
+    self._schedule_arrivals(now)
+    if now - self.ir_prev_time >= self.ir_period:
+      self.ir_prev_time = now
+      self._sample_ir(now)
+
+    # 시리얼 통신 부분 : Serial.available() > 0 이면 readBytesUntil
+    if self._rx_buffer or self._fill_rx(0):
+      recv = self._read_until_newline()
+      if recv:
+        self.cmd = recv[:2]
+        self.stats['commands'] += 1
+
+    reply = self._build_reply() if self.cmd else None
+    if reply:
+      self.stats['replies'] += 1
+      self._write(self._inject_faults(reply))
+    self._write(b'\r\n')  # Serial.println()
+
+    # 스테퍼 모터 부분 : 구동 중에는 loop 전체가 멈춤
+    for lane in LANES:
+      if now - self.motor_prev_time[lane] >= self.step_period:
+        self.motor_prev_time[lane] = now
+        if self.motor_flags[lane]:
+          self.stats['motor_runs'] += 1
+          time.sleep(self.step_duration)
+        self.motor_flags[lane] = False
+
+    # 루프 정지 장애 : 초당 확률을 이번 loop 소요 시간에 비례하여 적용
+    elapsed = time.monotonic() - now
+    if self.faults['stall_rate'] > 0 and self.random.random() < self.faults['stall_rate'] * elapsed:
+      self.stats['faults'] += 1
+      time.sleep(self.faults['stall_duration'])
+
+  def run(self):
+    if self.master_fd is None:
+      self.open()
+    self.is_running = True
+    while self.is_running:
+      if self.master_fd is None:
+        time.sleep(0.05)  # 분리 상태
+        continue
+      self.loop_once()
+
+  def stop(self):
+    """에뮬레이터 중지"""
+    self.is_running = False
+    self.close()
+    if os.path.islink(self.link_path):
+      os.unlink(self.link_path)
+
+
+if __name__ == '__main__':
+  import sys
+  # 사용법 : python storage_box_emulator.py [Y G R O 도착률(개/분)]
+  rates = [float(v) for v in sys.argv[1:5]] + [0.0] * 4
+  emulator = StorageBoxEmulator(arrival_rates=dict(zip(('Y', 'G', 'R', 'O'), rates)))
+  path = emulator.open()
+  emulator.start()
+  print(f"Storage Box 에뮬레이터 실행: {path} -> {emulator.device}")
+  try:
+    while True:
+      time.sleep(5)
+      print(f"카운트: {emulator.counts} / 통계: {emulator.stats}")
+  except KeyboardInterrupt:
+    emulator.stop()
@@ -1,27 +1,88 @@
+import os
+import sys
+import time
+import itertools
 import threading
 import socket
-from config import TCP_PROTOCOL_CONFIG
+from collections import deque, OrderedDict
+
+# communication import (상위 경로)
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from communication.message_protocol import MessageProtocol
+from communication.frame_tap import FrameTap, COMMAND, RESPONSE, ROLE_SERVER
+from config import TCP_PROTOCOL_CONFIG, FRAME_TAP_CONFIG
 
 """
+TCP 핸들러
 
+- 서버 소켓에서 GUI 클라이언트 연결을 받고, 클라이언트마다 수신 스레드가 17바이트 명령을 읽어 연결별 명령 큐에 넣는다.
+- 처리 스레드가 연결별 큐의 명령을 순서대로 command_handler(client_address, message) -> bytes 에 위임하고 응답을 송신한다.
+- 과부하 제어
+  - 연결별 명령 큐는 max_connection_queue 개까지, 가득 차면 수신 즉시 BUSY 응답 (처리하지 않음)
+  - 전체 대기 명령 수 제한 (max_message_queue) 은 CommandScheduler 가 BUSY 응답으로 처리
+- 요청 없이 보내는 프레임 (AU / KU 구독) 은 send_to 로 연결별 송신함에 넣고 송신 스레드가 보낸다.
+  - 송신함은 프레임 종류 (Command 2바이트) 마다 최신 프레임 1개만 유지 : 느린 클라이언트는 중간 값을 건너뛰고 최신 값만 받음
+- 수신 명령 / 송신 응답 / 구독 프레임은 프레임 탭 (tap) 링 버퍼에 기록 (모든 클라이언트 공용, dump_capture 로 캡처 파일 기록)
+  - 레코드마다 연결 번호 (연결 순서대로 1 부터) 를 붙이고, 연결 시 번호와 클라이언트 주소를 출력
 """
+
+
+class ClientConnection:
+  """연결된 클라이언트 1개의 소켓 / 명령 큐 / 구독 프레임 송신함"""
+
+  def __init__(self, client_socket, client_address, tap: FrameTap, connection_id: int = 0):
+    self.socket = client_socket
+    self.address = client_address
+    self.tap = tap
+    self.connection_id = connection_id      # 프레임 탭 레코드의 연결 번호
+    self.send_lock = threading.Lock()       # 응답과 구독 프레임 송신이 섞이지 않도록 직렬화
+    self.condition = threading.Condition()
+    self.commands = deque()                 # 수신한 명령 (처리 대기)
+    self.pushes = OrderedDict()             # 프레임 종류 -> 최신 구독 프레임 (송신 대기)
+    self.counters = {'received': 0, 'busy': 0, 'pushed': 0, 'dropped': 0}
+    self.is_open = True
+
+  def send(self, *frames: bytes):
+    """프레임들을 기록 후 sendall 1회로 송신"""
+    for frame in frames:
+      self.tap.record(RESPONSE, frame, self.connection_id)
+    with self.send_lock:
+      self.socket.sendall(frames[0] if len(frames) == 1 else b''.join(frames))
+
+  def close(self):
+    with self.condition:
+      self.is_open = False
+      self.condition.notify_all()
+    try:
+      self.socket.close()
+    except Exception:
+      pass
+
+
 class TCPHandler(threading.Thread):
-  def __init__(self):
+  def __init__(self, command_handler=None):
     # daemon = True 옵션으로 메인 스레드 (lms_main.py)가 종료되면 즉시 종료되도록 설정
     super().__init__(daemon=True)
     self.host = None or TCP_PROTOCOL_CONFIG['host']
     self.port = None or TCP_PROTOCOL_CONFIG['port']
-    
+    self.command_handler = command_handler
+    self.server_socket = None
+    self.clients = {} # {client_address: ClientConnection}
+    self.clients_lock = threading.Lock()
+    self.max_connection_queue = TCP_PROTOCOL_CONFIG['max_connection_queue']
+    self.tap = FrameTap(FRAME_TAP_CONFIG['slots'], ROLE_SERVER)
+    self.connection_ids = itertools.count(1)
+
     """
-    핸들러 클래스에서는 is_running = True인동안 무한 루프로 실행하고, 
+    핸들러 클래스에서는 is_running = True인동안 무한 루프로 실행하고,
     종료시킬 경우에는 외부에서 is_running 플래그를 False로 변경하는
     등의 방법을 사용해서 제어한다.
     """
     self.is_running = False
-  
+
     # 로그
     # print(f"TCP 서버 초기화: {self.host}:{self.port}")
-  
+
   def run(self):
     try:
       # 서버 소켓 설정
@@ -31,33 +92,300 @@ class TCPHandler(threading.Thread):
       self.server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
       self.server_socket.bind((self.host, self.port))
       self.server_socket.listen(TCP_PROTOCOL_CONFIG['max_message'])
-      
+
       # 로그
       # print(f" TCP 서버 시작: {self.host}:{self.port}")
-      
+
       # 핸들러 클래스 상태 변경
       self.is_running = True
       while self.is_running:
-        # 연결 대기 반복
+        # 연결 대기 반복 : 클라이언트마다 수신 / 처리 / 구독 송신 스레드 생성
         client_socket, client_address = self.server_socket.accept()
-        data = self.server_socket.recv(TCP_PROTOCOL_CONFIG['message_size']) # 17바이트 메시지 읽어오기
-    
-        # 
-        if not data:
-          break
-    
+        client_socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1) # 응답 / 구독 프레임을 Nagle 지연 없이 송신
+        connection_id = (next(self.connection_ids) - 1) % 0xFFFF + 1  # 탭 레코드 필드 (uint16, 0 은 클라이언트 탭)
+        print(f"TCP 연결 #{connection_id}: {client_address[0]}:{client_address[1]}")
+        client = ClientConnection(client_socket, client_address, self.tap, connection_id)
+        with self.clients_lock:
+          self.clients[client_address] = client
+        threading.Thread(target=self._client_loop, args=(client,), daemon=True).start()
+        threading.Thread(target=self._command_loop, args=(client,), daemon=True).start()
+        threading.Thread(target=self._push_loop, args=(client,), daemon=True).start()
+
     except Exception as e:
-      print(f"TCP 핸들러 처리 오류: {e}")
+      if self.is_running:
+        print(f"TCP 핸들러 처리 오류: {e}")
     finally:
       self.stop() # TCP 핸들러 중지 및 소켓 닫기
-  
+
+  def _client_loop(self, client: ClientConnection):
+    """클라이언트 1개의 명령 수신 : 연결별 명령 큐에 넣고, 큐가 가득 차면 BUSY 응답"""
+    message_size = TCP_PROTOCOL_CONFIG['message_size']
+    buffer = b''
+    try:
+      while self.is_running:
+        data = client.socket.recv(TCP_PROTOCOL_CONFIG['message_size'] * TCP_PROTOCOL_CONFIG['max_message'])
+        if not data:
+          break # 클라이언트 연결 종료
+        buffer += data
+        # 17바이트 단위로 명령 분리 (TCP 스트림이므로 여러 명령이 붙어서 올 수 있음)
+        rejected = []
+        with client.condition:
+          while len(buffer) >= message_size:
+            message, buffer = buffer[:message_size], buffer[message_size:]
+            self.tap.record(COMMAND, message, client.connection_id)
+            client.counters['received'] += 1
+            if len(client.commands) >= self.max_connection_queue:
+              client.counters['busy'] += 1
+              rejected.append(message)
+            else:
+              client.commands.append(message)
+          client.condition.notify_all()
+        for message in rejected:
+          client.send(MessageProtocol.pack_response(message[:2].decode('ascii', 'replace'), MessageProtocol.STATUS_BUSY))
+    except ConnectionResetError:
+      pass # 클라이언트가 읽지 않은 데이터를 두고 연결 종료
+    except Exception as e:
+      if self.is_running:
+        print(f"TCP 클라이언트 처리 오류 ({client.address}): {e}")
+    finally:
+      with self.clients_lock:
+        if self.clients.get(client.address) is client:
+          del self.clients[client.address]
+      client.close()
+
+  def _command_loop(self, client: ClientConnection):
+    """클라이언트 1개의 명령 처리 : 수신 순서대로 처리하고 응답 송신"""
+    try:
+      while True:
+        with client.condition:
+          while client.is_open and not client.commands:
+            client.condition.wait()
+          if not client.is_open:
+            return
+          message = client.commands[0]
+        response = self.command_handler(client.address, message) if self.command_handler else None
+        with client.condition:
+          client.commands.popleft()  # 처리가 끝날 때까지 큐에 남겨 연결별 대기 수에 포함
+        if response:
+          client.send(response)
+    except Exception as e:
+      if self.is_running and client.is_open:
+        print(f"TCP 명령 처리 오류 ({client.address}): {e}")
+      client.close()
+
+  def _push_loop(self, client: ClientConnection):
+    """클라이언트 1개의 구독 프레임 송신 : 송신함의 최신 프레임을 보냄 (느린 클라이언트는 여기서 대기, 그동안 새 프레임이 덮어씀)"""
+    try:
+      while True:
+        with client.condition:
+          while client.is_open and not client.pushes:
+            client.condition.wait()
+          if not client.is_open:
+            return
+          frames = list(client.pushes.values())
+          client.pushes.clear()
+        client.send(*frames)
+    except Exception as e:
+      if self.is_running and client.is_open:
+        print(f"TCP 구독 송신 오류 ({client.address}): {e}")
+      client.close()
+
+  def send_to(self, client_address, data: bytes) -> bool:
+    """
+    연결된 클라이언트에 요청 없이 프레임 송신 (AU / KU 등, 송신함에 넣고 바로 반환), 연결이 없으면 False
+    송신 전인 같은 종류의 프레임이 있으면 새 프레임으로 교체 (최신 값만 유지)
+    """
+    with self.clients_lock:
+      client = self.clients.get(client_address)
+    if client is None:
+      return False
+    with client.condition:
+      if not client.is_open:
+        return False
+      key = data[:2]
+      if key in client.pushes:
+        client.counters['dropped'] += 1
+      client.pushes[key] = data
+      client.counters['pushed'] += 1
+      client.condition.notify_all()
+    return True
+
+  def stats(self) -> dict:
+    """연결별 명령 큐 길이 / 송신 대기 구독 프레임 수 / 수신 / BUSY / 구독 송신 / 건너뛴 구독 프레임 수"""
+    with self.clients_lock:
+      clients = list(self.clients.values())
+    result = {}
+    for client in clients:
+      with client.condition:
+        result[f"{client.address[0]}:{client.address[1]}"] = {
+          'queued': len(client.commands), 'pending_pushes': len(client.pushes), **client.counters,
+        }
+    return result
+
+  def dump_capture(self, path: str = None) -> str:
+    """
+    프레임 탭 캡처 파일 기록 (python -m communication.frame_tap <path> 로 출력)
+    path 가 없으면 FRAME_TAP_CONFIG['capture_dir'] 에 lms_<시각>.cap 으로 기록, 기록한 경로 반환
+    """
+    if path is None:
+      directory = FRAME_TAP_CONFIG['capture_dir']
+      if not os.path.isabs(directory):
+        directory = os.path.join(os.path.dirname(os.path.abspath(__file__)), directory)
+      os.makedirs(directory, exist_ok=True)
+      path = os.path.join(directory, time.strftime('lms_%Y%m%d_%H%M%S.cap'))
+    count = self.tap.dump(path)
+    print(f"프레임 캡처 {count}개 기록: {path}")
+    return path
+
   def stop(self):
     """서버 중지"""
     self.is_running = False
-    
+
     if self.server_socket:
       try:
         self.server_socket.close() # 소켓 닫기
       except:
         pass
-    print(f"TCP 핸들러 종료")
\ No newline at end of file
+    with self.clients_lock:
+      clients = list(self.clients.values())
+      self.clients.clear()
+    for client in clients:
+      client.close()
+    print(f"TCP 핸들러 종료")
+
+
+if __name__ == '__main__':
+  import struct
+  import random
+  from command_scheduler import CommandScheduler
+  # 사용법 : python tcp_handler.py [시간(초)]
+  # 평소 / 10배 요청률에서 큐 제한 없음 / 있음 (BUSY) 의 응답 시간 / 대기 명령 수 비교 (실제 소켓, 처리 1건 8ms 직렬)
+  # 읽지 않는 구독 클라이언트에 AU 를 계속 보내도 송신함이 최신 프레임 1개로 유지되고 send_to 가 막히지 않는지 확인
+  duration = float(sys.argv[1]) if len(sys.argv) > 1 else 4.0
+  service_time = 0.008
+  clients = 8
+
+  def free_port() -> int:
+    with socket.socket() as probe:
+      probe.bind(('localhost', 0))
+      return probe.getsockname()[1]
+
+  def measure(rate: float, bounded: bool):
+    lock = threading.Lock()
+
+    def handler(client_address, message):
+      with lock:  # 재고 트랜잭션 락 (직렬 처리)
+        time.sleep(service_time)
+      return MessageProtocol.pack_response(message[:2].decode(), 0x00, message[2:6])  # 전송 순번 반환
+
+    scheduler = CommandScheduler(handler)
+    server = TCPHandler(command_handler=scheduler.execute)
+    server.port = free_port()
+    if not bounded:
+      scheduler.max_queue = server.max_connection_queue = 10 ** 9
+    scheduler.start()
+    server.start()
+    time.sleep(0.2)
+
+    sent_at, latencies, busy, depth = {}, [], [0], [0]
+    sequence = [0]
+    sequence_lock = threading.Lock()
+    stop = threading.Event()
+
+    def reader(sock):
+      buffer = b''
+      while not stop.is_set() or len(latencies) + busy[0] < sequence[0]:
+        try:
+          data = sock.recv(4096)
+        except socket.timeout:
+          break
+        if not data:
+          break
+        buffer += data
+        while len(buffer) >= 18:
+          frame, buffer = buffer[:18], buffer[18:]
+          if frame[2] == MessageProtocol.STATUS_BUSY:
+            busy[0] += 1
+          else:
+            seq = struct.unpack_from('<I', frame, 3)[0]
+            latencies.append((sent_at[seq], time.perf_counter() - sent_at[seq]))
+
+    def writer(sock, seed):
+      rng = random.Random(seed)
+      deadline = time.perf_counter() + duration
+      while time.perf_counter() < deadline:
+        time.sleep(rng.expovariate(rate / clients))
+        with sequence_lock:
+          sequence[0] += 1
+          seq = sequence[0]
+          sent_at[seq] = time.perf_counter()
+        sock.sendall(MessageProtocol.pack_command('RI', struct.pack('<I', seq)))
+
+    sockets, threads = [], []
+    for i in range(clients):
+      sock = socket.create_connection(('localhost', server.port))
+      sock.settimeout(30)
+      sockets.append(sock)
+      threads += [threading.Thread(target=reader, args=(sock,)), threading.Thread(target=writer, args=(sock, i))]
+
+    def sampler():
+      while not stop.is_set():
+        pending = sum(len(client.commands) for client in list(server.clients.values()))
+        depth[0] = max(depth[0], pending + sum(scheduler.queue_depth().values()))
+        time.sleep(0.005)
+
+    threads.append(threading.Thread(target=sampler))
+    started = time.perf_counter()
+    for thread in threads:
+      thread.start()
+    for thread in threads[1::2][:clients]:
+      thread.join()
+    stop.set()
+    for thread in threads:
+      thread.join()
+    for sock in sockets:
+      sock.close()
+    server.stop()
+    scheduler.stop()
+
+    def percentile(values, q):
+      return values[max(0, int(len(values) * q) - 1)] * 1000 if values else 0.0
+
+    # 구간별 p95 : 응답 시간이 시간이 지날수록 늘어나는지 (큐 누적) 확인
+    halves = [sorted(latency for sent, latency in latencies if (sent - started < duration / 2) == first) for first in (True, False)]
+    ordered = sorted(latency for _, latency in latencies)
+    return {'sent': sequence[0], 'ok': len(latencies), 'busy': busy[0], 'p50': percentile(ordered, 0.5),
+            'p95': percentile(ordered, 0.95), 'p95_first': percentile(halves[0], 0.95), 'p95_second': percentile(halves[1], 0.95),
+            'depth': depth[0]}
+
+  def slow_reader(frames: int):
+    """읽지 않는 구독 클라이언트에 AU 프레임 frames 개 송신 : send_to 최대 소요 시간 / 송신함 크기"""
+    server = TCPHandler()
+    server.port = free_port()
+    server.start()
+    time.sleep(0.2)
+    slow = socket.create_connection(('localhost', server.port))
+    slow.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4096)
+    time.sleep(0.1)
+    address = next(iter(server.clients))
+    longest = 0.0
+    for value in range(frames):
+      started = time.perf_counter()
+      server.send_to(address, MessageProtocol.pack_stock_frame([value % 0xFFFF] * 7))
+      longest = max(longest, time.perf_counter() - started)
+    stats = server.stats()[f"{address[0]}:{address[1]}"]
+    slow.close()
+    server.stop()
+    return longest, stats
+
+  normal = 15.0
+  print(f"처리 1건 {service_time * 1000:.0f}ms (최대 {1 / service_time:.0f}건/초), 클라이언트 {clients}개, {duration:.0f}초")
+  for label, rate in (('평소', normal), ('10배', normal * 10)):
+    for bounded in (False, True):
+      result = measure(rate, bounded)
+      print(f"[{label} {rate:.0f}건/초, {'큐 제한' if bounded else '제한 없음'}] 처리 {result['ok']} / BUSY {result['busy']} / 전송 {result['sent']}, "
+            f"응답 p50 {result['p50']:.0f}ms / p95 {result['p95']:.0f}ms (전반 {result['p95_first']:.0f} -> 후반 {result['p95_second']:.0f}), "
+            f"최대 대기 명령 {result['depth']}개")
+  longest, stats = slow_reader(300000)
+  print(f"[읽지 않는 구독 클라이언트] AU {stats['pushed']}개 -> 덮어씀 {stats['dropped']}개, 송신 대기 {stats['pending_pushes']}개, "
+        f"send_to 최대 {longest * 1000:.2f}ms")
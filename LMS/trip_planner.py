@@ -0,0 +1,310 @@
+import os
+import sys
+import threading
+from typing import Dict, List, NamedTuple, Optional, Sequence
+
+# stw_lib / communication import (상위 경로)
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from stw_lib.sector_manager2 import SectorName, STORAGE_LANES, LANE_SECTORS, COLOR_TO_SECTOR, ItemColor, RobotStatus
+from communication.message_protocol import MessageProtocol
+from config import TRIP_PLANNER_CONFIG
+
+"""
+AGV 이동 계획 (RI / SI 작업 방문 순서)
+
+- 방문 지점 : RECEIVING -> 레인 구역 (레인 순서) -> SHIPPING, 지점 인덱스 = RM 명령의 target_position
+- 작업 1건 = 출발 지점에서 물품 1개 적재 -> 도착 지점에 하역 (AGV 는 한 번에 1개만 운반)
+  - RI : RECEIVING -> 색상 레인 / SI : 색상 레인 -> SHIPPING
+- 이동 시간 행렬은 설정의 지점 위치로 시작해 실제 구간 이동 시간 (observe) 으로 갱신 (지수 이동 평균)
+- 작업 순서는 총 이동 시간이 최소가 되도록 계산 : exact_limit 건 이하는 부분집합 DP (Held-Karp),
+  그보다 많으면 가까운 작업 우선 + 교환 개선. 레인 재고 / 용량을 넘는 순서는 제외한다.
+- 결과는 RM 명령 목록 (pipeline) 으로 변환해 한 번에 송신할 수 있다.
+"""
+
+SITES: List[SectorName] = [SectorName.RECEIVING, *LANE_SECTORS, SectorName.SHIPPING]
+SITE_INDEX: Dict[SectorName, int] = {site: i for i, site in enumerate(SITES)}
+LANE_CAPACITY: Dict[SectorName, int] = {COLOR_TO_SECTOR[ItemColor[lane['color']]]: lane['capacity'] for lane in STORAGE_LANES}
+
+INFINITY = float('inf')
+
+
+class TripTask(NamedTuple):
+  kind: str       # 'RI' / 'SI'
+  source: int     # 지점 인덱스 (SITES)
+  destination: int
+
+
+def receive_task(color: ItemColor) -> TripTask:
+  return TripTask('RI', SITE_INDEX[SectorName.RECEIVING], SITE_INDEX[COLOR_TO_SECTOR[color]])
+
+
+def ship_task(color: ItemColor) -> TripTask:
+  return TripTask('SI', SITE_INDEX[COLOR_TO_SECTOR[color]], SITE_INDEX[SectorName.SHIPPING])
+
+
+class TravelCostModel:
+  """지점 간 이동 시간 (초) 행렬 : 설정 위치 차이로 시작, 측정값으로 갱신"""
+  def __init__(self, positions: Dict[str, float] = None):
+    positions = positions or TRIP_PLANNER_CONFIG['positions']
+    spacing = TRIP_PLANNER_CONFIG['default_spacing']
+    # 설정에 없는 지점 (레인 추가 등) 은 지점 순서 x 기본 간격으로 추정
+    location = [positions.get(site.name, i * spacing) for i, site in enumerate(SITES)]
+    self.cost = [[abs(a - b) for b in location] for a in location]
+    self.samples = [[0] * len(SITES) for _ in SITES]
+    self.learning_rate = TRIP_PLANNER_CONFIG['learning_rate']
+    self.lock = threading.Lock()
+
+  def observe(self, source: int, destination: int, duration: float):
+    """구간 1회 실측 이동 시간 반영 (처음 몇 번은 평균, 이후 지수 이동 평균)"""
+    with self.lock:
+      self.samples[source][destination] += 1
+      rate = max(self.learning_rate, 1.0 / self.samples[source][destination])
+      self.cost[source][destination] += rate * (duration - self.cost[source][destination])
+
+  def observe_robot(self, robot):
+    """Robot 도착 (ARRIVED) 마다 마지막 구간의 실측 이동 시간을 반영"""
+    def on_status(robot, old_status, new_status):
+      if new_status != RobotStatus.ARRIVED or not robot.history:
+        return
+      leg = robot.history[-1]
+      if leg.duration is not None and leg.source in SITE_INDEX and leg.target in SITE_INDEX:
+        self.observe(SITE_INDEX[leg.source], SITE_INDEX[leg.target], leg.duration)
+    robot.register_listener('trip_planner', on_status)
+
+  def matrix(self) -> List[List[float]]:
+    with self.lock:
+      return [row[:] for row in self.cost]
+
+
+class TripPlanner:
+  def __init__(self, cost_model: TravelCostModel = None):
+    self.cost_model = cost_model or TravelCostModel()
+    self.exact_limit = TRIP_PLANNER_CONFIG['exact_limit']
+    self.capacity = [LANE_CAPACITY.get(site, 0) for site in SITES]  # 0 : 무제한 (RECEIVING / SHIPPING)
+
+  # --- 재고 제약 ---
+  def _feasible(self, task: TripTask, stock: List[int]) -> bool:
+    """작업 시작 시점의 지점별 재고로 실행 가능 여부 확인 (레인 용량 / 출발 지점 재고)"""
+    if task.kind == 'SI' and stock[task.source] <= 0:
+      return False
+    capacity = self.capacity[task.destination]
+    return not capacity or stock[task.destination] < capacity
+
+  @staticmethod
+  def _apply(task: TripTask, stock: List[int]):
+    stock[task.source] -= 1
+    stock[task.destination] += 1
+
+  def _initial_stock(self, stock: Optional[Dict[SectorName, int]]) -> List[int]:
+    stock = stock or {}
+    # RECEIVING 재고는 RI 작업 수만큼 있다고 보고 제약하지 않음 (출발 지점 재고는 SI 만 확인)
+    return [stock.get(site, 0) for site in SITES]
+
+  # --- 비용 ---
+  def route_time(self, tasks: Sequence[TripTask], start: int = 0, cost=None) -> float:
+    """start 지점에서 tasks 를 순서대로 수행하는 총 이동 시간 (초)"""
+    cost = cost or self.cost_model.matrix()
+    total, here = 0.0, start
+    for task in tasks:
+      total += cost[here][task.source] + cost[task.source][task.destination]
+      here = task.destination
+    return total
+
+  # --- 계획 ---
+  def plan(self, tasks: Sequence[TripTask], start: int = 0, stock: Dict[SectorName, int] = None):
+    """
+    이동 시간이 최소인 작업 순서
+
+    Returns:
+        (순서, 실행 불가 작업 목록) : 재고 / 용량 제약으로 어떤 순서로도 수행할 수 없는 작업은 계획에서 제외
+    """
+    tasks = list(tasks)
+    if not tasks:
+      return [], []
+    cost = self.cost_model.matrix()
+    stock = self._initial_stock(stock)
+    if len(tasks) <= self.exact_limit:
+      order = self._plan_exact(tasks, start, stock, cost)
+    else:
+      order = self._improve(self._plan_greedy(tasks, start, stock, cost), tasks, start, stock, cost)
+    planned = set(order)
+    return [tasks[i] for i in order], [task for i, task in enumerate(tasks) if i not in planned]
+
+  def fifo(self, tasks: Sequence[TripTask], stock: Dict[SectorName, int] = None):
+    """비교 기준 : 도착 순서대로, 지금 수행할 수 없는 작업은 건너뛰었다가 다시 시도"""
+    pending = list(tasks)
+    stock = self._initial_stock(stock)
+    order = []
+    while pending:
+      i = next((i for i, task in enumerate(pending) if self._feasible(task, stock)), None)
+      if i is None:
+        break
+      task = pending.pop(i)
+      self._apply(task, stock)
+      order.append(task)
+    return order, pending
+
+  def _plan_exact(self, tasks, start, stock, cost):
+    """부분집합 DP : best[mask][last] = mask 작업을 last 로 끝내는 최소 시간 (mask 의 재고는 순서와 무관)"""
+    n = len(tasks)
+    legs = [cost[t.source][t.destination] for t in tasks]
+    moves = [[cost[a.destination][b.source] for b in tasks] for a in tasks]
+    best = {}
+    parent = {}
+    for i, task in enumerate(tasks):
+      if self._feasible(task, stock):
+        best[(1 << i, i)] = cost[start][task.source] + legs[i]
+    for mask in range(1, 1 << n):
+      mask_stock = None
+      for last in range(n):
+        value = best.get((mask, last))
+        if value is None:
+          continue
+        if mask_stock is None:
+          mask_stock = stock[:]
+          for i in range(n):
+            if mask >> i & 1:
+              self._apply(tasks[i], mask_stock)
+        for nxt in range(n):
+          if mask >> nxt & 1 or not self._feasible(tasks[nxt], mask_stock):
+            continue
+          key = (mask | 1 << nxt, nxt)
+          candidate = value + moves[last][nxt] + legs[nxt]
+          if candidate < best.get(key, INFINITY):
+            best[key] = candidate
+            parent[key] = last
+    if not best:
+      return []
+    # 모든 작업을 끝내는 순서가 없으면 가장 많은 작업을 수행하는 순서 중 최소 시간
+    (mask, last), _ = min(best.items(), key=lambda item: (-bin(item[0][0]).count('1'), item[1]))
+    order = []
+    while True:
+      order.append(last)
+      previous = parent.get((mask, last))
+      mask &= ~(1 << last)
+      if previous is None:
+        break
+      last = previous
+    return order[::-1]
+
+  def _plan_greedy(self, tasks, start, stock, cost):
+    """가장 가까운 (현재 위치 -> 출발 지점) 수행 가능 작업부터"""
+    stock = stock[:]
+    pending = set(range(len(tasks)))
+    order, here = [], start
+    while pending:
+      candidates = [i for i in pending if self._feasible(tasks[i], stock)]
+      if not candidates:
+        break
+      i = min(candidates, key=lambda i: (cost[here][tasks[i].source] + cost[tasks[i].source][tasks[i].destination], i))
+      pending.remove(i)
+      self._apply(tasks[i], stock)
+      order.append(i)
+      here = tasks[i].destination
+    return order
+
+  def _valid(self, order, tasks, stock) -> bool:
+    stock = stock[:]
+    for i in order:
+      if not self._feasible(tasks[i], stock):
+        return False
+      self._apply(tasks[i], stock)
+    return True
+
+  def _improve(self, order, tasks, start, stock, cost, max_passes: int = 4):
+    """작업 하나를 다른 위치로 옮겨 총 이동 시간이 줄면 적용 (개선이 없거나 max_passes 회까지)"""
+    route_time = lambda candidate: self.route_time([tasks[i] for i in candidate], start, cost)
+    best_time = route_time(order)
+    for _ in range(max_passes):
+      improved = False
+      for i in range(len(order)):
+        for j in range(len(order)):
+          if i == j:
+            continue
+          candidate = order[:i] + order[i + 1:]
+          candidate.insert(j, order[i])
+          candidate_time = route_time(candidate)
+          if candidate_time < best_time - 1e-9 and self._valid(candidate, tasks, stock):
+            order, best_time, improved = candidate, candidate_time, True
+      if not improved:
+        break
+    return order
+
+  # --- RM 명령 ---
+  @staticmethod
+  def positions(plan: Sequence[TripTask], start: int = 0) -> List[int]:
+    """계획 -> 방문 지점 목록 (같은 지점 연속 방문은 생략)"""
+    positions, here = [], start
+    for task in plan:
+      for site in (task.source, task.destination):
+        if site != here:
+          positions.append(site)
+          here = site
+    return positions
+
+  @classmethod
+  def rm_pipeline(cls, plan: Sequence[TripTask], start: int = 0) -> bytes:
+    """계획 -> RM 명령 (17바이트) 연속 바이트열 : 한 번에 송신하고 응답은 순서대로 수신"""
+    return b''.join(MessageProtocol.pack_command('RM', MessageProtocol.pack_rm_data(position))
+                    for position in cls.positions(plan, start))
+
+
+if __name__ == '__main__':
+  import time
+  import random
+  # 사용법 : python trip_planner.py [배치 수] [배치 크기] : FIFO 대비 시간당 처리 물품 수 (이동 시간 학습 포함)
+  batches = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+  batch_size = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+  rng = random.Random(0)
+  handling = TRIP_PLANNER_CONFIG['handling_time']
+  # 실제 이동 시간 : 설정 위치와 다른 배치 (학습 전 추정이 틀린 상황) + 편차 10%
+  actual = {site: i * 1.2 + (0.8 if site == SectorName.SHIPPING else 0.0) for i, site in enumerate(SITES)}
+
+  def travel(a, b):
+    return abs(actual[SITES[a]] - actual[SITES[b]]) * (1 + rng.uniform(-0.1, 0.1))
+
+  def execute(plan, start, model):
+    """계획 실행 시뮬레이션 : 구간 실측 시간을 모델에 반영, (소요 시간, 마지막 위치) 반환"""
+    elapsed, here = 0.0, start
+    for task in plan:
+      for site in (task.source, task.destination):
+        if site != here:
+          duration = travel(here, site)
+          model.observe(here, site, duration)
+          elapsed += duration
+          here = site
+      elapsed += 2 * handling  # 적재 + 하역
+    return elapsed, here
+
+  colors = [ItemColor[lane['color']] for lane in STORAGE_LANES]
+  results = {}
+  plan_times = []
+  for mode in ('fifo', 'planner'):
+    rng.seed(1)
+    planner = TripPlanner(TravelCostModel())
+    stock = {sector: LANE_CAPACITY[sector] // 2 for sector in LANE_SECTORS}
+    elapsed, done, sorted_items, here, backlog = 0.0, 0, 0, 0, []
+    for _ in range(batches):
+      # 새 작업 batch_size 건 (입고 / 출고 반반) + 이전 배치에서 수행하지 못한 작업 (최대 batch_size 건)
+      tasks = backlog + [receive_task(rng.choice(colors)) if rng.random() < 0.5 else ship_task(rng.choice(colors))
+                         for _ in range(batch_size)]
+      if mode == 'fifo':
+        plan, backlog = planner.fifo(tasks, stock)
+      else:
+        started = time.perf_counter()
+        plan, backlog = planner.plan(tasks, here, stock)
+        plan_times.append(time.perf_counter() - started)
+      backlog = backlog[-batch_size:]
+      duration, here = execute(plan, here, planner.cost_model)
+      elapsed += duration
+      done += len(plan)
+      sorted_items += sum(task.kind == 'RI' for task in plan)
+      for task in plan:
+        if task.kind == 'RI':
+          stock[SITES[task.destination]] += 1
+        else:
+          stock[SITES[task.source]] -= 1
+    results[mode] = sorted_items / elapsed * 3600
+    print(f"{mode:<8}: 작업 {done}건 / {elapsed:.0f}초 -> 분류 {results[mode]:.0f}개/시간, 전체 {done / elapsed * 3600:.0f}건/시간")
+  print(f"분류 처리량 {(results['planner'] / results['fifo'] - 1) * 100:+.1f}%, "
+        f"계획 계산 평균 {sum(plan_times) / len(plan_times) * 1000:.2f}ms (배치 {batch_size}건 + 이월 작업)")
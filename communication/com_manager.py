@@ -1,36 +1,60 @@
 # 통합 통신 매니저 아키텍처
 
+import random
 import socket
 import threading
 import time
-from typing import Dict, Callable, Any
+from typing import Dict, Callable, Any, Sequence
 
 from .message_protocol import MessageProtocol
+from .frame_tap import FrameTap, COMMAND, RESPONSE, ROLE_CLIENT, LANE_COLORS
 
 class ComManager:
   """TCP/IP통신 매니저 구현"""
   
-  def __init__(self, host : str = 'localhost', port : int = 8100):
+  # 요청 ID 를 붙여 응답이 없으면 같은 ID 로 재전송하는 명령 (LMS 가 중복 요청을 다시 실행하지 않음)
+  IDEMPOTENT_COMMANDS = ('RI', 'SI')
+  BUSY_BACKOFF = 0.2  # BUSY 응답 후 재전송 대기 (초, 재시도마다 증가)
+
+  def __init__(self, host : str = 'localhost', port : int = 8100, lanes : Sequence[str] = LANE_COLORS,
+               retries : int = 3, tap_slots : int = 4096, client_id : int = None):
     """
     통신 매니저
     
     Args :
       Host : LMS 서버 호스트 주소
       Port : LMS 서버 포트 번호
+      Lanes : 저장 레인 색상 이름 (config.py STORAGE_LANES 순서, AU 응답 길이 결정)
+      Retries : RI / SI 응답이 없을 때 재연결 후 같은 요청 ID 로 다시 보내는 횟수
+      Tap_slots : 프레임 탭 링 버퍼 크기 (최근 송수신 프레임 수, dump_capture 로 캡처 파일 기록)
+      Client_id : 요청 ID 와 함께 보내는 클라이언트 ID (uint16, LMS 중복 제거 키), 기본값은 무작위 (0 제외)
     """
     self.host = host
     self.port = port
+    self.lanes = tuple(lanes)
+    self.au_frame_size = MessageProtocol.au_frame_size(len(self.lanes))
     self.socket = None
     self.monitoring_thread = None
     self.is_monitoring = False
     self.subscribers = {} # 탭별 콜백 등록
     self.is_connected = False
+    self.retries = retries
+    self.client_id = (client_id or random.randrange(1, 0x10000)) & 0xFFFF  # 같은 호스트의 클라이언트 구분
+    self.request_id = random.getrandbits(16)  # 요청 ID 시작값 (재시작한 클라이언트의 ID 가 이전 요청과 겹치지 않도록 무작위)
+    self.request_lock = threading.Lock()
+    self.outbound = []                        # 송신 대기 프레임 : flush 때까지 쌓인 프레임은 sendmsg 1회로 송신
+    self.outbound_lock = threading.Lock()
+    self.exchange_lock = threading.RLock()    # 송신 -> 응답 수신 직렬화 (GUI 스레드 / 모니터링 스레드가 소켓 공유)
+    self.tap = FrameTap(tap_slots, ROLE_CLIENT)  # 송수신 프레임 기록 (프레임별 hex 출력 대신, 필요할 때 덤프)
   
   def connect(self) -> bool:
     """LMS 서버에 연결"""
     try:
       self.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
       self.socket.settimeout(5.0)
+      # 17바이트 명령을 Nagle 지연 없이 바로 송신 (여러 프레임은 flush 에서 sendmsg 1회로 묶음)
+      self.socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+      self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
       self.socket.connect((self.host, self.port))
       self.is_connected = True
       print(f"서버 연결 성공: {self.host}:{self.port}")
@@ -68,14 +92,19 @@ class ComManager:
       return None
     
     try:
-      # 바이너리 메시지 전송
-      self.socket.send(message)
-      print(f"Raw 메시지 전송: {message.hex()}")
-      
-      # 응답 수신 (AU + RU 조합 응답을 위해 더 큰 버퍼 사용)
-      response = self.socket.recv(2048)  # AU(18 bytes) + RU(18 bytes) = 최대 36 bytes + 여유
+      if message[:2].decode('ascii', 'replace') in self.IDEMPOTENT_COMMANDS:
+        # RI / SI : 요청 ID 를 붙여 응답이 없으면 같은 ID 로 재전송 (응답은 18바이트 고정)
+        if not MessageProtocol.unpack_request_id(message):
+          message = message[:2] + self._attach_request_id(message[2:16]) + message[16:]
+        return self._exchange([message], True)[0]
+
+      # 바이너리 메시지 전송 및 응답 수신 (AU + RU 조합 응답을 위해 더 큰 버퍼 사용)
+      with self.exchange_lock:
+        self.queue_frame(message)
+        self.flush()
+        response = self.socket.recv(2048)  # AU(18 bytes) + RU(18 bytes) = 최대 36 bytes + 여유
       if response:
-        print(f"Raw 응답 수신: {response.hex()}")
+        self.tap.record(RESPONSE, response)
         return response
       else:
         print("서버 응답 없음")
@@ -86,6 +115,36 @@ class ComManager:
       self.is_connected = False
       return None
 
+  def send_and_refresh(self, message: bytes):
+    """
+    명령 + RA 를 sendmsg 1회로 함께 보내고 두 응답을 순서대로 수신 (명령 후 재고 갱신, 왕복 1회)
+    RI / SI 는 요청 ID 를 붙여 응답이 없으면 재연결 후 같은 ID 로 다시 보냄
+
+    Returns:
+        (명령 응답, AU 응답), 실패 시 (None, None)
+    """
+    if not self.is_connected:
+      print("서버에 연결되지 않음")
+      return None, None
+    try:
+      retry = message[:2].decode('ascii', 'replace') in self.IDEMPOTENT_COMMANDS
+      if retry and not MessageProtocol.unpack_request_id(message):
+        message = message[:2] + self._attach_request_id(message[2:16]) + message[16:]
+      ra = MessageProtocol.pack_command('RA', MessageProtocol.pack_ra_data())
+      response, au_response = self._exchange([message, ra], retry)
+      return response, au_response
+    except Exception as e:
+      print(f"명령 + RA 전송 실패: {e}")
+      self.is_connected = False
+      return None, None
+
+  def query_backorders(self) -> Dict[str, Any]:
+    """BQ 명령으로 출고 대기 주문 현황 조회 : {'count', 'oldest_age'(초), 'depth': {색상: 대기 주문 수}}"""
+    response = self.send_raw_message(MessageProtocol.pack_command('BQ', MessageProtocol.pack_bq_data()))
+    if not response or response[:2] != b'BU' or response[2] != 0x00:
+      return None
+    return MessageProtocol.unpack_backorder_data(response[3:-1], self.lanes)
+
   def send_command(self, command:str, data: Dict[str, Any]):
     """명령어 전송 및 응답 처리"""
     if not self.is_connected:
@@ -96,7 +155,7 @@ class ComManager:
       if command == 'RI':
         msg_data = MessageProtocol.pack_ri_data(data.get('red', 0), data.get('green', 0))
       elif command == 'SI':
-        msg_data = MessageProtocol.pack_si_data(data.get('red', 0), data.get('green', 0), data.get('yellow', 0))
+        msg_data = MessageProtocol.pack_lane_quantities([data.get(lane.lower(), 0) for lane in self.lanes])
       elif command == 'RH':
         msg_data = MessageProtocol.pack_rh_data(data.get('success', False))
       elif command == 'RA':
@@ -117,12 +176,10 @@ class ComManager:
         return {"success": False, "message": f"지원하지 않는 명령어: {command}"}
       
       # 바이너리 메시지 생성 및 전송
+      if command in self.IDEMPOTENT_COMMANDS:
+        msg_data = self._attach_request_id(msg_data)
       message = MessageProtocol.pack_command(command, msg_data)
-      self.socket.send(message)
-      print(f"명령어 전송: {command}, 데이터: {data}")
-      
-      # 응답 수신 (4바이트 최소 크기)
-      response = self.socket.recv(4)
+      response = self._exchange([message], command in self.IDEMPOTENT_COMMANDS)[0]
       if response:
         parsed_response = MessageProtocol.unpack_response(response)
         success = parsed_response.get("status") == "SUCCESS"
@@ -139,6 +196,80 @@ class ComManager:
       self.is_connected = False
       return {"success": False, "message": str(e)}
   
+  def _next_request_id(self) -> int:
+    """다음 요청 ID (uint16, 0 은 요청 ID 없음이므로 건너뜀)"""
+    with self.request_lock:
+      self.request_id = (self.request_id + 1) & 0xFFFF or 1
+      return self.request_id
+
+  def _attach_request_id(self, data: bytes) -> bytes:
+    """명령 데이터에 클라이언트 ID + 다음 요청 ID 기록"""
+    return MessageProtocol.attach_request_id(data, self.client_id, self._next_request_id())
+
+  def queue_frame(self, frame: bytes):
+    """송신 대기 프레임 추가 (flush 에서 함께 송신)"""
+    with self.outbound_lock:
+      self.outbound.append(frame)
+
+  def flush(self):
+    """쌓인 프레임을 sendmsg 1회 (scatter-gather) 로 송신, sendmsg 가 없는 플랫폼 (Windows) 은 합쳐서 sendall"""
+    with self.outbound_lock:
+      frames, self.outbound = self.outbound, []
+      if not frames:
+        return
+      for frame in frames:
+        self.tap.record(COMMAND, frame)
+      if hasattr(self.socket, 'sendmsg'):
+        sent = self.socket.sendmsg(frames)
+        total = sum(len(frame) for frame in frames)
+        if sent < total:
+          self.socket.sendall(b''.join(frames)[sent:])  # 송신 버퍼가 가득 차 일부만 보낸 경우
+      else:
+        self.socket.sendall(b''.join(frames))
+
+  def _response_size(self, command: bytes) -> int:
+    """명령별 성공 응답 길이 : RA -> AU (레인 수에 따른 가변 길이), 그 외 고정 길이 응답"""
+    if command == b'RA':
+      return self.au_frame_size
+    if command == b'BQ':
+      return 3 + max(14, 2 * (2 + len(self.lanes))) + 1
+    return MessageProtocol.RESPONSE_SIZE
+
+  def _recv_response(self, command: bytes) -> bytes:
+    """
+    응답 1개 수신 : 헤더 (Command + Status) 를 먼저 읽고 상태로 나머지 길이 결정
+    실패 / BUSY 응답은 명령과 관계없이 고정 길이 (18바이트) 이므로, RA 의 BUSY 를 AU 길이로 읽으면 스트림이 어긋남
+    """
+    header = self._recv_exact(3)
+    size = self._response_size(command) if header[2] == 0x00 else MessageProtocol.RESPONSE_SIZE
+    return header + self._recv_exact(size - 3)
+
+  def _exchange(self, messages: Sequence[bytes], retry: bool) -> list:
+    """
+    명령들을 sendmsg 1회로 송신 후 응답을 순서대로 수신
+    retry 이면 시간 초과 / 연결 끊김 시 재연결해 같은 메시지 (같은 요청 ID) 를 다시 보낸다. (LMS 가 중복 실행하지 않음)
+    첫 명령이 BUSY (LMS 과부하, 처리하지 않음) 응답이면 잠시 뒤 다시 보낸다.
+    """
+    attempts = 1 + (self.retries if retry else 0)
+    for attempt in range(attempts):
+      try:
+        with self.exchange_lock:
+          for message in messages:
+            self.queue_frame(message)
+          self.flush()
+          responses = [self._recv_response(message[:2]) for message in messages]
+        if responses[0][2] != MessageProtocol.STATUS_BUSY or attempt + 1 >= attempts:
+          return responses
+        time.sleep(self.BUSY_BACKOFF * (attempt + 1))
+      except (socket.timeout, OSError, ConnectionError) as e:
+        if attempt + 1 >= attempts:
+          raise
+        print(f"응답 없음 ({e}), 재전송 {attempt + 1}/{self.retries}")
+        if self.socket:
+          self.socket.close()
+        if not self.connect():
+          raise
+
   def start_monitoring(self):
     """실시간 데이터 모니터링 시작"""
     if self.is_monitoring:
@@ -170,24 +301,20 @@ class ComManager:
     
     while self.is_monitoring and self.is_connected:
       try:
-        # RA 명령으로 재고 상태 요청
-        result = self.send_command('RA', {})
+        # RA 명령으로 재고 상태 요청 -> AU 응답 (레인 수에 따른 가변 길이) 수신
+        au_response = self._exchange([MessageProtocol.pack_command('RA', MessageProtocol.pack_ra_data())], False)[0]
         
-        if result.get("success"):
-          # AU 응답 수신 대기 (17바이트)
-          au_response = self.socket.recv(17)
+        if au_response[:2] == b'AU' and au_response[2] == 0x00:
+          stock_data = MessageProtocol.unpack_stock_data(au_response[3:-1], self.lanes)
+          
+          # 구독자들에게 데이터 배포
+          notification_data = {
+            "command": "AU",
+            "timestamp": time.time(),
+            "stock_data": stock_data
+          }
           
-          if len(au_response) >= 17 and au_response[:2] == b'AU':
-            stock_data = MessageProtocol.unpack_stock_data(au_response[2:16])
-            
-            # 구독자들에게 데이터 배포
-            notification_data = {
-              "command": "AU",
-              "timestamp": time.time(),
-              "stock_data": stock_data
-            }
-            
-            self._notify_subscribers(notification_data)
+          self._notify_subscribers(notification_data)
           
         time.sleep(2)  # 2초 간격으로 모니터링
         
@@ -198,6 +325,23 @@ class ComManager:
     
     print("[모니터링] 백그라운드 스레드 종료")
   
+  def _recv_exact(self, size: int) -> bytes:
+    """정확히 size 바이트 수신 (TCP 스트림이므로 응답이 나뉘어 도착할 수 있음)"""
+    data = b''
+    while len(data) < size:
+      chunk = self.socket.recv(size - len(data))
+      if not chunk:
+        raise ConnectionError("서버 연결 종료")
+      data += chunk
+    self.tap.record(RESPONSE, data)
+    return data
+
+  def dump_capture(self, path: str) -> int:
+    """프레임 탭 캡처 파일 기록 (python -m communication.frame_tap <path> 로 출력), 기록한 프레임 수 반환"""
+    count = self.tap.dump(path)
+    print(f"프레임 캡처 {count}개 기록: {path}")
+    return count
+
   def _notify_subscribers(self, data: Dict[str, Any]):
     """구독자들에게 데이터 전달"""
     for tab_name, callback in self.subscribers.items():
@@ -208,6 +352,123 @@ class ComManager:
 
 # 사용 예제
 if __name__ == "__main__":
+    import sys
+
+    if len(sys.argv) > 1 and sys.argv[1] == 'bench':
+        # 사용법 : python -m communication.com_manager bench [반복 횟수] [단방향 지연(ms)]
+        # 명령 + RA 조회 지연 비교 : 로컬 LMS 대용 서버 앞에 지연 프록시를 두어 원격 링크를 흉내냄
+        # 기존 (send -> 응답 -> send -> 응답, 왕복 2회) / sendmsg 1회 + TCP_NODELAY (왕복 1회)
+        repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+        one_way = (float(sys.argv[3]) if len(sys.argv) > 3 else 5.0) / 1000
+        ri = MessageProtocol.pack_command('RI', MessageProtocol.pack_ri_data(1, 0))
+        ra = MessageProtocol.pack_command('RA', MessageProtocol.pack_ra_data())
+
+        def listen():
+            server = socket.socket()
+            server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            server.bind(('localhost', 0))
+            server.listen(1)
+            return server
+
+        def serve():
+            """17바이트 명령마다 응답을 따로 송신하는 LMS 대용 서버"""
+            server = listen()
+
+            def loop():
+                conn, _ = server.accept()
+                conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+                buffer = b''
+                while True:
+                    data = conn.recv(1024)
+                    if not data:
+                        break
+                    buffer += data
+                    while len(buffer) >= 17:
+                        frame, buffer = buffer[:17], buffer[17:]
+                        if frame[:2] == b'RA':
+                            conn.sendall(MessageProtocol.pack_stock_frame([1] * 7))
+                        else:
+                            conn.sendall(MessageProtocol.pack_response(frame[:2].decode(), 0x00))
+                conn.close()
+                server.close()
+
+            threading.Thread(target=loop, daemon=True).start()
+            return server.getsockname()[1]
+
+        def proxy(upstream_port):
+            """수신한 데이터를 one_way 초 뒤에 전달하는 지연 프록시 (양방향)"""
+            server = listen()
+
+            def pump(source, target):
+                pending, condition = [], threading.Condition()
+
+                def forward():
+                    while True:
+                        with condition:
+                            while not pending:
+                                condition.wait()
+                            due, data = pending.pop(0)
+                        time.sleep(max(0.0, due - time.perf_counter()))
+                        if data is None:
+                            target.close()
+                            return
+                        target.sendall(data)
+
+                threading.Thread(target=forward, daemon=True).start()
+                while True:
+                    try:
+                        data = source.recv(4096)
+                    except OSError:
+                        data = b''
+                    with condition:
+                        pending.append((time.perf_counter() + one_way, data or None))
+                        condition.notify()
+                    if not data:
+                        return
+
+            def accept():
+                client, _ = server.accept()
+                upstream = socket.create_connection(('localhost', upstream_port))
+                for sock in (client, upstream):
+                    sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+                threading.Thread(target=pump, args=(client, upstream), daemon=True).start()
+                threading.Thread(target=pump, args=(upstream, client), daemon=True).start()
+                server.close()
+
+            threading.Thread(target=accept, daemon=True).start()
+            return server.getsockname()[1]
+
+        def legacy(manager):
+            # 기존 GUI : RI 송신 -> 응답 -> RA 송신 -> 응답 (send 2회, 왕복 2회, TCP_NODELAY 없음)
+            manager.socket.send(ri)
+            manager._recv_exact(MessageProtocol.RESPONSE_SIZE)
+            manager.socket.send(ra)
+            manager._recv_exact(manager.au_frame_size)
+
+        def coalesced(manager):
+            manager._exchange([ri, ra], False)
+
+        def measure(label, run):
+            manager = ComManager(port=proxy(serve()))
+            if run is coalesced:
+                manager.connect()
+            else:
+                manager.socket = socket.create_connection(('localhost', manager.port))
+            samples = []
+            for _ in range(repeat):
+                started = time.perf_counter()
+                run(manager)
+                samples.append((time.perf_counter() - started) * 1000)
+            manager.socket.close()
+            samples.sort()
+            print(f"[{label}] 명령 + RA p50 {samples[len(samples) // 2]:.1f}ms / p95 {samples[int(len(samples) * 0.95) - 1]:.1f}ms"
+                  f" / 최대 {samples[-1]:.1f}ms")
+
+        print(f"단방향 지연 {one_way * 1000:.1f}ms (왕복 {one_way * 2000:.1f}ms), {repeat}회")
+        measure('기존 : send 2회, 왕복 2회', legacy)
+        measure('sendmsg 1회 + TCP_NODELAY, 왕복 1회', coalesced)
+        sys.exit(0)
+
     def on_data_received(data):
         print(f"데이터 수신: {data}")
     
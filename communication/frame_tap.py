@@ -0,0 +1,200 @@
+import sys
+import time
+import struct
+import itertools
+from typing import Dict, Any, Iterator, Sequence
+
+from .message_protocol import MessageProtocol
+from stw_lib.sector_manager2 import STORAGE_LANES
+
+"""
+프레임 탭 : 송수신 원본 프레임을 고정 크기 메모리 링 버퍼에 기록
+
+- record() : 시각 + 방향 + 길이 + 연결 번호 + 프레임 (최대 SLOT_DATA 바이트) 을 미리 할당한 bytearray 슬롯에 덮어씀
+  (할당 / 문자열 변환 / 출력 없음, 슬롯 번호는 itertools.count 로 잠금 없이 증가)
+- dump(path) : 링 버퍼를 오래된 순서로 바이너리 캡처 파일에 기록 (필요할 때만)
+- 디코더 : python -m communication.frame_tap <캡처 파일> -> MessageProtocol 필드 이름으로 출력
+
+캡처 파일 : 헤더 (MAGIC(8) + 역할(1) + 슬롯 크기(2) + 레코드 수(4)) + 레코드 (슬롯 크기 x 레코드 수)
+레코드 : 시각(8, unix 초 double) + 방향(1) + 원래 길이(2) + 연결 번호(2) + 프레임(SLOT_DATA, 원래 길이가 길면 잘림)
+  - 연결 번호 : 서버 탭은 TCP 연결마다 1 부터 붙인 번호 (연결 시 주소와 함께 로그 출력), 클라이언트 탭은 0
+  - MAGIC 이 LMSCAP1 인 이전 캡처 파일 (연결 번호 없음) 도 읽을 수 있음
+"""
+
+MAGIC = b'LMSCAP2\x00'
+MAGIC_V1 = b'LMSCAP1\x00'
+FILE_HEADER = struct.Struct('<8sBHI')
+RECORD_HEADER = struct.Struct('<dBHH')
+RECORD_HEADER_V1 = struct.Struct('<dBH')
+SLOT_SIZE = 64
+SLOT_DATA = SLOT_SIZE - RECORD_HEADER.size
+SLOT = struct.Struct(f'<dBHH{SLOT_DATA}s')  # 's' 필드 : 짧으면 0 으로 채우고 길면 자름
+
+# 방향 : 명령 (클라이언트 -> LMS) / 응답 및 구독 프레임 (LMS -> 클라이언트)
+COMMAND = 0
+RESPONSE = 1
+DIRECTION_NAMES = {COMMAND: 'CMD', RESPONSE: 'RSP'}
+
+# 역할 : 탭을 둔 쪽 (출력 시 송신 / 수신 표시)
+ROLE_CLIENT = 0
+ROLE_SERVER = 1
+
+# 레인 색상 이름 (config.py STORAGE_LANES 순서, AU 필드 이름)
+LANE_COLORS = tuple(lane['color'] for lane in STORAGE_LANES)
+
+
+class FrameTap:
+    """송수신 프레임 링 버퍼 (slots 개, 가득 차면 가장 오래된 레코드부터 덮어씀)"""
+
+    def __init__(self, slots: int = 4096, role: int = ROLE_CLIENT):
+        self.slots = slots
+        self.role = role
+        self.buffer = bytearray(slots * SLOT_SIZE)
+        self.counter = itertools.count()
+        self.recorded = 0  # 마지막 기록 번호 + 1 (dump 시 시작 위치 계산)
+        self.pack_into = SLOT.pack_into
+
+    def record(self, direction: int, frame: bytes, connection: int = 0):
+        """프레임 1개 기록 (핫 패스 : struct.pack_into 1회, 할당 없음), connection : 연결 번호 (0 ~ 65535)"""
+        index = next(self.counter)
+        self.pack_into(self.buffer, (index % self.slots) * SLOT_SIZE, time.time(), direction, len(frame), connection, frame)
+        self.recorded = index + 1
+
+    def snapshot(self) -> bytes:
+        """기록된 레코드를 오래된 순서로 이어 붙인 바이트 (기록 중에도 호출 가능, 복사 시점 기준)"""
+        recorded = self.recorded
+        data = bytes(self.buffer)
+        count = min(recorded, self.slots)
+        start = (recorded - count) % self.slots
+        ordered = data[start * SLOT_SIZE:] + data[:start * SLOT_SIZE]
+        return ordered[:count * SLOT_SIZE] if recorded < self.slots else ordered
+
+    def dump(self, path: str) -> int:
+        """캡처 파일 기록, 기록한 레코드 수 반환"""
+        records = self.snapshot()
+        count = len(records) // SLOT_SIZE
+        with open(path, 'wb') as f:
+            f.write(FILE_HEADER.pack(MAGIC, self.role, SLOT_SIZE, count))
+            f.write(records)
+        return count
+
+
+def read_capture(path: str) -> Iterator[Dict[str, Any]]:
+    """캡처 파일 레코드 : {'timestamp', 'direction', 'length', 'connection', 'frame', 'role'}"""
+    with open(path, 'rb') as f:
+        magic, role, slot_size, count = FILE_HEADER.unpack(f.read(FILE_HEADER.size))
+        if magic not in (MAGIC, MAGIC_V1):
+            raise ValueError(f"캡처 파일이 아님: {path}")
+        header = RECORD_HEADER if magic == MAGIC else RECORD_HEADER_V1
+        for _ in range(count):
+            slot = f.read(slot_size)
+            if len(slot) < slot_size:
+                return
+            timestamp, direction, length, *connection = header.unpack_from(slot)
+            captured = min(length, slot_size - header.size)
+            yield {'timestamp': timestamp, 'direction': direction, 'length': length, 'role': role,
+                   'connection': connection[0] if connection else 0,
+                   'frame': slot[header.size:header.size + captured]}
+
+
+def lane_names(count: int) -> Sequence[str]:
+    """AU 필드 이름 : 구성된 레인 수와 같으면 STORAGE_LANES 색상, 다르면 (다른 구성의 캡처) LANE1.. """
+    if count == len(LANE_COLORS):
+        return LANE_COLORS
+    return tuple(f'LANE{i + 1}' for i in range(count))
+
+
+def decode_frame(direction: int, frame: bytes) -> Dict[str, Any]:
+    """프레임 1개를 MessageProtocol 필드 이름으로 해석"""
+    command = frame[:2].decode('ascii', 'replace')
+    if direction == COMMAND:
+        data = frame[2:16]
+        fields: Dict[str, Any] = {'command': command}
+        if command == 'RI':
+            fields['red'], fields['green'] = struct.unpack_from('<HH', data)
+        elif command == 'SI':
+            fields['quantities'] = list(struct.unpack_from(f'<{MessageProtocol.MAX_LANES}H', data))
+        elif command == 'RS':
+            fields['stats_type'], fields['start'], fields['end'] = struct.unpack_from('<BII', data)
+        elif command in ('AS', 'KS'):
+            fields['subscribe'] = data[0]
+        elif command == 'RM':
+            fields['position'] = data[0]
+        elif any(data):
+            fields['data'] = data.hex()
+        request_id = MessageProtocol.unpack_request_id(frame)
+        if request_id and command in ('RI', 'SI'):
+            fields['client_id'] = MessageProtocol.unpack_client_id(frame)
+            fields['request_id'] = request_id
+        return fields
+
+    fields = {'command': command, 'status': MessageProtocol.unpack_response(frame).get('status', '?')}
+    data = frame[3:-1]
+    if frame[2] != 0x00:
+        return fields
+    if command in ('AU', 'AS'):
+        fields['stock'] = MessageProtocol.unpack_stock_data(data, lane_names(len(data) // 2 - 4))
+    elif command == 'RU':
+        fields['stats'] = MessageProtocol.unpack_lane_stats(data)
+    elif command == 'BU':
+        fields['backorders'] = MessageProtocol.unpack_backorder_data(data)
+    elif command == 'RQ':
+        fields['robot'] = MessageProtocol.unpack_robot_data(data)
+    elif command in ('KU', 'KS'):
+        if len(data) >= 10:
+            names = ('received_per_min_x10', 'sorted_per_min_x10', 'shipped_per_min_x10', 'cycle_mean_ms', 'cycle_p95_ms')
+            fields.update(zip(names, struct.unpack_from('<5H', data)))
+    elif any(data):
+        fields['data'] = data.hex()
+    return fields
+
+
+def render(path: str) -> Iterator[str]:
+    """캡처 파일 -> 사람이 읽는 한 줄씩 (시각, 연결 번호 (서버 캡처), 방향, 길이, 해석한 필드)"""
+    first = None
+    for record in read_capture(path):
+        first = record['timestamp'] if first is None else first
+        sent = (record['direction'] == COMMAND) == (record['role'] == ROLE_CLIENT)
+        clock = time.strftime('%H:%M:%S', time.localtime(record['timestamp'])) + f".{int(record['timestamp'] % 1 * 1e6):06d}"
+        truncated = ' (잘림)' if record['length'] > len(record['frame']) else ''
+        fields = decode_frame(record['direction'], record['frame'])
+        connection = f"#{record['connection']:<3d} " if record['role'] == ROLE_SERVER else ''
+        yield (f"{clock} +{(record['timestamp'] - first) * 1000:9.3f}ms {connection}{'TX' if sent else 'RX'} "
+               f"{DIRECTION_NAMES.get(record['direction'], '?')} {record['length']:3d}B{truncated} {fields}")
+
+
+if __name__ == '__main__':
+    import os
+    import tempfile
+    # 사용법 : python -m communication.frame_tap <캡처 파일>  -> 캡처 출력
+    #          python -m communication.frame_tap bench         -> 프레임 1개당 hex 출력 / 탭 기록 비용 비교
+    if len(sys.argv) > 1 and sys.argv[1] != 'bench':
+        for line in render(sys.argv[1]):
+            print(line)
+        sys.exit(0)
+
+    count = 200000
+    frame = MessageProtocol.pack_command('RI', MessageProtocol.pack_ri_data(3, 0))
+    # 기존 : 프레임마다 hex 문자열 출력 (출력 대상은 /dev/null, 실제 터미널 / 로그 파일은 더 느림)
+    with open(os.devnull, 'w') as sink:
+        started = time.perf_counter()
+        for _ in range(count):
+            print(f"Raw 메시지 전송: {frame.hex()}", file=sink, flush=True)
+        printed = time.perf_counter() - started
+    tap = FrameTap()
+    started = time.perf_counter()
+    for _ in range(count):
+        tap.record(COMMAND, frame)
+    tapped = time.perf_counter() - started
+    print(f"프레임 1개당 : hex 출력 {printed / count * 1e9:.0f}ns / 탭 기록 {tapped / count * 1e9:.0f}ns "
+          f"(링 버퍼 {tap.slots}개 x {SLOT_SIZE}바이트 = {len(tap.buffer) // 1024}KB 고정)")
+
+    tap = FrameTap(slots=8, role=ROLE_SERVER)
+    tap.record(COMMAND, frame, 1)
+    tap.record(COMMAND, MessageProtocol.pack_command('RA', MessageProtocol.pack_ra_data()), 2)
+    tap.record(RESPONSE, MessageProtocol.pack_response('RI', 0x00), 1)
+    tap.record(RESPONSE, MessageProtocol.pack_stock_frame([3, 1, 0, 2, 0, 6, 0]), 2)
+    path = os.path.join(tempfile.gettempdir(), 'frame_tap_demo.cap')
+    print(f"캡처 {tap.dump(path)}개 -> {path}")
+    for line in render(path):
+        print(line)
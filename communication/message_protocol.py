@@ -1,5 +1,5 @@
 import struct
-from typing import Dict, Any
+from typing import Dict, Any, Sequence
 # 리틀 엔디안 ( < )
 
 class MessageProtocol:
@@ -13,6 +13,57 @@ class MessageProtocol:
         end_byte = b'\n'
         return cmd_bytes + data_bytes + end_byte
     
+    @staticmethod
+    def pack_response(command: str, status: int, data: bytes = b'') -> bytes:
+        """LMS 응답을 18바이트 바이너리로 패킹 (Command(2) + Status(1) + Data(14) + End(1))"""
+        cmd_bytes = command.encode('ascii')[:2].ljust(2, b'\x00')
+        return cmd_bytes + bytes([status]) + data[:14].ljust(14, b'\x00') + b'\n'
+
+    # 고정 길이 응답 크기 : Command(2) + Status(1) + Data(14) + End(1)
+    RESPONSE_SIZE = 18
+    # LMS 과부하 응답 상태 (명령을 처리하지 않음, 재시도 가능)
+    STATUS_BUSY = 0x05
+
+    # 요청 식별 (Data 마지막 4바이트, 메시지 12~15) : 클라이언트 ID (uint16) + 요청 ID (uint16), 요청 ID 0 이면 없음
+    # 명령 데이터는 앞 10바이트까지 (레인별 수량 2바이트 -> 레인 최대 5개)
+    REQUEST_ID_OFFSET = 12
+    REQUEST_ID_MAX_DATA = 10
+    MAX_LANES = REQUEST_ID_MAX_DATA // 2
+
+    @staticmethod
+    def attach_request_id(data: bytes, client_id: int, request_id: int) -> bytes:
+        """14바이트 명령 데이터의 마지막 4바이트에 클라이언트 ID / 요청 ID 기록 (앞 10바이트를 넘는 데이터는 요청 ID 를 붙일 수 없음)"""
+        if any(data[MessageProtocol.REQUEST_ID_MAX_DATA:14]):
+            raise ValueError("요청 ID 자리에 명령 데이터가 있음 (데이터 10바이트 초과)")
+        return data[:MessageProtocol.REQUEST_ID_MAX_DATA].ljust(MessageProtocol.REQUEST_ID_MAX_DATA, b'\x00') \
+            + struct.pack('<HH', client_id & 0xFFFF, request_id & 0xFFFF)
+
+    @staticmethod
+    def unpack_client_id(message: bytes) -> int:
+        """17바이트 명령 메시지의 클라이언트 ID (없으면 0)"""
+        offset = MessageProtocol.REQUEST_ID_OFFSET
+        if len(message) < offset + 4:
+            return 0
+        return struct.unpack_from('<H', message, offset)[0]
+
+    @staticmethod
+    def unpack_request_id(message: bytes) -> int:
+        """17바이트 명령 메시지의 요청 ID (없으면 0)"""
+        offset = MessageProtocol.REQUEST_ID_OFFSET
+        if len(message) < offset + 4:
+            return 0
+        return struct.unpack_from('<H', message, offset + 2)[0]
+
+    @staticmethod
+    def unpack_command(message: bytes) -> Dict[str, Any]:
+        """17바이트 명령 메시지 언패킹"""
+        if len(message) < 16:
+            return {"error": "메시지 길이 부족"}
+        return {
+            "command": message[:2].decode('ascii', 'replace').rstrip('\x00'),
+            "data": message[2:16]
+        }
+
     @staticmethod
     def pack_ri_data(red: int, green: int) -> bytes:
         """RI 명령어 데이터 패킹"""
@@ -20,7 +71,7 @@ class MessageProtocol:
     
     @staticmethod
     def pack_au_data(stock_info: dict) -> bytes:
-        """재고 정보를 14바이트로 패킹 (AU 명령용)"""
+        """재고 정보를 14바이트로 패킹 (AU 명령용, 3레인 구성)"""
         return struct.pack('<HHHHHHH',
             stock_info.get('receiving', 0),
             stock_info.get('red_storage', 0),
@@ -30,7 +81,40 @@ class MessageProtocol:
             stock_info.get('receiving_total', 0),
             stock_info.get('shipping_total', 0)
         )
-    
+
+    @staticmethod
+    def stock_field_count(lane_count: int) -> int:
+        """AU 재고 필드 수 : 입고 + 레인별 저장 + 출고 + 입고 누적 + 출고 누적"""
+        return lane_count + 4
+
+    @staticmethod
+    def au_frame_size(lane_count: int) -> int:
+        """AU 응답 전체 길이 : Command(2) + Status(1) + Stock(2 x 필드 수) + End(1) (3레인 : 18바이트)"""
+        return 3 + 2 * MessageProtocol.stock_field_count(lane_count) + 1
+
+    @staticmethod
+    def pack_variable_response(command: str, status: int, data: bytes) -> bytes:
+        """가변 길이 응답 패킹 : Command(2) + Status(1) + Data(14 이상) + End(1) (14바이트 이하면 pack_response 와 동일)"""
+        return command.encode('ascii')[:2].ljust(2, b'\x00') + bytes([status]) + data.ljust(14, b'\x00') + b'\n'
+
+    @staticmethod
+    def pack_stock_frame(values: Sequence[int], status: int = 0x00) -> bytes:
+        """
+        가변 길이 AU 응답 패킹
+
+        values : 입고, 레인별 저장 (레인 순서), 출고, 입고 누적, 출고 누적 재고 (uint16 초과 값은 65535)
+        레인이 3개이면 기존 18바이트 AU 응답과 같은 형식이다.
+        """
+        values = [min(value, 0xFFFF) for value in values]
+        return b'AU' + bytes([status]) + struct.pack(f'<{len(values)}H', *values) + b'\n'
+
+    @staticmethod
+    def pack_lane_quantities(quantities: Sequence[int]) -> bytes:
+        """레인별 수량 (SI 등) 을 14바이트 데이터로 패킹 (레인 순서, 최대 5개 : 뒤 4바이트는 요청 ID 자리)"""
+        if len(quantities) > MessageProtocol.MAX_LANES:
+            raise ValueError(f"레인 수량은 최대 {MessageProtocol.MAX_LANES}개 ({len(quantities)})")
+        return struct.pack(f'<{len(quantities)}H', *quantities).ljust(14, b'\x00')
+
     @staticmethod
     def pack_rh_data(success: bool) -> bytes:
         """RH 명령어 데이터 패킹"""
@@ -46,6 +130,11 @@ class MessageProtocol:
         """RA 명령어 데이터 패킹"""
         return b'\x00' * 14
     
+    @staticmethod
+    def pack_rm_data(position: int) -> bytes:
+        """RM (Robot Move) 명령어 데이터 패킹 : target_position (0 입고 / 1.. 레인 / 레인 수 + 1 출고)"""
+        return struct.pack('<B', position) + b'\x00' * 13
+
     @staticmethod
     def pack_rr_data(region_code: int) -> bytes:
         """RR (Regional Request) 명령어 데이터 패킹"""
@@ -65,10 +154,78 @@ class MessageProtocol:
         ) + b'\x00' * 2  # padding to 14 bytes
 
     @staticmethod
-    def pack_rs_data(stats_type: int) -> bytes:
-        """RS (Regional Statistics) 명령어 데이터 패킹"""
-        return struct.pack('<B', stats_type) + b'\x00' * 13
+    def pack_rs_data(stats_type: int, start: int = 0, end: int = 0) -> bytes:
+        """RS (Regional Statistics) 명령어 데이터 패킹 : Type(1) + Start(4) + End(4) (구간 지정 시 unix 시각)"""
+        return struct.pack('<BII', stats_type, start, end) + b'\x00' * 5
+
+    @staticmethod
+    def pack_lane_stats(stats: Sequence) -> bytes:
+        """
+        레인별 (입고, 출고) 통계 패킹 (RU 응답 데이터) : 레인 순서의 received(2) + shipped(2)
+        3레인이면 pack_regional_data 와 같은 14바이트, 그 이상은 4 x 레인 수 바이트 (uint16 초과 값은 65535)
+        """
+        values = [min(value, 0xFFFF) for pair in stats for value in pair]
+        return struct.pack(f'<{len(values)}H', *values).ljust(14, b'\x00')
+
+    @staticmethod
+    def unpack_lane_stats(data: bytes, lanes: Sequence[str] = ('RED', 'GREEN', 'YELLOW')) -> Dict[str, Any]:
+        """RU 응답 데이터 언패킹 : {색상: {'received', 'shipped'}}"""
+        if len(data) < 4 * len(lanes):
+            return {"error": "지역별 데이터 길이 부족"}
+        values = struct.unpack_from(f'<{2 * len(lanes)}H', data)
+        return {lane: {'received': values[2 * i], 'shipped': values[2 * i + 1]} for i, lane in enumerate(lanes)}
     
+    @staticmethod
+    def pack_subscribe_data(subscribe: bool) -> bytes:
+        """AS / KS (구독) 명령어 데이터 패킹 : 1 구독 / 0 해제"""
+        return struct.pack('<B', 1 if subscribe else 0) + b'\x00' * 13
+
+    @staticmethod
+    def pack_bq_data() -> bytes:
+        """BQ (Backorder Query) 명령어 데이터 패킹"""
+        return b'\x00' * 14
+
+    @staticmethod
+    def pack_backorder_data(count: int, oldest_age: float, depths: Sequence[int]) -> bytes:
+        """
+        대기 주문 현황 패킹 (BU 응답 데이터) : 대기 주문 수(2) + 가장 오래된 주문 대기 시간(2, 초) + 레인별 대기 주문 수(2 x 레인 수)
+        (uint16 초과 값은 65535)
+        """
+        values = [min(int(value), 0xFFFF) for value in [count, oldest_age, *depths]]
+        return struct.pack(f'<{len(values)}H', *values).ljust(14, b'\x00')
+
+    @staticmethod
+    def unpack_backorder_data(data: bytes, lanes: Sequence[str] = ('RED', 'GREEN', 'YELLOW')) -> Dict[str, Any]:
+        """BU 응답 데이터 언패킹 : {'count', 'oldest_age', 'depth': {색상: 대기 주문 수}}"""
+        if len(data) < 4 + 2 * len(lanes):
+            return {"error": "대기 주문 데이터 길이 부족"}
+        values = struct.unpack_from(f'<{2 + len(lanes)}H', data)
+        return {'count': values[0], 'oldest_age': values[1], 'depth': dict(zip(lanes, values[2:]))}
+
+    # RQ 응답 위치 : RM 과 같은 위치 번호 (0 입고 / 1.. 레인 / 레인 수 + 1 출고), 목표 없음
+    ROBOT_NO_TARGET = 0xFF
+
+    @staticmethod
+    def pack_rq_data() -> bytes:
+        """RQ (Robot Query) 명령어 데이터 패킹"""
+        return b'\x00' * 14
+
+    @staticmethod
+    def pack_robot_data(status: int, location: int, target: int, arrivals: int, leg_ms: int) -> bytes:
+        """
+        적재 AGV 상태 패킹 (RQ 응답 데이터) : 상태(1, RobotStatus 값) + 위치(1) + 목표(1) + 도착 횟수(2) + 마지막 구간 이동 시간(2, ms)
+        (도착 횟수는 uint16 순환, 이동 시간은 65535 상한)
+        """
+        return struct.pack('<BBBHH', status, location, target, arrivals & 0xFFFF, min(int(leg_ms), 0xFFFF)).ljust(14, b'\x00')
+
+    @staticmethod
+    def unpack_robot_data(data: bytes) -> Dict[str, Any]:
+        """RQ 응답 데이터 언패킹 : {'status', 'location', 'target', 'arrivals', 'leg_ms'}"""
+        if len(data) < 7:
+            return {"error": "로봇 데이터 길이 부족"}
+        status, location, target, arrivals, leg_ms = struct.unpack_from('<BBBHH', data)
+        return {'status': status, 'location': location, 'target': target, 'arrivals': arrivals, 'leg_ms': leg_ms}
+
     @staticmethod
     def pack_ir_data() -> bytes:
         """IR (Init Receive) 명령어 데이터 패킹"""
@@ -115,7 +272,10 @@ class MessageProtocol:
             0x00: "SUCCESS",
             0x01: "FAILURE",
             0x02: "INVALID_CMD", 
-            0x03: "INVALID_DATA"
+            0x03: "INVALID_DATA",
+            0x04: "BACKORDERED",
+            0x05: "BUSY",
+            0x06: "READ_ONLY"
         }
         
         return {
@@ -124,18 +284,23 @@ class MessageProtocol:
         }
     
     @staticmethod
-    def unpack_stock_data(data: bytes) -> Dict[str, Any]:
-        """14바이트 재고 데이터 언패킹"""
-        if len(data) < 14:
+    def unpack_stock_values(data: bytes) -> tuple:
+        """AU 재고 데이터 (가변 길이) 를 uint16 튜플로 언패킹 : 필드 수는 데이터 길이로 결정"""
+        count = len(data) // 2
+        return struct.unpack(f'<{count}H', data[:count * 2])
+
+    @staticmethod
+    def unpack_stock_data(data: bytes, lanes: Sequence[str] = ('RED', 'GREEN', 'YELLOW')) -> Dict[str, Any]:
+        """재고 데이터 언패킹 (lanes : 레인 색상 이름, 데이터 길이 = 2 x (레인 수 + 4))"""
+        size = 2 * MessageProtocol.stock_field_count(len(lanes))
+        if len(data) < size:
             return {"error": "재고 데이터 길이 부족"}
         
-        stock = struct.unpack('<HHHHHHH', data)
-        return {
-            'receiving': stock[0],
-            'red_storage': stock[1],
-            'green_storage': stock[2],
-            'yellow_storage': stock[3], 
-            'shipping': stock[4],
-            'receiving_total': stock[5],
-            'shipping_total': stock[6]
-        }
\ No newline at end of file
+        stock = MessageProtocol.unpack_stock_values(data[:size])
+        result = {'receiving': stock[0]}
+        for i, lane in enumerate(lanes):
+            result[f'{lane.lower()}_storage'] = stock[1 + i]
+        result['shipping'] = stock[-3]
+        result['receiving_total'] = stock[-2]
+        result['shipping_total'] = stock[-1]
+        return result
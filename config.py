@@ -10,37 +10,35 @@ from enum import Enum, auto
 # 시스템 Enum 정의
 # =============================================================================
 
-class SectorName(Enum):
-    """각 구역의 고유한 이름을 정의"""
-    RECEIVING = auto()        # 입고 전 물품, 색을 알 수 없는 물품 저장 (ItemColor : UNKNOWN)
-    RED_STORAGE = auto()      # 입고 후 빨간색 물품 저장 구역 (ItemColor : RED)
-    GREEN_STORAGE = auto()    # 입고 후 초록색 물품 저장 구역 (ItemColor : GREEN)
-    YELLOW_STORAGE = auto()   # 입고 후 노란색 물품 저장 구역 (ItemColor : YELLOW)
-    SHIPPING = auto()         # 출고 후 3색 물품 처리 구역   (ItemColor : R / G / Y)
+# 저장 구역 (색상 레인) 구성
+# - 레인을 추가하면 SectorName / SectorType / ItemColor / 구역별 설정 / AU 재고 프레임 길이가 함께 늘어남
+# - code : Storage Box 명령 (RC / RM 등) 과 AGV 메시지 (UCR 등) 에 쓰이는 1글자 코드
+# - SI 명령은 Data(14) 앞 10바이트에 레인별 수량(2)을 담고 마지막 4바이트는 요청 ID 이므로 레인은 최대 5개
+STORAGE_LANES = [
+    {'color': 'RED',    'code': 'R', 'capacity': 3, 'sensors': ["PROXI1"], 'motors': ["STEP1"]},
+    {'color': 'GREEN',  'code': 'G', 'capacity': 3, 'sensors': ["PROXI1"], 'motors': ["STEP1"]},
+    {'color': 'YELLOW', 'code': 'Y', 'capacity': 3, 'sensors': ["PROXI1"], 'motors': ["STEP1"]},
+]
+MAX_STORAGE_LANES = 5
 
+if not 1 <= len(STORAGE_LANES) <= MAX_STORAGE_LANES:
+    raise ValueError(f"STORAGE_LANES 는 1~{MAX_STORAGE_LANES}개여야 합니다 (현재 {len(STORAGE_LANES)}개, SI 수량 / 요청 ID 자리 중복)")
 
-class SectorType(Enum):
-    """구역 타입"""
-    RECEIVING = "RECEIVING"        # 입고 구역
-    RED_STORAGE = "RED_STORAGE"    # 빨간색 저장 구역
-    GREEN_STORAGE = "GREEN_STORAGE"  # 초록색 저장 구역
-    YELLOW_STORAGE = "YELLOW_STORAGE"  # 노란색 저장 구역
-    SHIPPING = "SHIPPING"          # 출고 구역
+# 구역 순서 : 입고 -> 색상 레인 (STORAGE_LANES 순서) -> 출고 (AU 재고 프레임의 필드 순서와 동일)
+SECTOR_NAMES = ['RECEIVING'] + [f"{lane['color']}_STORAGE" for lane in STORAGE_LANES] + ['SHIPPING']
 
+# 각 구역의 고유한 이름 (RECEIVING / <COLOR>_STORAGE... / SHIPPING)
+SectorName = Enum('SectorName', SECTOR_NAMES)
 
-class ItemColor(Enum):
-    """물품의 종류를 나타내는 색상"""
-    UNKNOWN = auto()  # 입고 전 / 분류 실패
-    RED = auto()
-    GREEN = auto()
-    YELLOW = auto()
+# 구역 타입 (값은 구역 이름 문자열)
+SectorType = Enum('SectorType', {name: name for name in SECTOR_NAMES})
 
+# 물품의 종류를 나타내는 색상 (UNKNOWN : 입고 전 / 분류 실패)
+ItemColor = Enum('ItemColor', ['UNKNOWN'] + [lane['color'] for lane in STORAGE_LANES])
 
-class ColorCode(Enum):
-    """색상 코드 정의"""
-    RED = 0x01
-    GREEN = 0x02
-    YELLOW = 0x03
+
+# 색상 코드 (레인 순서대로 0x01 부터)
+ColorCode = Enum('ColorCode', [(lane['color'], i + 1) for i, lane in enumerate(STORAGE_LANES)])
 
 
 class SectorStatus(Enum):
@@ -105,31 +103,48 @@ PROTOCOL_CONFIG = {
 
 # 구역별 센서 설정
 SECTOR_SENSORS = {
-    SectorName.RECEIVING: ["RGB1", "RGB1"],
-    SectorName.RED_STORAGE: ["PROXI1"],
-    SectorName.GREEN_STORAGE: ["PROXI1"],
-    SectorName.YELLOW_STORAGE: ["PROXI1"],
-    SectorName.SHIPPING: ["RGB2"]
+    SectorName.RECEIVING: ["RGB1", "RGB2"],
+    **{SectorName[f"{lane['color']}_STORAGE"]: lane['sensors'] for lane in STORAGE_LANES},
+    SectorName.SHIPPING: ["RGB1"]
 }
 
 # 구역별 모터 설정
 SECTOR_MOTORS = {
     SectorName.RECEIVING: ["SERVO1", "STEP1", "DC1"],
-    SectorName.RED_STORAGE: ["STEP1"],
-    SectorName.GREEN_STORAGE: ["STEP1"],
-    SectorName.YELLOW_STORAGE: ["STEP1"],
+    **{SectorName[f"{lane['color']}_STORAGE"]: lane['motors'] for lane in STORAGE_LANES},
     SectorName.SHIPPING: []
 }
 
 # 구역별 용량 설정
 SECTOR_CAPACITY = {
     SectorName.RECEIVING: 0,      # 무제한
-    SectorName.RED_STORAGE: 3,
-    SectorName.GREEN_STORAGE: 3,
-    SectorName.YELLOW_STORAGE: 3,
+    **{SectorName[f"{lane['color']}_STORAGE"]: lane['capacity'] for lane in STORAGE_LANES},
     SectorName.SHIPPING: 0        # 무제한
 }
 
+# AGV (Robot) 상태 머신 설정
+ROBOT_CONFIG = {
+    'ack_timeout': 5.0,       # 이동 명령 후 송신 확인 (AGV 게이트웨이 송신 / LMS 응답) 까지 대기 (초)
+    'move_timeout': 10.0,     # 송신 확인 후 도착 (CI) 까지 대기 (초)
+    'history_size': 200,      # 구간별 이동 기록 보관 개수
+}
+
+# 다중 AGV 작업 배정 설정 (stw_lib/fleet_manager.py)
+FLEET_CONFIG = {
+    'matcher': 'hungarian',   # 'hungarian' : 전체 비용 최소 / 'greedy' : 가장 싼 (로봇, 작업) 쌍부터
+    'max_assigned': 2,        # 로봇별 배정 작업 수 (진행 중 1 + 대기)
+    'lookahead': 16,          # 매칭에 포함할 대기 작업 수 (오래된 순, 작업 기아 방지)
+    'travel_unit': 1.0,       # 기본 이동 시간 : 구역 순서 1칸당 (초)
+    'handling_time': 1.0,     # 적재 / 하역 1회 시간 (초)
+}
+
+# 구역 예약 테이블 설정 (stw_lib/zone_reservation.py)
+ZONE_CONFIG = {
+    'default_capacity': 1,    # 구역별 동시 진입 가능 로봇 수 (기본)
+    'capacity': {},           # 구역별 예외 (예 : {'SHIPPING': 2}, 키는 구역 이름)
+    'max_samples': 1000,      # 구역별 대기 시간 샘플 보관 개수
+}
+
 
 
 # =============================================================================
@@ -140,7 +155,7 @@ COMMANDS = {
     'RI': {
         'name': 'Receive Item',
         'description': '입고 구역으로 사용자가 요청한 수량만큼 새로운 물품 입고를 요청합니다.',
-        'data_format': 'RED(2) + GREEN(2) + padding(10)',
+        'data_format': 'RED(2) + GREEN(2) + padding(6) + RequestID(4)',
         'response_expected': True,
         'response_data_format': 'Status(1)',
         'timeout': 10.0,
@@ -148,7 +163,7 @@ COMMANDS = {
     'AU': {
         'name': 'All Stock Update',
         'description': '모든 구역의 현재 재고 수량 및 입출고 누적 재고 업데이트를 전송합니다.',
-        'data_format': 'RECEIVING재고(2) + RED_STORAGE재고(2) + GREEN_STORAGE재고(2) + YELLOW_STORAGE재고(2) + SHIPPING재고(2) + RECEIVING누적재고(2) + SHIPPING누적재고(2)',
+        'data_format': 'RECEIVING재고(2) + 레인별 STORAGE재고(2 x 레인 수) + SHIPPING재고(2) + RECEIVING누적재고(2) + SHIPPING누적재고(2)',  # 가변 길이 (3레인 : 14바이트)
         'response_expected': False,  # AU는 응답이 아닌 업데이트 데이터 전송
         'response_data_format': 'None',
         'timeout': 5.0,
@@ -164,7 +179,7 @@ COMMANDS = {
     'SI': {
         'name': 'Ship Item Request',
         'description': '보관 중인 물품(R/G/Y)의 출고를 요청합니다.',
-        'data_format': 'RED(2) + GREEN(2) + YELLOW(2) + padding(8)',
+        'data_format': '레인별 수량(2 x 레인 수, STORAGE_LANES 순서) + padding + RequestID(4) (레인 5개 이하)',
         'response_expected': True,
         'response_data_format': 'Status(1)',
         'timeout': 10.0,
@@ -174,7 +189,79 @@ COMMANDS = {
         'description': 'AU 명령(전체 재고 업데이트)을 요청합니다.',
         'data_format': 'padding(14)',
         'response_expected': True,
-        'response_data_format': 'AU Command + Stock Data(14)',
+        'response_data_format': 'AU Command + Stock Data(2 x (레인 수 + 4))',
+        'timeout': 5.0,
+    },
+    'RS': {
+        'name': 'Regional Statistics',
+        'description': '색상(레인)별 입고 / 출고 수량 통계를 요청합니다. (분 / 시 / 일 집계)',
+        'data_format': 'Type(1) + Start(4) + End(4) + padding(5)',  # Type 0 전체 / 1 최근 1시간 / 2 최근 24시간 / 3 최근 7일 / 4 구간 지정 (unix 시각)
+        'response_expected': True,
+        'response_data_format': 'RU Command + 레인별 received(2) + shipped(2) (최소 14바이트)',
+        'timeout': 5.0,
+    },
+    'KS': {
+        'name': 'KPI Subscribe',
+        'description': '실시간 KPI (처리량 / 분류 사이클 / 레인 점유율) 구독 또는 해제를 요청합니다.',
+        'data_format': 'Subscribe(1) + padding(13)',  # 1 구독 / 0 해제
+        'response_expected': True,
+        'response_data_format': 'KU 와 같은 KPI 데이터 (구독 이후 주기적으로 KU 수신)',
+        'timeout': 5.0,
+    },
+    'AS': {
+        'name': 'Stock Subscribe',
+        'description': '재고 (AU) 변경 알림 구독 또는 해제를 요청합니다. 느린 클라이언트는 최신 AU 만 받습니다.',
+        'data_format': 'Subscribe(1) + padding(13)',  # 1 구독 / 0 해제
+        'response_expected': True,
+        'response_data_format': 'AU 와 같은 재고 데이터 (구독 이후 재고가 바뀔 때마다 AU 수신)',
+        'timeout': 5.0,
+    },
+    'IR': {
+        'name': 'Init Receive',
+        'description': '입고 구역 재고와 입고 누적 재고를 초기화합니다.',
+        'data_format': 'padding(14)',
+        'response_expected': True,
+        'response_data_format': 'Status(1)',
+        'timeout': 5.0,
+    },
+    'IS': {
+        'name': 'Init Store',
+        'description': '모든 저장 구역 (색상 레인) 재고를 초기화합니다.',
+        'data_format': 'padding(14)',
+        'response_expected': True,
+        'response_data_format': 'Status(1)',
+        'timeout': 5.0,
+    },
+    'IH': {
+        'name': 'Init Shipping',
+        'description': '출고 구역 재고와 출고 누적 재고를 초기화합니다.',
+        'data_format': 'padding(14)',
+        'response_expected': True,
+        'response_data_format': 'Status(1)',
+        'timeout': 5.0,
+    },
+    'IA': {
+        'name': 'Init All',
+        'description': '모든 구역 재고와 입고 / 출고 누적 재고를 초기화합니다.',
+        'data_format': 'padding(14)',
+        'response_expected': True,
+        'response_data_format': 'Status(1)',
+        'timeout': 5.0,
+    },
+    'BQ': {
+        'name': 'Backorder Query',
+        'description': '재고 부족으로 대기 중인 출고 주문 (backorder) 현황을 요청합니다.',
+        'data_format': 'padding(14)',
+        'response_expected': True,
+        'response_data_format': 'BU Command + 대기 주문 수(2) + 가장 오래된 주문 대기 시간(2, 초) + 레인별 대기 주문 수(2 x 레인 수)',
+        'timeout': 5.0,
+    },
+    'KU': {
+        'name': 'KPI Update',
+        'description': '구독한 클라이언트에 주기적으로 실시간 KPI 를 전송합니다.',
+        'data_format': '입고/분류/출고 처리량(2 x 3, 0.1개/분) + 사이클 평균(2) + 사이클 p95(2, ms) + 레인별 점유율(1 x 레인 수, %)',
+        'response_expected': False,  # KU는 응답이 아닌 업데이트 데이터 전송
+        'response_data_format': 'None',
         'timeout': 5.0,
     },
 }
@@ -188,4 +275,7 @@ STATUS_CODES = {
     0x01: 'FAILURE',
     0x02: 'INVALID_CMD',
     0x03: 'INVALID_DATA',
+    0x04: 'BACKORDERED',  # SI : 재고 부족으로 대기 주문 등록 (재고 입고 시 자동 출고)
+    0x05: 'BUSY',         # LMS 과부하 (명령 큐 가득 참) : 처리하지 않음, 잠시 후 재시도
+    0x06: 'READ_ONLY',    # 관찰자 중계 서버 : 쓰기 명령 거절 (LMS 에 직접 연결해야 함)
 }
\ No newline at end of file
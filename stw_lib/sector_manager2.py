@@ -1,22 +1,39 @@
+import os
+import time
+import functools
+import threading
+import importlib.util
+from array import array
+from contextlib import contextmanager
 from enum import Enum, auto
-from typing import List, Dict, Optional
+from collections import deque
+from typing import Callable, List, Dict, Optional, NamedTuple, Tuple
+
+# --- 구역 구성 (저장소 루트 config.py) ---
+
+def _load_system_config():
+  """
+  저장소 루트의 config.py 를 경로로 직접 로드합니다.
+  LMS 는 LMS/config.py 가 같은 이름(config)으로 먼저 잡히므로 import config 를 쓰지 않습니다.
+  """
+  path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'config.py')
+  spec = importlib.util.spec_from_file_location('system_config', path)
+  module = importlib.util.module_from_spec(spec)
+  spec.loader.exec_module(module)
+  return module
+
+_system_config = _load_system_config()
+
+# 저장 구역 (색상 레인) 목록 : [{'color', 'code', 'capacity', 'sensors', 'motors'}, ...]
+STORAGE_LANES: List[dict] = _system_config.STORAGE_LANES
 
 # --- 상수 정의 (Enums) ---
 
-class SectorName(Enum):
-  """각 구역의 고유한 이름을 정의합니다."""
-  RECEIVING = auto()        # 입고 전 물품, 색을 알 수 없는 물품 저장 (ItemColor : UNKNOWN)
-  RED_STORAGE = auto()      # 입고 후 빨간색 물품 저장 구역 (ItemColor : RED)
-  GREEN_STORAGE = auto()    # 입고 후 초록색 물품 저장 구역 (ItemColor : GREEN)
-  YELLOW_STORAGE = auto()   # 입고 후 노란색 물품 저장 구역 (ItemColor : YELLOW)
-  SHIPPING = auto()         # 출고 후 3색 물품 처리 구역   (ItemColor : R / G / Y)
-
-class ItemColor(Enum):
-  """물품의 종류를 나타내는 색상을 정의합니다."""
-  UNKNOWN = auto()  # 입고 전 / 분류 실패
-  RED = auto()
-  GREEN = auto()
-  YELLOW = auto()
+# 각 구역의 고유한 이름 : RECEIVING -> <COLOR>_STORAGE (레인 순서) -> SHIPPING
+SectorName = Enum('SectorName', [name.name for name in _system_config.SectorName])
+
+# 물품의 종류를 나타내는 색상 : UNKNOWN (입고 전 / 분류 실패) + 레인 색상
+ItemColor = Enum('ItemColor', ['UNKNOWN'] + [lane['color'] for lane in STORAGE_LANES])
 
 class SectorStatus(Enum):
   """구역의 상태를 정의합니다."""
@@ -32,37 +49,187 @@ class MotorStatus(Enum):
 
 class RobotStatus(Enum):
     IDLE = auto()
+    COMMANDED = auto()  # 이동 명령 송신 요청 (AGV 게이트웨이 송신 확인 대기)
     MOVING = auto()
+    ARRIVED = auto()    # 목적 구역 도착 (CI)
     OPERATING = auto()  # 물품 수령/전달 등
 
+# 상태 전이 : 현재 상태 -> 허용되는 다음 상태 (타임아웃 / 실패는 어느 상태에서든 IDLE)
+ROBOT_TRANSITIONS: Dict[RobotStatus, Tuple[RobotStatus, ...]] = {
+  RobotStatus.IDLE: (RobotStatus.COMMANDED, RobotStatus.OPERATING),
+  RobotStatus.COMMANDED: (RobotStatus.MOVING, RobotStatus.ARRIVED),
+  RobotStatus.MOVING: (RobotStatus.ARRIVED,),
+  RobotStatus.ARRIVED: (RobotStatus.OPERATING, RobotStatus.IDLE, RobotStatus.COMMANDED),
+  RobotStatus.OPERATING: (RobotStatus.IDLE,),
+}
+
+ROBOT_CONFIG: dict = _system_config.ROBOT_CONFIG
+
+
+class RobotLeg(NamedTuple):
+  """이동 1구간 기록 (Robot.clock 기준 시각)"""
+  source: 'SectorName'
+  target: 'SectorName'
+  commanded_at: float
+  acked_at: Optional[float]
+  arrived_at: Optional[float]
+  success: bool
+
+  @property
+  def duration(self) -> Optional[float]:
+    """송신 확인 -> 도착 이동 시간 (실패 구간은 None)"""
+    if not self.success or self.acked_at is None:
+      return None
+    return self.arrived_at - self.acked_at
+
+
 class Robot:
-  def __init__(self, name):
+  """
+  AGV 상태 머신 : IDLE -> COMMANDED -> MOVING -> ARRIVED -> (OPERATING) -> IDLE
+
+  - command_move() 후 AGV 게이트웨이 송신 확인 (on_ack) / 도착 (on_arrived) 이벤트로 진행
+  - 단계별 타임아웃 (ROBOT_CONFIG) 초과 시 실패 구간으로 기록하고 IDLE (위치는 출발 구역 유지)
+  - 구간별 이동 시간은 history 링 버퍼에 보관, 상태 변경은 리스너 콜백으로 전달 (폴링 불필요)
+  """
+  def __init__(self, name, clock: Callable = time.monotonic, ack_timeout: float = None, move_timeout: float = None):
+    """
+    Args:
+        clock: 구간 기록 시각 함수 (시뮬레이터는 가상 시각 사용)
+        ack_timeout / move_timeout: 단계별 타임아웃 (초, None 이면 ROBOT_CONFIG, 0 이면 타임아웃 없음)
+    """
     self.name = name
+    self.clock = clock
+    self.ack_timeout = ROBOT_CONFIG['ack_timeout'] if ack_timeout is None else ack_timeout
+    self.move_timeout = ROBOT_CONFIG['move_timeout'] if move_timeout is None else move_timeout
     self.status = RobotStatus.IDLE # 로봇 쉬는중
     self.location = SectorName.RECEIVING # 초기 위치 : 입고구역
+    self.target: Optional[SectorName] = None
+    self.history = deque(maxlen=ROBOT_CONFIG['history_size'])
+    self.listeners: Dict[str, Callable] = {}
+    self._leg = None    # 진행 중 구간 : [출발 구역, 명령 시각, 송신 확인 시각]
+    self._timer = None
+    self._lock = threading.RLock()
+
+  def register_listener(self, name: str, callback: Callable):
+    """상태 변경 콜백 등록 : callback(robot, old_status, new_status) (타이머 스레드에서도 호출됨)"""
+    self.listeners[name] = callback
+
+  def _transition(self, new_status: RobotStatus) -> bool:
+    old_status = self.status
+    if new_status != RobotStatus.IDLE and new_status not in ROBOT_TRANSITIONS[old_status]:
+      print(f"[{self.name}] 잘못된 상태 전이 무시: {old_status.name} -> {new_status.name}")
+      return False
+    self.status = new_status
+    for name, callback in list(self.listeners.items()):
+      try:
+        callback(self, old_status, new_status)
+      except Exception as e:
+        print(f"[{self.name}] {name} 리스너 오류: {e}")
+    return True
+
+  def _arm(self, timeout: Optional[float], expected: RobotStatus):
+    if self._timer:
+      self._timer.cancel()
+    self._timer = None
+    if timeout:
+      self._timer = threading.Timer(timeout, self._on_timeout, args=(expected,))
+      self._timer.daemon = True
+      self._timer.start()
+
+  def _finish_leg(self, success: bool):
+    source, commanded_at, acked_at = self._leg
+    arrived_at = self.clock() if success else None
+    self.history.append(RobotLeg(source, self.target, commanded_at, acked_at, arrived_at, success))
+    self._leg = None
+
+  def command_move(self, new_sector: SectorName) -> bool:
+    """이동 명령 (IDLE / ARRIVED 에서만) : 송신 확인이 ack_timeout 안에 없으면 실패"""
+    with self._lock:
+      if self.status not in (RobotStatus.IDLE, RobotStatus.ARRIVED):
+        print(f"[{self.name}] {self.status.name} 상태에서는 이동 명령을 받을 수 없습니다.")
+        return False
+      # 구역별 동시 진입 로봇 수 제한은 ZoneReservationTable (zone_reservation.py) 에서 이동 명령 전에 확인
+      self.target = new_sector
+      self._leg = [self.location, self.clock(), None]
+      self._transition(RobotStatus.COMMANDED)
+      self._arm(self.ack_timeout, RobotStatus.COMMANDED)
+      return True
+
+  def on_ack(self) -> bool:
+    """AGV 게이트웨이 송신 확인 : COMMANDED -> MOVING"""
+    with self._lock:
+      if self.status != RobotStatus.COMMANDED:
+        return False
+      self._leg[2] = self.clock()
+      self._transition(RobotStatus.MOVING)
+      self._arm(self.move_timeout, RobotStatus.MOVING)
+      return True
+
+  def on_arrived(self) -> bool:
+    """도착 (CI) : MOVING -> ARRIVED, 위치 갱신 및 구간 기록"""
+    with self._lock:
+      if self.status not in (RobotStatus.COMMANDED, RobotStatus.MOVING):
+        return False
+      self._arm(None, self.status)
+      if self._leg[2] is None:
+        self._leg[2] = self.clock()  # 송신 확인보다 도착이 먼저 온 경우
+      self.location = self.target
+      self._finish_leg(True)
+      return self._transition(RobotStatus.ARRIVED)
+
+  def start_operation(self) -> bool:
+    """물품 수령 / 전달 시작 (ARRIVED / IDLE -> OPERATING)"""
+    with self._lock:
+      return self._transition(RobotStatus.OPERATING)
+
+  def finish(self) -> bool:
+    """작업 완료 (ARRIVED / OPERATING -> IDLE)"""
+    with self._lock:
+      if self.status not in (RobotStatus.ARRIVED, RobotStatus.OPERATING):
+        return False
+      return self._transition(RobotStatus.IDLE)
+
+  def fail(self, reason: str = '') -> bool:
+    """이동 실패 (명령 거부 등) : 진행 중 구간을 실패로 기록하고 IDLE"""
+    with self._lock:
+      self._arm(None, self.status)
+      if self._leg is not None:
+        self._finish_leg(False)
+      if reason:
+        print(f"[{self.name}] 이동 실패: {reason}")
+      return self._transition(RobotStatus.IDLE)
+
+  def _on_timeout(self, expected: RobotStatus):
+    with self._lock:
+      if self.status == expected:
+        self.fail(f"{expected.name} 상태 타임아웃")
 
   def move_to_sector(self, new_sector):
+    """즉시 이동 (게이트웨이 없이 사용하는 시뮬레이션 / 테스트용) : 명령 -> 송신 확인 -> 도착 -> IDLE"""
     if self.location == new_sector:
       print(f"[{self.name}] 이미 {new_sector.name} 구역에 있습니다.")
       return
 
-    # (추가) 용량 체크 로직
-    # 현재 구역에서 로봇 수 감소, 새 구역에서 로봇 수 증가
-    
     print(f"[{self.name}] {self.location.name} -> {new_sector.name} 으로 이동 시작")
-    self.operation_status = RobotStatus.MOVING
-    
-    # 실제 이동 시간/로직 시뮬레이션
-    # ...
-    
-    print(f"[{self.name}] {new_sector.name} 구역에 도착했습니다.")
-    self.location = new_sector
-    self.operation_status = RobotStatus.IDLE
+    if self.command_move(new_sector) and self.on_ack() and self.on_arrived():
+      print(f"[{self.name}] {new_sector.name} 구역에 도착했습니다.")
+      self.finish()
+
+  def leg_durations(self) -> Dict[Tuple['SectorName', 'SectorName'], List[float]]:
+    """구간 (출발, 도착) 별 성공한 이동 시간 목록 (스케줄러 / 이동 계획의 실측값)"""
+    durations = {}
+    for leg in list(self.history):
+      if leg.duration is not None:
+        durations.setdefault((leg.source, leg.target), []).append(leg.duration)
+    return durations
 
   def get_info(self):
     print(f"--- 로봇 [{self.name}] 상태 정보 ---")
-    print(f"  - 현재 동작 상태: {self.operation_status.name}")
+    print(f"  - 현재 동작 상태: {self.status.name}")
     print(f"  - 현재 위치 구역: {self.location.name}")
+    if self.target is not None and self.status in (RobotStatus.COMMANDED, RobotStatus.MOVING):
+      print(f"  - 이동 목표 구역: {self.target.name}")
+    print(f"  - 이동 기록: {len(self.history)}건")
     print("-" * 25)
 
 class Motor:
@@ -70,6 +237,8 @@ class Motor:
   하나의 모터를 나타내는 클래스.
   이름과 상태(ON/OFF) 정보를 가집니다.
   """
+  __slots__ = ('name', 'status')
+
   def __init__(self, name: str):
     self.name = name
     self.status: MotorStatus = MotorStatus.OFF # 모든 모터는 OFF 상태에서 시작
@@ -96,22 +265,123 @@ class Motor:
   - self.location : 
 '''
 
+# --- 색상 -> 저장 구역 인덱스 (매 호출마다 문자열 조합 / Enum 이름 조회를 하지 않도록 미리 계산) ---
+
+COLOR_TO_SECTOR: Dict[ItemColor, SectorName] = {
+  color: SectorName[f"{color.name}_STORAGE"] for color in ItemColor if color != ItemColor.UNKNOWN
+}
+
+# 레인 순서의 색상 / 저장 구역 (SI 수량, AU 재고 프레임의 레인 필드 순서)
+LANE_COLORS: Tuple[ItemColor, ...] = tuple(ItemColor[lane['color']] for lane in STORAGE_LANES)
+LANE_SECTORS: Tuple[SectorName, ...] = tuple(COLOR_TO_SECTOR[color] for color in LANE_COLORS)
+
+# 레인 코드 (Storage Box / AGV 메시지의 1글자 코드) -> 색상
+CODE_TO_COLOR: Dict[str, ItemColor] = {lane['code']: ItemColor[lane['color']] for lane in STORAGE_LANES}
+
+# 구역별 (용량, 센서 목록, 모터 목록) : config.py 의 SECTOR_CAPACITY / SECTOR_SENSORS / SECTOR_MOTORS
+SECTOR_LAYOUT: Dict[SectorName, Tuple[int, List[str], List[str]]] = {
+  SectorName[name.name]: (_system_config.SECTOR_CAPACITY[name], _system_config.SECTOR_SENSORS[name], _system_config.SECTOR_MOTORS[name])
+  for name in _system_config.SectorName
+}
+
+# 상태 코드 (SectorStatus.value) -> SectorStatus
+_STATUS_BY_CODE = {status.value: status for status in SectorStatus}
+
+# --- SectorTable 클래스 ---
+
+class SectorTable:
+  """
+  전체 구역의 상태를 병렬 배열(재고 / 용량 / 상태 코드)로 보관하는 클래스.
+  구역 i 의 값은 stock[i], capacity[i], status[i] 에 있으며, Sector 객체는 이 배열을 가리키는 뷰입니다.
+  배열은 연속 메모리이므로 스냅샷 복사와 전체 구역 검사가 구역 수에 비해 가볍습니다.
+  재고 / 용량은 set_stock / set_capacity 로만 바꾸고, 가득 찬 구역 집합 (full) 을 그때 함께 갱신합니다.
+  """
+  __slots__ = ('names', 'index', 'stock', 'capacity', 'status', 'full')
+
+  def __init__(self):
+    self.names: List[SectorName] = []
+    self.index: Dict[SectorName, int] = {}
+    self.stock = array('l')
+    self.capacity = array('l')  # 0 : 무제한
+    self.status = array('b')    # SectorStatus.value
+    self.full = set()           # 용량이 가득 찬 구역 인덱스 (재고 / 용량 변경 시 갱신)
+
+  def add(self, name: SectorName, capacity: int, status: SectorStatus) -> int:
+    """구역을 추가하고 배열 인덱스를 반환합니다."""
+    self.index[name] = len(self.names)
+    self.names.append(name)
+    self.stock.append(0)
+    self.capacity.append(capacity)
+    self.status.append(status.value)
+    return self.index[name]
+
+  def _update_full(self, i: int):
+    capacity = self.capacity[i]
+    if capacity and self.stock[i] >= capacity:
+      self.full.add(i)
+    else:
+      self.full.discard(i)
+
+  def set_stock(self, i: int, value: int):
+    self.stock[i] = value
+    self._update_full(i)
+
+  def set_capacity(self, i: int, value: int):
+    self.capacity[i] = value
+    self._update_full(i)
+
+  def full_indices(self) -> List[int]:
+    """용량이 가득 찬 구역의 인덱스 목록 (구역 순서, 가득 찬 구역 수에 비례)"""
+    return sorted(self.full)
+
+  def free_capacity(self, i: int) -> Optional[int]:
+    """남은 용량 (무제한이면 None)"""
+    capacity = self.capacity[i]
+    return None if capacity == 0 else capacity - self.stock[i]
+
 # --- Sector 클래스 ---
 
 class Sector:
   """
   하나의 구역(Sector)을 나타내는 클래스.
   상태, 재고, 용량 정보를 포함하고 관련 메서드를 제공합니다.
+  재고 / 용량 / 상태 값은 SectorTable 배열에 저장됩니다. (table 을 주지 않으면 단독 테이블 생성)
   """
-  def __init__(self, name: SectorName, capacity: int = 0, sensor_list: Optional[List[str]] = None, motor_list: Optional[List[str]] = None):
+  __slots__ = ('name', 'sensor_list', 'motors', '_table', '_index')
+
+  def __init__(self, name: SectorName, capacity: int = 0, sensor_list: Optional[List[str]] = None, motor_list: Optional[List[str]] = None,
+               table: Optional[SectorTable] = None):
     self.name = name
-    self.capacity = capacity
-    self.stock: int = 0
+    self._table = table if table is not None else SectorTable()
+    self._index = self._table.add(name, capacity, SectorStatus.UNAVAILABLE)
     self.sensor_list: List[str] = sensor_list if sensor_list is not None else []
     
     # motor_list를 Motor 객체의 딕셔너리로 변환하여 저장
     self.motors: Dict[str, Motor] = {motor_name: Motor(motor_name) for motor_name in motor_list} if motor_list else {}
-    self.status: SectorStatus = SectorStatus.UNAVAILABLE
+
+  @property
+  def stock(self) -> int:
+    return self._table.stock[self._index]
+
+  @stock.setter
+  def stock(self, value: int):
+    self._table.set_stock(self._index, value)
+
+  @property
+  def capacity(self) -> int:
+    return self._table.capacity[self._index]
+
+  @capacity.setter
+  def capacity(self, value: int):
+    self._table.set_capacity(self._index, value)
+
+  @property
+  def status(self) -> SectorStatus:
+    return _STATUS_BY_CODE[self._table.status[self._index]]
+
+  @status.setter
+  def status(self, value: SectorStatus):
+    self._table.status[self._index] = value.value
 
   # --- 모터 제어 관련 메서드 ---
   def turn_on_motor(self, motor_name: str) -> bool:
@@ -184,6 +454,14 @@ class Sector:
       self.update_status(SectorStatus.PROCESSING)
     return True
 
+  def status_for_stock(self) -> SectorStatus:
+    """현재 재고만을 기준으로 구역 상태를 계산합니다. (UNAVAILABLE 판단은 호출자가 담당)"""
+    if self.stock == 0:
+      return SectorStatus.AVAILABLE
+    if self.capacity != 0 and self.stock >= self.capacity:
+      return SectorStatus.FULL
+    return SectorStatus.PROCESSING
+
   @property
   def is_available_for_storage(self) -> bool:
     """새로운 물품을 보관할 수 있는 상태인지 확인 (용량 체크)"""
@@ -198,31 +476,107 @@ class Sector:
     return (f"Sector(name={self.name.name}, status={self.status.name}, "
             f"stock={self.stock}/{capacity_str})")
 
+# --- 읽기 전용 스냅샷 ---
+
+class SectorSnapshot(NamedTuple):
+  """구역 하나의 불변 스냅샷"""
+  name: SectorName
+  status: SectorStatus
+  stock: int
+  capacity: int
+
+class ManagerSnapshot(NamedTuple):
+  """
+  전체 구역의 불변 스냅샷 (version 은 쓰기 트랜잭션마다 1씩 증가)
+  SectorTable 배열을 그대로 tuple 로 복사한 형태이며, names / index 는 구역 구성이 바뀌지 않으므로 공유합니다.
+  """
+  version: int
+  names: Tuple[SectorName, ...]
+  index: Dict[SectorName, int]
+  stock: Tuple[int, ...]
+  capacity: Tuple[int, ...]
+  status_codes: Tuple[int, ...]
+
+  @property
+  def sectors(self) -> Tuple[SectorSnapshot, ...]:
+    return tuple(SectorSnapshot(name, _STATUS_BY_CODE[code], stock, capacity)
+                 for name, code, stock, capacity in zip(self.names, self.status_codes, self.stock, self.capacity))
+
+  def get(self, name: SectorName) -> SectorSnapshot:
+    i = self.index[name]
+    return SectorSnapshot(name, _STATUS_BY_CODE[self.status_codes[i]], self.stock[i], self.capacity[i])
+
+def _serialized(method):
+  """쓰기 메서드를 단일 락으로 직렬화하고, 종료 시 새 스냅샷을 발행합니다."""
+  @functools.wraps(method)
+  def wrapper(self, *args, **kwargs):
+    with self.transaction():
+      return method(self, *args, **kwargs)
+  return wrapper
+
 # --- SectorManager 클래스 ---
 
 class SectorManager:
   """
   전체 구역을 중앙에서 관리하는 싱글톤 클래스.
+
+  쓰기(재고/상태 변경)는 하나의 락으로 직렬화되고, 쓰기가 끝날 때마다 불변 스냅샷(tuple)을 새로 만들어
+  참조만 교체합니다. 읽기(RA 응답, GUI 표시)는 snapshot() 으로 락 없이 일관된 전체 구역 상태를 얻습니다.
+  Sector 객체를 직접 수정해야 하는 경우에는 반드시 transaction() 블록 안에서 수정합니다.
   """
   _instance = None
+  _instance_lock = threading.Lock()
 
   def __new__(cls, *args, **kwargs):
     if not cls._instance:
-      cls._instance = super(SectorManager, cls).__new__(cls, *args, **kwargs)
+      with cls._instance_lock:
+        if not cls._instance:
+          cls._instance = super(SectorManager, cls).__new__(cls, *args, **kwargs)
     return cls._instance
 
   def __init__(self):
-    if not hasattr(self, 'initialized'):
+    with self._instance_lock:
+      if hasattr(self, 'initialized'):
+        return
+      self._lock = threading.RLock()
+      self._depth = 0
+      self.table = SectorTable()
+      self._snapshot = None
+      table = self.table
+      # 구역 구성은 config.py (STORAGE_LANES) 기준 : 배열 인덱스 순서 = SectorName 순서 = AU 재고 프레임 순서
       self.sectors: Dict[SectorName, Sector] = {
-        # 입고 구역 : 로봇
-        SectorName.RECEIVING: Sector(name=SectorName.RECEIVING, capacity=0, sensor_list=["RGB1", "RGB2"], motor_list=["SERVO1", "STEP1", "DC1"]),
-        SectorName.RED_STORAGE: Sector(name=SectorName.RED_STORAGE, capacity=3, sensor_list=["PROXI1"], motor_list=["STEP1"]),
-        SectorName.GREEN_STORAGE: Sector(name=SectorName.GREEN_STORAGE, capacity=3, sensor_list=["PROXI1"], motor_list=["STEP1"]),
-        SectorName.YELLOW_STORAGE: Sector(name=SectorName.YELLOW_STORAGE, capacity=3, sensor_list=["PROXI1"], motor_list=["STEP1"]),
-        SectorName.SHIPPING: Sector(name=SectorName.SHIPPING, capacity=0, sensor_list=["RGB1"])
+        name: Sector(name=name, capacity=capacity, sensor_list=list(sensors), motor_list=motors, table=table)
+        for name, (capacity, sensors, motors) in SECTOR_LAYOUT.items()
       }
+      self._names = tuple(table.names)
+      self._publish_snapshot()
       self.initialized = True
 
+  # --- 동시성 제어 ---
+  @contextmanager
+  def transaction(self):
+    """쓰기 트랜잭션 : 중첩 가능, 가장 바깥 블록이 끝날 때 한 번만 스냅샷 발행"""
+    with self._lock:
+      self._depth += 1
+      try:
+        yield self
+      finally:
+        self._depth -= 1
+        if self._depth == 0:
+          self._publish_snapshot()
+
+  def _publish_snapshot(self):
+    """현재 구역 배열을 복사해 새 스냅샷으로 교체 (참조 대입은 원자적)"""
+    table = self.table
+    version = self._snapshot.version + 1 if self._snapshot else 1
+    self._snapshot = ManagerSnapshot(version, self._names, table.index,
+                                     tuple(table.stock), tuple(table.capacity), tuple(table.status))
+
+  def snapshot(self) -> ManagerSnapshot:
+    """락 없이 일관된 전체 구역 상태를 반환합니다."""
+    return self._snapshot
+
+  @_serialized
   def update_sector_status(self, name: SectorName, new_status: SectorStatus) -> bool:
     """
     특정 구역의 상태를 직접 업데이트합니다.
@@ -242,6 +596,7 @@ class SectorManager:
       print(f"오류: '{name}'에 해당하는 구역을 찾을 수 없습니다.")
       return False
 
+  @_serialized
   def initialize_all_sectors(self):
     print("--- 모든 구역을 사용 가능(AVAILABLE) 상태로 초기화합니다. ---")
     for sector in self.sectors.values():
@@ -251,16 +606,20 @@ class SectorManager:
     return self.sectors[name]
 
   def _get_storage_sector_name(self, color: ItemColor) -> Optional[SectorName]:
-    if color == ItemColor.UNKNOWN:
-        return None
-    return SectorName[f"{color.name}_STORAGE"]
+    return COLOR_TO_SECTOR.get(color)  # UNKNOWN 은 None
+
+  def full_sectors(self) -> List[SectorName]:
+    """가득 찬 구역 목록 (재고 변경 때 갱신한 집합 조회, 전체 구역을 훑지 않음)"""
+    return [self.table.names[i] for i in self.table.full_indices()]
 
+  @_serialized
   def receive_new_item(self) -> bool:
     """새로운 (UNKNOWN) 물품을 입고 구역(RECEIVING)에 추가합니다."""
     print("\n>>> 새로운 물품 입고 시도...")
     receiving_sector = self.get_sector(SectorName.RECEIVING)
     return receiving_sector.add_stock()
 
+  @_serialized
   def classify_and_store(self, classified_color: ItemColor) -> bool:
     """입고 구역의 물품을 분류하여 해당 색상 저장고로 옮깁니다."""
     print(f"\n>>> 입고 구역 물품을 '{classified_color.name}'(으)로 분류 및 저장 시도...")
@@ -292,6 +651,7 @@ class SectorManager:
             return False
     return False
 
+  @_serialized
   def prepare_for_shipping(self, color: ItemColor) -> bool:
     """저장 구역의 물품을 출고 구역(SHIPPING)으로 옮깁니다."""
     print(f"\n>>> '{color.name}' 색상 물품 출고 준비 시도...")
@@ -317,11 +677,91 @@ class SectorManager:
             return False
     return False
 
+  @_serialized
+  def move_batch(self, moves: List[Tuple[SectorName, SectorName, int]]) -> bool:
+    """
+    여러 구역 간 물품 이동을 하나의 트랜잭션으로 처리합니다.
+
+    1. 검증 : 구역별 순 변화량을 합산하여 재고 / 용량 / 상태를 한 번에 검사 (하나라도 불가하면 아무것도 바꾸지 않음)
+    2. 적용 : 되돌리기 저널에 이전 재고 / 상태를 기록하며 재고만 변경
+    3. 커밋 : 영향받은 구역의 상태를 한 번씩만 재계산 (도중 오류 시 저널을 역순으로 되돌림)
+
+    Args:
+        moves (List[Tuple[SectorName, SectorName, int]]): (출발 구역, 도착 구역, 수량) 목록.
+
+    Returns:
+        bool: 모든 이동 성공 시 True, 검증 실패 / 오류 시 False (재고 변경 없음).
+    """
+    deltas: Dict[SectorName, int] = {}
+    for source, destination, quantity in moves:
+      if quantity < 0:
+        print(f"실패: 잘못된 수량 {quantity} ({source.name} -> {destination.name})")
+        return False
+      deltas[source] = deltas.get(source, 0) - quantity
+      deltas[destination] = deltas.get(destination, 0) + quantity
+
+    for name, delta in deltas.items():
+      sector = self.sectors[name]
+      if delta == 0:
+        continue
+      if sector.status == SectorStatus.UNAVAILABLE:
+        print(f"실패: '{name.name}' 구역을 사용할 수 없습니다.")
+        return False
+      new_stock = sector.stock + delta
+      if new_stock < 0:
+        print(f"실패: '{name.name}' 재고 부족 (현재: {sector.stock}, 필요: {-delta})")
+        return False
+      if sector.capacity != 0 and new_stock > sector.capacity:
+        print(f"실패: '{name.name}' 용량 초과 (현재: {sector.stock}, 추가: {delta}, 용량: {sector.capacity})")
+        return False
+
+    journal = []
+    try:
+      for name, delta in deltas.items():
+        if delta == 0:
+          continue
+        sector = self.sectors[name]
+        journal.append((sector, sector.stock, sector.status))
+        sector.stock += delta
+      for sector, _, _ in journal:
+        sector.status = sector.status_for_stock()  # UNAVAILABLE 구역은 검증 단계에서 제외됨
+    except Exception as e:
+      for sector, stock, status in reversed(journal):
+        sector.stock = stock
+        sector.status = status
+      print(f"오류: 일괄 이동 중 예외 발생, 롤백합니다. ({e})")
+      return False
+    return True
+
+  def ship_order(self, order: Dict[ItemColor, int]) -> bool:
+    """출고 주문 (예: {RED: 2, GREEN: 1, YELLOW: 3}) 을 저장 구역 -> 출고 구역으로 한 번에 이동합니다."""
+    moves = []
+    for color, quantity in order.items():
+      storage_name = self._get_storage_sector_name(color)
+      if storage_name is None:
+        print("실패: 유효하지 않은 색상입니다.")
+        return False
+      if quantity:
+        moves.append((storage_name, SectorName.SHIPPING, quantity))
+    return self.move_batch(moves)
+
+  def store_order(self, order: Dict[ItemColor, int]) -> bool:
+    """분류 결과 (예: {RED: 1, YELLOW: 2}) 를 입고 구역 -> 색상별 저장 구역으로 한 번에 이동합니다."""
+    moves = []
+    for color, quantity in order.items():
+      storage_name = self._get_storage_sector_name(color)
+      if storage_name is None:
+        print("실패: UNKNOWN 상태로는 저장 구역으로 옮길 수 없습니다.")
+        return False
+      if quantity:
+        moves.append((SectorName.RECEIVING, storage_name, quantity))
+    return self.move_batch(moves)
+
   def display_all_statuses(self):
     print("\n--- 전체 구역 현재 상태 ---")
-    for name, sector in self.sectors.items():
+    for sector in self.snapshot().sectors:
       capacity_str = "무제한" if sector.capacity == 0 else str(sector.capacity)
-      print(f"- {name.name:<15}: {sector.status.name:<12} | 재고: {sector.stock}/{capacity_str}")
+      print(f"- {sector.name.name:<15}: {sector.status.name:<12} | 재고: {sector.stock}/{capacity_str}")
     print("--------------------------")
 
 if __name__ == '__main__':
@@ -0,0 +1,92 @@
+import io
+import os
+import sys
+import time
+import random
+import threading
+from contextlib import redirect_stdout
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from stw_lib.sector_manager2 import SectorManager, SectorStatus, LANE_COLORS
+
+"""
+SectorManager 동시성 스트레스 테스트
+
+- 쓰기 스레드 : 입고 / 분류 / 출고를 무작위로 반복 (TCP 핸들러, 시리얼 콜백 역할)
+- 읽기 스레드 : snapshot() 으로 전체 구역을 읽으며 스냅샷 내부 일관성 검사 (RA 핸들러, GUI 역할)
+  1. 재고는 0 이상, 용량이 있는 구역은 용량 이하
+  2. 상태와 재고가 일치 (FULL <-> 재고 == 용량)
+  3. 버전은 단조 증가
+- 종료 후 : 전체 재고 합 == 성공한 입고 수 (물품 유실 / 중복 없음), 가득 찬 구역 집합 == 배열 전체 검사 결과
+"""
+
+COLORS = list(LANE_COLORS)
+
+
+def run_stress_test(writers: int = 8, readers: int = 4, operations: int = 1000) -> bool:
+  manager = SectorManager()
+  manager.initialize_all_sectors()
+  received = [0] * writers
+  errors = []
+  done = threading.Event()
+
+  def writer(index):
+    rng = random.Random(index)
+    for _ in range(operations):
+      action = rng.random()
+      if action < 0.4:
+        if manager.receive_new_item():
+          received[index] += 1
+      elif action < 0.8:
+        manager.classify_and_store(rng.choice(COLORS))
+      else:
+        manager.prepare_for_shipping(rng.choice(COLORS))
+
+  def reader():
+    last_version = 0
+    while not done.is_set():
+      snapshot = manager.snapshot()
+      if snapshot.version < last_version:
+        errors.append(f"버전 역행: {snapshot.version} < {last_version}")
+      last_version = snapshot.version
+      for sector in snapshot.sectors:
+        if sector.stock < 0 or (sector.capacity and sector.stock > sector.capacity):
+          errors.append(f"재고 범위 오류: {sector}")
+        if sector.capacity and (sector.status == SectorStatus.FULL) != (sector.stock == sector.capacity):
+          errors.append(f"상태 불일치: {sector}")
+      time.sleep(0)  # 쓰기 스레드에 GIL 양보
+
+  # 기존 재고를 기준값으로 기록 (싱글톤이므로 이전 사용 상태가 남아 있을 수 있음)
+  initial_total = sum(sector.stock for sector in manager.snapshot().sectors)
+
+  with redirect_stdout(io.StringIO()):  # 각 메서드의 print 출력 억제
+    reader_threads = [threading.Thread(target=reader) for _ in range(readers)]
+    writer_threads = [threading.Thread(target=writer, args=(i,)) for i in range(writers)]
+    for thread in reader_threads + writer_threads:
+      thread.start()
+    for thread in writer_threads:
+      thread.join()
+    done.set()
+    for thread in reader_threads:
+      thread.join()
+
+  final = manager.snapshot()
+  total_stock = sum(sector.stock for sector in final.sectors)
+  if total_stock != initial_total + sum(received):
+    errors.append(f"재고 합 불일치: {total_stock} != {initial_total} + {sum(received)}")
+  scanned = [sector.name for sector in final.sectors if sector.capacity and sector.stock >= sector.capacity]
+  if manager.full_sectors() != scanned:
+    errors.append(f"가득 찬 구역 불일치: {manager.full_sectors()} != {scanned}")
+
+  print(f"쓰기 {writers}개 x {operations}회, 읽기 {readers}개, 최종 버전 {final.version}")
+  for sector in final.sectors:
+    print(f"- {sector.name.name:<15}: {sector.status.name:<12} | 재고: {sector.stock}")
+  if errors:
+    print(f"실패: 오류 {len(errors)}건 (예: {errors[0]})")
+  else:
+    print("성공: 스냅샷 일관성 / 재고 보존 확인")
+  return not errors
+
+
+if __name__ == "__main__":
+  sys.exit(0 if run_stress_test() else 1)
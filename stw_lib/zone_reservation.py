@@ -0,0 +1,154 @@
+import os
+import sys
+import time
+import heapq
+import bisect
+import threading
+from collections import deque
+from typing import Callable, Dict
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from stw_lib.sector_manager2 import SectorName, _system_config
+
+"""
+구역 예약 테이블 (다중 AGV 구역 진입 직렬화)
+
+- 구역마다 동시에 들어갈 수 있는 로봇 수 (capacity, 기본 1) 를 두고 두 가지 방식으로 진입을 관리한다.
+  1. 시간 예약 (reserve) : 도착 예정 시각부터 작업 시간 동안의 구간을 미리 예약
+     - 겹치는 예약이 capacity 만큼 있으면 가장 이른 빈 구간으로 미뤄서 예약하고, 로봇은 그만큼 늦게 출발한다.
+     - 구역 안에서 멈춰 기다리지 않으므로 공용 구역 (RECEIVING / SHIPPING) 을 멈춤 없이 통과
+  2. 즉시 진입 (enter / leave) : 실제 도착 시 구역이 차 있으면 대기열 (priority 낮은 값 우선, 같으면 FIFO) 에서 대기
+     - 예약 시간보다 작업이 길어진 경우 등 예측이 틀렸을 때의 안전 장치
+- 대기 없이 진입하지 못한 로봇은 항상 구역 밖 (통로) 에서 기다리므로 구역 점유 순환 대기 (교착) 가 생기지 않는다.
+- stats() : 구역별 예약 / 진입 수, 예약 지연 (요청 시각 -> 예약 시작), 진입 대기 시간, 현재 점유 / 대기 로봇
+"""
+
+ZONE_CONFIG: dict = _system_config.ZONE_CONFIG
+
+
+class Zone:
+  """구역 1개의 예약 목록 / 점유 로봇 / 대기열"""
+  __slots__ = ('capacity', 'bookings', 'occupants', 'waiting', 'planned_waits', 'entry_waits', 'counters')
+
+  def __init__(self, capacity: int, samples: int):
+    self.capacity = capacity
+    self.bookings = []      # [(시작, 끝, 로봇)] 시작 시각 순
+    self.occupants = set()
+    self.waiting = []       # heap : (priority, 순번, 로봇, 요청 시각, 진입 콜백)
+    self.planned_waits = deque(maxlen=samples)
+    self.entry_waits = deque(maxlen=samples)
+    self.counters = {'reserved': 0, 'delayed': 0, 'entered': 0, 'stopped': 0}
+
+  def overlaps(self, start: float, end: float) -> int:
+    return sum(1 for s, e, _ in self.bookings if s < end and e > start)
+
+
+class ZoneReservationTable:
+  def __init__(self, clock: Callable = time.monotonic):
+    """
+    Args:
+        clock: 현재 시각 함수 (시뮬레이터는 가상 시각)
+    """
+    self.clock = clock
+    samples = ZONE_CONFIG['max_samples']
+    capacity = ZONE_CONFIG['capacity']
+    self.zones: Dict[SectorName, Zone] = {
+      name: Zone(capacity.get(name.name, ZONE_CONFIG['default_capacity']), samples) for name in SectorName
+    }
+    self.sequence = 0
+    self.lock = threading.Lock()
+
+  # --- 시간 예약 ---
+  def reserve(self, robot: str, sector: SectorName, earliest: float, duration: float) -> float:
+    """
+    earliest 이후 duration 동안 비어 있는 가장 이른 구간 예약
+
+    Returns:
+        예약 시작 시각 (earliest 보다 늦으면 그만큼 출발을 늦춰야 함)
+    """
+    with self.lock:
+      zone = self.zones[sector]
+      self._prune(zone)
+      start = earliest
+      if zone.overlaps(earliest, earliest + duration) >= zone.capacity:
+        # 후보 시작 시각 : 기존 예약이 끝나는 시각들 (빈 자리는 예약 종료 시점에만 생김)
+        for candidate in sorted(e for _, e, _ in zone.bookings if e > earliest):
+          if zone.overlaps(candidate, candidate + duration) < zone.capacity:
+            start = candidate
+            break
+      bisect.insort(zone.bookings, (start, start + duration, robot))
+      zone.counters['reserved'] += 1
+      if start > earliest:
+        zone.counters['delayed'] += 1
+      zone.planned_waits.append(start - earliest)
+      return start
+
+  def cancel(self, robot: str, sector: SectorName):
+    """로봇의 해당 구역 예약 취소 (이동 실패 등)"""
+    with self.lock:
+      zone = self.zones[sector]
+      zone.bookings = [booking for booking in zone.bookings if booking[2] != robot]
+
+  def _prune(self, zone: Zone):
+    """끝난 예약 제거 (lock 상태에서 호출)"""
+    now = self.clock()
+    if zone.bookings and zone.bookings[0][1] <= now:
+      zone.bookings = [booking for booking in zone.bookings if booking[1] > now]
+
+  # --- 즉시 진입 ---
+  def enter(self, robot: str, sector: SectorName, on_granted: Callable = None, priority: int = 0) -> bool:
+    """
+    구역 진입 요청 : 자리가 있으면 즉시 True, 없으면 대기열에 넣고 False (자리가 나면 on_granted() 호출)
+    """
+    with self.lock:
+      zone = self.zones[sector]
+      if len(zone.occupants) < zone.capacity and not zone.waiting:
+        zone.occupants.add(robot)
+        zone.counters['entered'] += 1
+        zone.entry_waits.append(0.0)
+        return True
+      self.sequence += 1
+      heapq.heappush(zone.waiting, (priority, self.sequence, robot, self.clock(), on_granted))
+      zone.counters['stopped'] += 1
+      return False
+
+  def leave(self, robot: str, sector: SectorName):
+    """구역 퇴장 : 대기 중인 로봇을 자리만큼 진입시킴 (콜백은 lock 밖에서 호출)"""
+    granted = []
+    with self.lock:
+      zone = self.zones[sector]
+      zone.occupants.discard(robot)
+      now = self.clock()
+      while zone.waiting and len(zone.occupants) < zone.capacity:
+        _, _, waiter, requested_at, on_granted = heapq.heappop(zone.waiting)
+        zone.occupants.add(waiter)
+        zone.counters['entered'] += 1
+        zone.entry_waits.append(now - requested_at)
+        granted.append(on_granted)
+    for on_granted in granted:
+      if on_granted:
+        on_granted()
+
+  # --- 통계 ---
+  def stats(self) -> dict:
+    """구역별 예약 지연 / 진입 대기 시간 (초) 통계"""
+    def summary(samples):
+      ordered = sorted(samples)
+      if not ordered:
+        return {'count': 0, 'mean': 0.0, 'p95': 0.0, 'max': 0.0}
+      return {
+        'count': len(ordered),
+        'mean': sum(ordered) / len(ordered),
+        'p95': ordered[max(0, int(len(ordered) * 0.95) - 1)],
+        'max': ordered[-1],
+      }
+    with self.lock:
+      return {
+        name.name: {
+          'planned_wait': summary(zone.planned_waits),
+          'entry_wait': summary(zone.entry_waits),
+          'occupants': sorted(zone.occupants),
+          'waiting': len(zone.waiting),
+          **zone.counters,
+        } for name, zone in self.zones.items()
+      }